@@ -1,14 +1,35 @@
 """ For package documentation, see README """
 import logging.config
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Type
 
 from requests import Session
 from requests.adapters import HTTPAdapter
 
 from amplium.config import Config
+from amplium.placement.abstract_placement import AbstractPlacementStrategy
+from amplium.placement.affinity import AffinityStrategy
+from amplium.placement.bin_packing import BinPackingStrategy
+from amplium.placement.forecast import ForecastStrategy
+from amplium.placement.latency_aware import LatencyAwareStrategy
+from amplium.placement.least_queue import LeastQueueStrategy
+from amplium.placement.power_of_two import PowerOfTwoStrategy
+from amplium.placement.weighted_round_robin import WeightedRoundRobinStrategy
+from amplium.placement.zone_aware import ZoneAwareStrategy
+from amplium.remote_grids.abstract_remote_grid import AbstractRemoteGrid
+from amplium.remote_grids.amplium_grid import AmpliumGrid
+from amplium.remote_grids.browserstack_grid import BrowserStackGrid
+from amplium.remote_grids.remote_grid_registry import RemoteGridRegistry
+from amplium.remote_grids.saucelabs_grid import SauceLabsGrid
+from amplium.remote_grids.selenium_grid import SeleniumGrid
 from amplium.service_discovery.abstract_discovery import AbstractDiscovery
 from amplium.service_discovery.consul_discovery import ConsulGridNodeStatus
 from amplium.service_discovery.zookeeper_discovery import ZookeeperGridNodeStatus
-from amplium.utils import datadog_handler, grid_handler, saucelabs_handler
+from amplium.utils import admission, capacity_forecaster, compression, config_reloader, datadog_handler, drain
+from amplium.utils import grid_handler
+from amplium.utils import grid_stats, large_payload, node_router
+from amplium.utils import request_logger, session_info_cache, session_pool, state_snapshot, tenants
+from amplium.utils import websocket_proxy
 from .version import __version__, __rpm_version__, __git_hash__
 
 CONFIG = Config()
@@ -19,29 +40,135 @@ SESSION = Session()
 SESSION.mount('http://', HTTPAdapter(pool_connections=100, pool_maxsize=100))
 SESSION.mount('https://', HTTPAdapter(pool_connections=100, pool_maxsize=100))
 
-DISCOVERY: AbstractDiscovery  # Needed to make mypy be happy
-
-if CONFIG.zookeeper:
-    host = CONFIG.zookeeper['host']
-    port = CONFIG.zookeeper['port']
-    nerve_directory = CONFIG.zookeeper['selenium_grid_zookeeper_path']
-    DISCOVERY = ZookeeperGridNodeStatus(nerve_directory, host, port)
-elif CONFIG.consul:
-    host = CONFIG.consul['host']
-    port = CONFIG.consul['port']
-    service_name = CONFIG.consul['selenium_grid_service_name']
-    DISCOVERY = ConsulGridNodeStatus(service_name, host, port)
-else:
+
+def create_discovery(config) -> AbstractDiscovery:
+    """Creates the service discovery configured, at startup and when the configuration is reloaded"""
+    if config.zookeeper:
+        host = config.zookeeper['host']
+        port = config.zookeeper['port']
+        nerve_directory = config.zookeeper['selenium_grid_zookeeper_path']
+        return ZookeeperGridNodeStatus(nerve_directory, host, port)
+    if config.consul:
+        host = config.consul['host']
+        port = config.consul['port']
+        service_name = config.consul['selenium_grid_service_name']
+        return ConsulGridNodeStatus(service_name, host, port)
     raise Exception('Zookeeper or Consul configuration is required')
 
+
+# Reloading the configuration can replace discovery, GRID_HANDLER.discovery is always the current one
+DISCOVERY = create_discovery(CONFIG)
+
+REQUEST_LOGGER = request_logger.RequestLogger(config=CONFIG.request_logging)
+LARGE_PAYLOADS = large_payload.LargePayloadHandler(config=CONFIG.large_payloads)
+COMPRESSION = compression.CompressionHandler(config=CONFIG.compression)
+
 DATADOG = datadog_handler.DatadogHandler(config=CONFIG.integrations.get('datadog'))
+ADMISSION = admission.AdmissionController(config=CONFIG.admission, datadog=DATADOG)
+
+REMOTE_GRID_TYPES: Dict[str, Type[AbstractRemoteGrid]] = {
+    'selenium': SeleniumGrid,
+    'amplium': AmpliumGrid,
+    'browserstack': BrowserStackGrid,
+}
+
+
+def create_remote_grids(config) -> List[AbstractRemoteGrid]:
+    """Creates the remote grids configured, at startup and when the configuration is reloaded"""
+    remote_grids = [
+        REMOTE_GRID_TYPES[remote_grid_config['type']](config=remote_grid_config, session=SESSION)
+        for remote_grid_config in config.remote_grids
+    ]
+    if config.integrations.get('saucelabs'):
+        remote_grids.append(SauceLabsGrid(config=config, session=SESSION))
+    return remote_grids
+
+
+REMOTE_GRIDS = RemoteGridRegistry(create_remote_grids(CONFIG))
+
+STATS = grid_stats.GridStats()
+TENANTS = tenants.TenantManager(config=CONFIG.tenants)
+FORECASTER = capacity_forecaster.CapacityForecaster()
+
+PLACEMENT_STRATEGIES: Dict[str, Type[AbstractPlacementStrategy]] = {
+    'least_queue': LeastQueueStrategy,
+    'power_of_two': PowerOfTwoStrategy,
+    'weighted_round_robin': WeightedRoundRobinStrategy,
+    'bin_packing': BinPackingStrategy,
+    'latency_aware': LatencyAwareStrategy,
+    'forecast': ForecastStrategy,
+}
+PLACEMENT = PLACEMENT_STRATEGIES[CONFIG.placement['strategy']](
+    config=CONFIG,
+    stats=STATS,
+    forecaster=FORECASTER
+)
+if CONFIG.affinity['enabled']:
+    PLACEMENT = AffinityStrategy(config=CONFIG, stats=STATS, strategy=PLACEMENT, forecaster=FORECASTER)
+# Zones narrow down the grids first, so that builds only stick to grids in the preferred zone
+if CONFIG.zones['enabled']:
+    PLACEMENT = ZoneAwareStrategy(config=CONFIG, stats=STATS, strategy=PLACEMENT, forecaster=FORECASTER)
 
-SAUCELABS = saucelabs_handler.SauceLabsHandler(config=CONFIG, session=SESSION)
+# Shared by the bulk endpoints, so that concurrent batches can't flood the hubs with requests
+BULK_EXECUTOR = ThreadPoolExecutor(max_workers=CONFIG.bulk['workers'], thread_name_prefix='amplium-bulk')
+# Sessions of a batch can wait for capacity for the whole session queue time, so they have workers of their
+# own rather than holding up the deletes and pool upkeep that free capacity
+BATCH_CREATE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=CONFIG.bulk['create_workers'],
+    thread_name_prefix='amplium-batch-create'
+)
 
 GRID_HANDLER = grid_handler.GridHandler(
     config=CONFIG,
     discovery=DISCOVERY,
     datadog=DATADOG,
-    saucelabs=SAUCELABS,
+    remote_grids=REMOTE_GRIDS,
+    session=SESSION,
+    stats=STATS,
+    placement=PLACEMENT,
+    forecaster=FORECASTER,
+    tenants=TENANTS
+)
+
+SESSION_INFO = session_info_cache.SessionInfoCache(
+    config=CONFIG.session_info,
+    grid_handler=GRID_HANDLER,
     session=SESSION
 )
+NODE_ROUTER = node_router.NodeRouter(
+    config=CONFIG.node_routing,
+    grid_handler=GRID_HANDLER,
+    session_info=SESSION_INFO,
+    executor=BULK_EXECUTOR
+)
+STATE_SNAPSHOT = state_snapshot.StateSnapshot(
+    config=CONFIG.snapshot,
+    grid_handler=GRID_HANDLER,
+    node_router=NODE_ROUTER
+)
+RELOADER = config_reloader.ConfigReloader(
+    config=CONFIG,
+    grid_handler=GRID_HANDLER,
+    datadog=DATADOG,
+    create_discovery=create_discovery,
+    create_remote_grids=create_remote_grids
+)
+
+WEBSOCKETS = websocket_proxy.WebSocketProxy(config=CONFIG.websockets, grid_handler=GRID_HANDLER)
+
+SESSION_POOL = session_pool.WarmSessionPool(
+    config=CONFIG.session_pool,
+    grid_handler=GRID_HANDLER,
+    session=SESSION,
+    executor=BULK_EXECUTOR,
+    datadog=DATADOG
+)
+REUSE_POOL = session_pool.ReusableSessionPool(
+    config=CONFIG.reuse,
+    grid_handler=GRID_HANDLER,
+    session=SESSION,
+    executor=BULK_EXECUTOR,
+    datadog=DATADOG
+)
+
+DRAIN = drain.DrainController(config=CONFIG.drain, snapshot=STATE_SNAPSHOT, pools=[SESSION_POOL, REUSE_POOL])
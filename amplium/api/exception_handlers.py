@@ -1,9 +1,10 @@
 """Contains exception handlers for Flask/Connexion"""
-import json
 import logging
 
 from flask import Response
 
+from amplium.utils import json_codec
+
 
 logger = logging.getLogger(__name__)
 
@@ -17,14 +18,14 @@ def handle_unknown_exception(exception):
     """
     logger.exception("Unknown exception encountered:")
     return Response(
-        response=json.dumps(
+        response=json_codec.dumps(
             {
                 "value": "Amplium exception: %s" % str(exception),
                 "status": "ERROR"
             }
         ),
         status=500,
-        mimetype="application/json"
+        mimetype=json_codec.MIMETYPE
     )
 
 
@@ -36,12 +37,14 @@ def handle_amplium_exception(exception):
     """
     logger.exception("Amplium exception encountered:")
     return Response(
-        response=json.dumps(
+        response=json_codec.dumps(
             {
                 "value": exception.error,
-                "status": "ERROR"
+                "status": "ERROR",
+                **exception.details
             }
         ),
         status=exception.status_code,
-        mimetype="application/json"
+        headers=exception.headers,
+        mimetype=json_codec.MIMETYPE
     )
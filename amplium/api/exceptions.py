@@ -1,4 +1,5 @@
 """Class for Amplium exceptions"""
+import math
 
 
 class AmpliumException(RuntimeError):
@@ -8,13 +9,21 @@ class AmpliumException(RuntimeError):
 
         self.error = error
         self.status_code = status_code
+        # Extra fields for the error response body, and headers for the error response
+        self.details = {}
+        self.headers = {}
 
 
 class NoAvailableCapacityException(AmpliumException):
     """Thrown if there is no available capacity for new sessions"""
-    def __init__(self, message=""):
+    def __init__(self, message="", predicted_wait=None):
         super().__init__(message, "AMPLIUM_NO_AVAILABLE_CAPACITY", 429)
 
+        self.predicted_wait = predicted_wait
+        if predicted_wait is not None:
+            self.details['predicted_wait'] = round(predicted_wait, 1)
+            self.headers['Retry-After'] = str(math.ceil(predicted_wait))
+
 
 class NoAvailableGridsException(AmpliumException):
     """Thrown if there are no grids registered to Amplium"""
@@ -22,6 +31,46 @@ class NoAvailableGridsException(AmpliumException):
         super().__init__(message, "AMPLIUM_NO_AVAILABLE_GRIDS", 429)
 
 
+class TenantQuotaExceededException(AmpliumException):
+    """Thrown if a tenant already has as many sessions as its quota allows"""
+    def __init__(self, message=""):
+        super().__init__(message, "AMPLIUM_TENANT_QUOTA_EXCEEDED", 429)
+
+
+class OverloadedException(AmpliumException):
+    """Thrown if Amplium has too many requests in flight to take on another"""
+    def __init__(self, message="", retry_after=1):
+        super().__init__(message, "AMPLIUM_OVERLOADED", 503)
+
+        self.headers['Retry-After'] = str(math.ceil(retry_after))
+
+
+class DrainingException(AmpliumException):
+    """Thrown if a new session is requested from an Amplium that is being taken out of service"""
+    def __init__(self, message="", retry_after=1):
+        super().__init__(message, "AMPLIUM_DRAINING", 503)
+
+        self.headers['Retry-After'] = str(math.ceil(retry_after))
+
+
+class AdminForbiddenException(AmpliumException):
+    """Thrown if a client that isn't allowed to administer Amplium uses an admin endpoint"""
+    def __init__(self, message=""):
+        super().__init__(message, "AMPLIUM_ADMIN_FORBIDDEN", 403)
+
+
+class InvalidConfigException(AmpliumException):
+    """Thrown if a reloaded configuration is invalid"""
+    def __init__(self, message=""):
+        super().__init__(message, "AMPLIUM_INVALID_CONFIG", 400)
+
+
+class InvalidBatchException(AmpliumException):
+    """Thrown if a batch of commands can't be run as requested"""
+    def __init__(self, message=""):
+        super().__init__(message, "AMPLIUM_INVALID_BATCH", 400)
+
+
 class IntegrationNotConfigured(AmpliumException):
     """Thrown if we try to use an integration and it is not configured correctly"""
     def __init__(self, message=""):
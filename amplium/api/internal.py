@@ -1,14 +1,61 @@
 """Root handler for the API"""
+import hmac
 import logging
 
-from amplium import GRID_HANDLER
+from flask import request
+
+from amplium import ADMISSION, CONFIG, DRAIN, GRID_HANDLER, RELOADER, TENANTS
+from amplium.api.exceptions import AdminForbiddenException
 
 logger = logging.getLogger(__name__)
 
+ADMIN_TOKEN_HEADER = 'X-Amplium-Admin-Token'
+
+
+def check_admin_access():
+    """
+    Makes sure the client may use the admin endpoints.
+    :raises AdminForbiddenException: If the client's address isn't allowed, or it didn't send the admin token.
+    """
+    allowed_addresses = CONFIG.admin['allowed_addresses']
+    if allowed_addresses and request.remote_addr not in allowed_addresses:
+        logger.warning("Refused admin request %s from %s", request.path, request.remote_addr)
+        raise AdminForbiddenException("Address {0} may not administer Amplium".format(request.remote_addr))
+
+    token = CONFIG.admin['token']
+    if token and not hmac.compare_digest(request.headers.get(ADMIN_TOKEN_HEADER, ''), token):
+        logger.warning("Refused admin request %s without a valid token", request.path)
+        raise AdminForbiddenException("A valid {0} header is required".format(ADMIN_TOKEN_HEADER))
+
 
 def get_status():
     """Handler for the status path"""
     data = GRID_HANDLER.get_grid_info()
-    data_packet = {"status": "OK", "nodes": data}
+    data_packet = {
+        "status": "OK",
+        "nodes": data,
+        "forecast": GRID_HANDLER.forecaster.to_dict(),
+        "admission": ADMISSION.to_dict(),
+        "tenants": TENANTS.to_dict(),
+        "drain": DRAIN.to_dict()
+    }
     status_code = 200
+    # Load balancers stop sending requests to a draining Amplium once its status fails
+    if DRAIN.draining:
+        data_packet["status"] = "DRAINING"
+        status_code = 503
     return data_packet, status_code
+
+
+def drain(options=None):
+    """Handler for taking Amplium out of service"""
+    check_admin_access()
+    DRAIN.drain_in_background((options or {}).get('deadline'))
+    return {"status": "OK", "drain": DRAIN.to_dict()}, 202
+
+
+def reload_config():
+    """Handler for applying a changed config file"""
+    check_admin_access()
+    changed = RELOADER.reload()
+    return {"status": "OK", "changed": changed}, 200
@@ -1,54 +1,262 @@
 """Handler for the proxying to selenium grids"""
 
 import logging
+import time
 
 import requests
+from flask import Response, has_request_context, request
 
-from amplium import SESSION, GRID_HANDLER
+from amplium import (
+    ADMISSION, BATCH_CREATE_EXECUTOR, BULK_EXECUTOR, COMPRESSION, DRAIN, SESSION, GRID_HANDLER,
+    LARGE_PAYLOADS, NODE_ROUTER, REQUEST_LOGGER, REUSE_POOL, SESSION_INFO, SESSION_POOL, TENANTS, WEBSOCKETS
+)
+from amplium.api.exceptions import AmpliumException
+from amplium.utils import json_codec
+from amplium.utils.command_batch import check_command, is_error, resolve_path, resolve_references
+from amplium.utils.grid_handler import get_capabilities, get_session_id, set_session_id
+from amplium.utils.grid_stats import SESSION_OPERATION, COMMAND_OPERATION
+from amplium.utils.tenants import TENANT_HEADER
 
 logger = logging.getLogger(__name__)
 
+# Statuses that indicate the hub itself failed, rather than the WebDriver command
+GRID_ERROR_STATUSES = (502, 503, 504)
+JSON_HEADERS = {'Content-Type': json_codec.MIMETYPE, 'Accept-Encoding': 'gzip, deflate'}
 
+
+def is_grid_error(response):
+    """Whether a proxied response shows the grid itself failed, rather than the WebDriver command"""
+    return response.status_code in GRID_ERROR_STATUSES
+
+
+def get_error_status(error):
+    """Status of a request to a hub that failed, a gateway error if the hub didn't respond at all"""
+    if error.response is not None:
+        return error.response.status_code
+    return 504 if isinstance(error, requests.Timeout) else 502
+
+
+@ADMISSION.admit('sessions', is_overloaded=is_grid_error)
 def create_session(new_session):
     """Handler for creating a new session"""
-    grid_url = GRID_HANDLER.get_base_url(new_session)
+    DRAIN.check_accepting_sessions()
+    capabilities = get_capabilities(new_session)
+    tenant = TENANTS.get_tenant(capabilities, get_request_header(TENANT_HEADER))
+    priority = TENANTS.get_priority(capabilities, tenant)
+    TENANTS.reserve(tenant)
+    try:
+        GRID_HANDLER.forecaster.record_arrival()
+        response = REUSE_POOL.acquire(new_session) or SESSION_POOL.acquire(new_session)
+        if response is None:
+            with TENANTS.waiting(priority):
+                grid_url = GRID_HANDLER.get_base_url(new_session, priority=priority)
+            response = start_session(new_session, grid_url)
+    except Exception:
+        TENANTS.release(tenant)
+        raise
+
+    if isinstance(response, tuple):
+        # The hub failed, and its status tells admission control that the grids are overloaded
+        TENANTS.release(tenant)
+        return json_response(response)
+    TENANTS.session_started(get_session_id(response), tenant)
+    WEBSOCKETS.rewrite_urls(response)
+    REUSE_POOL.track(new_session, response)
+    track_session_started(new_session, response)
+    return json_response(response)
+
+
+@ADMISSION.admit('sessions')
+def create_sessions(sessions):
+    """Handler for creating a batch of sessions with the same capabilities"""
+    DRAIN.check_accepting_sessions()
+    new_session = sessions['session']
+    count = sessions['count']
+    capabilities = get_capabilities(new_session)
+    tenant = TENANTS.get_tenant(capabilities, get_request_header(TENANT_HEADER))
+    priority = TENANTS.get_priority(capabilities, tenant)
+    TENANTS.reserve(tenant, count)
+    results = []
+    try:
+        GRID_HANDLER.forecaster.record_arrival(count)
+
+        while len(results) < count:
+            pooled_response = REUSE_POOL.acquire(new_session) or SESSION_POOL.acquire(new_session)
+            if pooled_response is None:
+                break
+            results.append(pooled_response)
+
+        # Place as much of the batch as possible at once, the rest waits for capacity like single sessions do
+        grid_urls = GRID_HANDLER.plan_base_urls(new_session, count - len(results), priority=priority)
+        grid_urls += [None] * (count - len(results) - len(grid_urls))
 
-    url = '{0}/wd/hub/session'.format(grid_url)
+        results.extend(BATCH_CREATE_EXECUTOR.map(
+            lambda grid_url: start_batch_session(new_session, grid_url, priority),
+            grid_urls
+        ))
+    except Exception as exception:
+        if not results:
+            TENANTS.release(tenant, count)
+            raise
+        # Sessions that started are handed out rather than leaked, the rest report the error
+        logger.exception("Unable to create the rest of a batch of sessions")
+        results += [get_batch_error(exception)] * (count - len(results))
+
+    for response in results:
+        TENANTS.session_started(get_session_id(response), tenant)
+        WEBSOCKETS.rewrite_urls(response)
+        REUSE_POOL.track(new_session, response)
+        track_session_started(new_session, response)
+    return json_response({'status': 'OK', 'value': results})
+
+
+def delete_sessions(sessions):
+    """Handler for deleting a batch of sessions concurrently"""
+    results = BULK_EXECUTOR.map(delete_batch_session, sessions['sessionIds'])
+    return json_response({'status': 'OK', 'value': list(results)})
+
+
+def start_session(new_session, grid_url):
+    """
+    Starts a session on a grid.
+    :param new_session: Dictionary representing the request for the new session
+    :param grid_url: The base URL of the grid to start the session on.
+    :return: The grid's response, with the session id replaced by Amplium's, or a tuple of an error
+             response and its status code if the grid failed.
+    """
+    url = '{0}/session'.format(GRID_HANDLER.get_webdriver_url(grid_url))
+    start = time.monotonic()
     response = send_request('POST', data=new_session, url=url)
-    session_id = response.get('sessionId')
+    if isinstance(response, tuple):
+        GRID_HANDLER.stats.record(grid_url, SESSION_OPERATION, time.monotonic() - start, error=True)
+        return response
+    session_id = get_session_id(response)
+    GRID_HANDLER.stats.record(grid_url, SESSION_OPERATION, time.monotonic() - start, error=session_id is None)
 
     if session_id is not None:
-        response['sessionId'] = GRID_HANDLER.generate_session_id(session_id, grid_url)
+        set_session_id(response, GRID_HANDLER.generate_session_id(session_id, grid_url))
     return response
 
 
+def start_batch_session(new_session, grid_url, priority):
+    """
+    Starts one session of a batch, reporting errors in its result rather than failing the whole batch.
+    :param new_session: Dictionary representing the request for the new session
+    :param grid_url: The base URL of the grid planned for the session, or None to wait for one.
+    :param priority: Index of the batch's priority class.
+    :return: The grid's response, or an error response.
+    """
+    try:
+        if grid_url is None:
+            with TENANTS.waiting(priority):
+                grid_url = GRID_HANDLER.get_base_url(new_session, priority=priority)
+        response = start_session(new_session, grid_url)
+    except (AmpliumException, requests.RequestException, ValueError) as exception:
+        logger.exception("Unable to create session of batch")
+        return get_batch_error(exception)
+    return response[0] if isinstance(response, tuple) else response
+
+
+def get_batch_error(exception):
+    """
+    Reports why one session of a batch failed, in the result of that session.
+    :param exception: The exception the session failed with.
+    :return: The error response.
+    """
+    if isinstance(exception, AmpliumException):
+        return {'status': 'ERROR', 'value': exception.error, **exception.details}
+    return {'status': 'ERROR', 'value': 'AMPLIUM_GRID_ERROR'}
+
+
+def delete_batch_session(session_id):
+    """
+    Deletes one session of a batch, reporting errors in its result rather than failing the whole batch.
+    :param session_id: Amplium's id of the session.
+    :return: The grid's response, or an error response, with the session's id.
+    """
+    GRID_HANDLER.forecaster.session_ended(session_id)
+    TENANTS.session_ended(session_id)
+    if REUSE_POOL.release(session_id):
+        return {'sessionId': session_id, 'status': 0, 'value': None}
+    NODE_ROUTER.forget(session_id)
+    SESSION_INFO.invalidate(session_id)
+    try:
+        response = send_request('DELETE', session_id)
+    except KeyError:
+        response = {'status': 'ERROR', 'value': 'AMPLIUM_UNKNOWN_SESSION'}
+    except (requests.RequestException, ValueError) as exception:
+        logger.exception("Unable to delete session %s of batch", session_id)
+        response = get_batch_error(exception)
+    if isinstance(response, tuple):
+        response = response[0]
+    return dict(response, sessionId=session_id)
+
+
 def delete_session(session_id):
     """Handler for deleting an existing session"""
+    GRID_HANDLER.forecaster.session_ended(session_id)
+    TENANTS.session_ended(session_id)
+    if REUSE_POOL.release(session_id):
+        return json_response({'sessionId': session_id, 'status': 0, 'value': None})
+    # Sessions are always deleted through the hub, so that it frees the session's slot
+    NODE_ROUTER.forget(session_id)
+    SESSION_INFO.invalidate(session_id)
     response = send_request('DELETE', session_id)
-    return response
+    return json_response(response)
 
 
+@ADMISSION.admit('commands', is_overloaded=is_grid_error)
 def get_command(session_id, command):
     """Handler for executing a GET command"""
+    if LARGE_PAYLOADS.is_large(command):
+        return send_large_request('GET', session_id, command)
     response = send_request('GET', session_id, command)
-    return response
+    return json_response(response)
 
 
+@ADMISSION.admit('commands', is_overloaded=is_grid_error)
 def post_command(session_id, command, command_params):
     """Handler for executing a POST command with parameters"""
+    if LARGE_PAYLOADS.is_large(command):
+        return send_large_request('POST', session_id, command, request.get_data())
     response = send_request('POST', session_id, command, command_params)
-    return response
+    return json_response(response)
 
 
+@ADMISSION.admit('commands', is_overloaded=is_grid_error)
 def delete_command(session_id, command):
     """Handler for executing a DELETE command"""
     response = send_request('DELETE', session_id, command)
-    return response
+    return json_response(response)
 
 
-def get_session_info(session_id):
+@ADMISSION.admit('commands', is_overloaded=is_grid_error)
+def batch_commands(session_id, batch):
+    """
+    Handler for running a batch of commands on a session, one after another. Commands can refer to the
+    values returned by earlier commands, and the batch stops at the first command that fails.
+    """
+    results = []
+    for index, step in enumerate(batch['commands']):
+        command = resolve_path(step['command'], results).strip('/')
+        check_command(command)
+        params = resolve_references(step.get('params'), results)
+        if step['method'] == 'POST' and params is None:
+            params = {}
+
+        response = send_request(step['method'], session_id, command, params)
+        failed = is_error(response)
+        results.append(response[0] if isinstance(response, tuple) else response)
+        if failed:
+            return json_response({'status': 'ERROR', 'value': results, 'failedCommand': index})
+    return json_response({'status': 'OK', 'value': results})
+
+
+@ADMISSION.admit('commands', is_overloaded=is_grid_error)
+def get_session_info(session_id, refresh=False):
     """Retrieve an info about a specific session by executing
     GET /grid/api/testsession?session={session_id}
+    The info is cached until the session is deleted, refresh looks up inactivityTime on the hub again.
     returns: dict()
     Example of return data:
     {
@@ -60,31 +268,231 @@ def get_session_info(session_id):
         "success": true
     }
     """
-    session_id, url_ = GRID_HANDLER.unroll_session_id(session_id)
-    url_ = "{}/grid/api/testsession?session={}".format(url_, session_id)
-    response = send_request('GET', session_id, url=url_)
-    return response
+    try:
+        response = SESSION_INFO.get(session_id, refresh=refresh)
+    except (requests.RequestException, ValueError):
+        logger.exception("Error while looking up session %s", session_id)
+        return json_response(({'status': 502, 'message': 'Error occurred while proxying'}, 502))
+    return json_response(response)
 
 
 def send_request(method, session_id=None, command=None, data=None, url=None):
-    """Does request call based on command and given url"""
+    """
+    Does request call based on command and given url.
+    :return: The decoded response, or a tuple of an error response and the status code to pass on if the
+             hub failed or couldn't be reached.
+    """
+    if url is None:
+        TENANTS.session_used(session_id)
+    if url is None and command is not None:
+        response = send_node_request(method, session_id, command, data)
+        if response is not None:
+            return response
 
+    grid_url = None
     if url is None:
-        session_id, url = GRID_HANDLER.unroll_session_id(session_id)
-        url += "/wd/hub/session/{0}".format(session_id)
-        if command is not None:
-            url += "/{0}".format(command)
+        session_id, grid_url, url = get_command_url(session_id, command)
 
-    logger.info("%s | Sent %s request to (%s) with data: %s", session_id, method, url, data)
+    is_logged = REQUEST_LOGGER.log_request(session_id, method, url, command, data)
 
+    start = time.monotonic()
     try:
         # Attempts to send request to the given url
-        response = SESSION.request(method=method, url=url, json=data)
-        logger.info("%s | Received from (%s) with response: %s", session_id, url, response.text)
-        return response.json()
+        response = SESSION.request(
+            method=method,
+            url=url,
+            data=json_codec.dumps(data) if data is not None else None,
+            headers=JSON_HEADERS
+        )
+        if grid_url is not None:
+            GRID_HANDLER.stats.record(
+                grid_url,
+                COMMAND_OPERATION,
+                time.monotonic() - start,
+                error=response.status_code in GRID_ERROR_STATUSES
+            )
+        if is_logged:
+            REQUEST_LOGGER.log_response(session_id, url, command, response)
+        body = json_codec.loads(response.content)
     except (requests.HTTPError, requests.Timeout, requests.ConnectionError) as error:
         logger.exception("Error while handling request")
+        if grid_url is not None:
+            GRID_HANDLER.stats.record(grid_url, COMMAND_OPERATION, time.monotonic() - start, error=True)
         return (
-            {'status': error.response.status_code, 'message': 'Error occurred while proxying'},
-            error.response.status_code
+            {'status': get_error_status(error), 'message': 'Error occurred while proxying'},
+            get_error_status(error)
+        )
+    except ValueError:
+        # Whatever is in front of a failing hub, such as a load balancer, may answer with an HTML error page
+        logger.exception("Unable to decode the response to %s", url)
+        status = response.status_code if response.status_code in GRID_ERROR_STATUSES else 502
+        return {'status': status, 'message': 'Error occurred while proxying'}, status
+
+    if response.status_code in GRID_ERROR_STATUSES:
+        return body, response.status_code
+    return body
+
+
+def send_node_request(method, session_id, command, data=None):
+    """
+    Sends a command straight to the node running a session, if the node is known.
+    :param method: The HTTP method of the command.
+    :param session_id: Amplium's id of the session.
+    :param command: The WebDriver command, relative to the session.
+    :param data: The command's parameters.
+    :return: The node's decoded response, or None if the command should be sent through the hub instead.
+    """
+    url = NODE_ROUTER.get_command_url(session_id, command)
+    if url is None:
+        return None
+
+    is_logged = REQUEST_LOGGER.log_request(session_id, method, url, command, data)
+    try:
+        response = SESSION.request(
+            method=method,
+            url=url,
+            data=json_codec.dumps(data) if data is not None else None,
+            headers=JSON_HEADERS
         )
+    except requests.ConnectionError:
+        logger.exception("Unable to reach the node running session %s, falling back to its hub", session_id)
+        NODE_ROUTER.forget(session_id)
+        return None
+    if response.status_code in GRID_ERROR_STATUSES:
+        logger.warning("Node running session %s failed with %d, falling back to its hub", session_id,
+                       response.status_code)
+        NODE_ROUTER.forget(session_id)
+        return None
+
+    if is_logged:
+        REQUEST_LOGGER.log_response(session_id, url, command, response)
+    try:
+        return json_codec.loads(response.content)
+    except ValueError:
+        # The node ran the command already, so it isn't sent again through the hub
+        logger.exception("Unable to decode the response of the node running session %s", session_id)
+        NODE_ROUTER.forget(session_id)
+        return {'status': 502, 'message': 'Error occurred while proxying'}, 502
+
+
+def send_large_request(method, session_id, command, body=None):
+    """
+    Proxies a command with a large payload without decoding it. The request body is streamed to the hub
+    from the raw request, and the response is spooled and streamed back to the client with the hub's status.
+    Bodies the hub compressed are passed through as they are if the client accepts their encoding.
+    """
+    TENANTS.session_used(session_id)
+    session_id, grid_url, url = get_command_url(session_id, command)
+    accept_encoding = get_accept_encoding()
+    is_logged = REQUEST_LOGGER.log_request(session_id, method, url, command, body)
+
+    start = time.monotonic()
+    try:
+        response = SESSION.request(
+            method=method,
+            url=url,
+            data=LARGE_PAYLOADS.iter_chunks(body) if body else None,
+            headers=JSON_HEADERS,
+            stream=True
+        )
+        encoding = COMPRESSION.negotiate(accept_encoding, preferred=response.headers.get('Content-Encoding'))
+        is_compressed = encoding is not None and encoding == response.headers.get('Content-Encoding')
+        spool, size = LARGE_PAYLOADS.spool(response, decode_content=not is_compressed)
+    except (requests.HTTPError, requests.Timeout, requests.ConnectionError) as error:
+        logger.exception("Error while handling request")
+        GRID_HANDLER.stats.record(grid_url, COMMAND_OPERATION, time.monotonic() - start, error=True)
+        return json_response((
+            {'status': get_error_status(error), 'message': 'Error occurred while proxying'},
+            get_error_status(error)
+        ))
+
+    GRID_HANDLER.stats.record(
+        grid_url,
+        COMMAND_OPERATION,
+        time.monotonic() - start,
+        error=response.status_code in GRID_ERROR_STATUSES
+    )
+    if is_logged:
+        REQUEST_LOGGER.log_response(session_id, url, command, response, streamed=True)
+
+    return stream_response(spool, size, response.status_code, encoding, is_compressed)
+
+
+def stream_response(spool, size, status, encoding, is_compressed):
+    """
+    Streams a spooled response body to the client.
+    :param spool: The spooled body.
+    :param size: Size of the spooled body in bytes.
+    :param status: The status code to respond with.
+    :param encoding: The encoding negotiated with the client, or None to send the body uncompressed.
+    :param is_compressed: Whether the spooled body is already compressed with the negotiated encoding.
+    :return: The Flask response to return to the client.
+    """
+    body = LARGE_PAYLOADS.stream(spool)
+    headers = {}
+    if is_compressed:
+        headers['Content-Encoding'] = encoding
+        headers['Content-Length'] = str(size)
+    elif encoding is not None and size >= COMPRESSION.min_size:
+        # The compressed size isn't known until the whole body has been compressed, so it is sent chunked
+        body = COMPRESSION.compress_stream(body, encoding)
+        headers['Content-Encoding'] = encoding
+    else:
+        headers['Content-Length'] = str(size)
+    return Response(
+        body,
+        status=status,
+        headers=headers,
+        mimetype=json_codec.MIMETYPE,
+        direct_passthrough=True
+    )
+
+
+def track_session_started(new_session, response):
+    """Tells the forecaster and the node router about a session handed to a client, if one was"""
+    session_id = get_session_id(response)
+    if session_id is not None:
+        GRID_HANDLER.forecaster.session_started(session_id, get_capabilities(new_session))
+        NODE_ROUTER.resolve(session_id)
+
+
+def get_command_url(session_id, command=None):
+    """
+    Builds the hub URL of a command from an Amplium session id.
+    :return: Tuple of the hub's session id, the grid's base URL and the command's URL.
+    """
+    session_id, grid_url = GRID_HANDLER.unroll_session_id(session_id)
+    url = GRID_HANDLER.get_webdriver_url(grid_url) + "/session/{0}".format(session_id)
+    if command is not None:
+        url += "/{0}".format(command)
+    return session_id, grid_url, url
+
+
+def json_response(response):
+    """
+    Encodes the result of a proxied request with the configured JSON backend.
+    :param response: Decoded response body, or a tuple of the body and a status code.
+    :return: The Flask response to return to the client.
+    """
+    status = 200
+    if isinstance(response, tuple):
+        response, status = response
+
+    body = json_codec.dumps(response)
+    headers = {}
+    if len(body) >= COMPRESSION.min_size:
+        encoding = COMPRESSION.negotiate(get_accept_encoding())
+        if encoding is not None:
+            body = COMPRESSION.compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+    return Response(response=body, status=status, headers=headers, mimetype=json_codec.MIMETYPE)
+
+
+def get_accept_encoding():
+    """Gets the encodings accepted by the client, if there is one"""
+    return get_request_header('Accept-Encoding')
+
+
+def get_request_header(name):
+    """Gets a header of the client's request, if there is one"""
+    return request.headers.get(name) if has_request_context() else None
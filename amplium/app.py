@@ -9,7 +9,7 @@ patch_all(logging=True)
 
 import connexion
 
-from amplium import DISCOVERY
+from amplium import DRAIN, RELOADER, REMOTE_GRIDS, REUSE_POOL, SESSION_POOL, STATE_SNAPSHOT
 from amplium.api.exception_handlers import handle_amplium_exception, handle_unknown_exception
 from amplium.api.exceptions import AmpliumException
 
@@ -23,9 +23,20 @@ app.add_api(
     arguments={'title': 'Amplium API'}
 )
 
+# Sessions created before a restart can be routed before discovery has reconnected
+STATE_SNAPSHOT.load()
+
 app.add_error_handler(AmpliumException, handle_amplium_exception)
 app.add_error_handler(Exception, handle_unknown_exception)
-app.app.before_first_request(DISCOVERY.start_listening)
+app.app.before_first_request(RELOADER.start_discovery)
+app.app.before_first_request(REMOTE_GRIDS.start_listening)
+app.app.before_first_request(SESSION_POOL.start_listening)
+app.app.before_first_request(REUSE_POOL.start_listening)
+app.app.before_first_request(STATE_SNAPSHOT.start_listening)
+app.app.before_request(DRAIN.request_started)
+app.app.teardown_request(DRAIN.request_finished)
+DRAIN.install_signal_handler()
+RELOADER.install_signal_handler()
 
 # Expose application var for WSGI support
 application = app.app
@@ -1,10 +1,59 @@
 """Module for parsing Amplium's config file"""
+import copy
 import os
 import logging
 import yaml
 
 from schema import Schema, Use, And, Optional
 
+PLACEMENT_STRATEGIES = (
+    'least_queue', 'power_of_two', 'weighted_round_robin', 'bin_packing', 'latency_aware', 'forecast'
+)
+REMOTE_GRID_TYPES = ('selenium', 'amplium', 'browserstack')
+# Settings each type of remote grid can't do without
+REMOTE_GRID_REQUIRED_KEYS = {
+    'selenium': ('url',),
+    'amplium': ('url',),
+    'browserstack': ('username', 'accesskey')
+}
+
+# Session creation includes waiting for capacity, so only failures shrink its limit
+SESSION_LIMITER_DEFAULTS = {
+    "initial_limit": 50,
+    "min_limit": 5,
+    "max_limit": 200,
+    "latency_tolerance": 0.0,
+    "backoff_ratio": 0.9,
+    "latency_alpha": 0.05
+}
+COMMAND_LIMITER_DEFAULTS = {
+    "initial_limit": 200,
+    "min_limit": 20,
+    "max_limit": 1000,
+    "latency_tolerance": 2.0,
+    "backoff_ratio": 0.9,
+    "latency_alpha": 0.05
+}
+
+
+def limiter_schema(defaults):
+    """Builds the schema of a concurrency limiter's configuration, with the limiter's own defaults"""
+    return {
+        Optional("initial_limit", default=defaults["initial_limit"]): And(Use(int), lambda limit: limit > 0),
+        Optional("min_limit", default=defaults["min_limit"]): And(Use(int), lambda limit: limit > 0),
+        Optional("max_limit", default=defaults["max_limit"]): And(Use(int), lambda limit: limit > 0),
+        Optional("latency_tolerance", default=defaults["latency_tolerance"]): Use(float),
+        Optional("backoff_ratio", default=defaults["backoff_ratio"]): And(
+            Use(float),
+            lambda ratio: 0 < ratio < 1
+        ),
+        Optional("latency_alpha", default=defaults["latency_alpha"]): And(
+            Use(float),
+            lambda alpha: 0 < alpha <= 1
+        )
+    }
+
+
 SCHEMA_CONFIG = Schema(
     {
         Optional("zookeeper"): {
@@ -65,13 +114,196 @@ SCHEMA_CONFIG = Schema(
             Optional("saucelabs"): {
                 "username": Use(str),
                 "accesskey": Use(str),
+                Optional("api_url", default="https://saucelabs.com"): Use(str),
+                Optional("cache_ttl", default=5.0): Use(float),
+                Optional("idle_timeout", default=60.0): Use(float),
+                Optional("cost_weight", default=1.0): Use(float),
             },
             Optional("datadog"): {
                 "api_key": Use(str),
                 "app_key": Use(str)
             }
         },
-        Optional("session_queue_time", default=60 * 3): Use(int)
+        Optional("session_queue_time", default=60 * 3): Use(int),
+        Optional("placement", default={"strategy": "least_queue", "error_penalty": 10.0}): {
+            Optional("strategy", default="least_queue"): And(
+                Use(str),
+                lambda s: s in PLACEMENT_STRATEGIES,
+                error="Placement strategy must be one of: %s" % ", ".join(PLACEMENT_STRATEGIES)
+            ),
+            Optional("error_penalty", default=10.0): Use(float)
+        },
+        Optional("affinity", default={
+            "enabled": False,
+            "use_tracekey": True,
+            "load_factor": 1.25,
+            "virtual_nodes": 100
+        }): {
+            Optional("enabled", default=False): Use(bool),
+            Optional("use_tracekey", default=True): Use(bool),
+            Optional("load_factor", default=1.25): And(Use(float), lambda f: f >= 1.0),
+            Optional("virtual_nodes", default=100): And(Use(int), lambda n: n > 0)
+        },
+        Optional("zones", default={
+            "enabled": False,
+            "metadata_key": "zone",
+            "local_zone": "",
+            "min_local_capacity": 1
+        }): {
+            Optional("enabled", default=False): Use(bool),
+            Optional("metadata_key", default="zone"): Use(str),
+            Optional("local_zone", default=""): Use(str),
+            Optional("min_local_capacity", default=1): Use(int)
+        },
+        Optional("request_logging", default={
+            "max_body_length": 1000,
+            "sample_rate": 1.0,
+            "suppressed_commands": ["screenshot", "se/file"],
+            "structured": False
+        }): {
+            Optional("max_body_length", default=1000): Use(int),
+            Optional("sample_rate", default=1.0): Use(float),
+            Optional("suppressed_commands", default=["screenshot", "se/file"]): [Use(str)],
+            Optional("structured", default=False): bool
+        },
+        Optional("large_payloads", default={
+            "commands": ["screenshot", "se/file"],
+            "spool_threshold": 1024 * 1024,
+            "chunk_size": 64 * 1024
+        }): {
+            Optional("commands", default=["screenshot", "se/file"]): [Use(str)],
+            Optional("spool_threshold", default=1024 * 1024): Use(int),
+            Optional("chunk_size", default=64 * 1024): Use(int)
+        },
+        Optional("compression", default={"enabled": True, "min_size": 1024, "level": 6}): {
+            Optional("enabled", default=True): bool,
+            Optional("min_size", default=1024): Use(int),
+            Optional("level", default=6): And(Use(int), lambda level: 0 <= level <= 9)
+        },
+        Optional("bulk", default={"workers": 16, "create_workers": 16}): {
+            Optional("workers", default=16): And(Use(int), lambda workers: workers > 0),
+            Optional("create_workers", default=16): And(Use(int), lambda workers: workers > 0)
+        },
+        Optional("session_pool", default={"profiles": [], "idle_timeout": 240, "refresh_interval": 5}): {
+            Optional("profiles", default=[]): [
+                {
+                    "name": Use(str),
+                    "capabilities": dict,
+                    Optional("size", default=1): Use(int)
+                }
+            ],
+            Optional("idle_timeout", default=240): Use(float),
+            Optional("refresh_interval", default=5): Use(float)
+        },
+        Optional("reuse", default={
+            "max_uses": 50,
+            "max_idle": 20,
+            "idle_timeout": 240,
+            "refresh_interval": 10
+        }): {
+            Optional("max_uses", default=50): Use(int),
+            Optional("max_idle", default=20): Use(int),
+            Optional("idle_timeout", default=240): Use(float),
+            Optional("refresh_interval", default=10): Use(float)
+        },
+        Optional("session_info", default={"max_sessions": 10000}): {
+            Optional("max_sessions", default=10000): Use(int)
+        },
+        Optional("node_routing", default={"enabled": False, "hub_touch_interval": 60, "max_routes": 10000}): {
+            Optional("enabled", default=False): bool,
+            Optional("hub_touch_interval", default=60): Use(float),
+            Optional("max_routes", default=10000): Use(int)
+        },
+        Optional("snapshot", default={"path": "", "interval": 10, "max_age": 600}): {
+            Optional("path", default=""): Use(str),
+            Optional("interval", default=10): Use(float),
+            Optional("max_age", default=600): Use(float)
+        },
+        Optional("drain", default={"deadline": 30, "retry_after": 5}): {
+            Optional("deadline", default=30): And(Use(float), lambda d: d >= 0),
+            Optional("retry_after", default=5): Use(float)
+        },
+        Optional("admin", default={"allowed_addresses": ["127.0.0.1", "::1"], "token": ""}): {
+            Optional("allowed_addresses", default=["127.0.0.1", "::1"]): [Use(str)],
+            Optional("token", default=""): Use(str)
+        },
+        Optional("websockets", default={
+            "public_url": "",
+            "port": 8082,
+            "heartbeat": 30,
+            "max_message_size": 16 * 1024 * 1024,
+            "max_connections": 10000
+        }): {
+            Optional("public_url", default=""): And(Use(str), Use(lambda url: url.rstrip('/'))),
+            Optional("port", default=8082): And(
+                Use(int),
+                lambda n: 1 <= n <= 65535,
+                error="Port must be an integer between 1 and 65535"
+            ),
+            Optional("heartbeat", default=30): Use(float),
+            Optional("max_message_size", default=16 * 1024 * 1024): Use(int),
+            Optional("max_connections", default=10000): Use(int)
+        },
+        Optional("admission", default={
+            "enabled": False,
+            "retry_after": 1,
+            "sessions": SESSION_LIMITER_DEFAULTS,
+            "commands": COMMAND_LIMITER_DEFAULTS
+        }): {
+            Optional("enabled", default=False): bool,
+            Optional("retry_after", default=1): Use(float),
+            Optional("sessions", default=SESSION_LIMITER_DEFAULTS): limiter_schema(SESSION_LIMITER_DEFAULTS),
+            Optional("commands", default=COMMAND_LIMITER_DEFAULTS): limiter_schema(COMMAND_LIMITER_DEFAULTS)
+        },
+        Optional("tenants", default={
+            "default_quota": 0,
+            "quotas": {},
+            "priorities": ["interactive", "ci", "nightly"],
+            "default_priority": "ci",
+            "tenant_priorities": {},
+            "session_timeout": 1800
+        }): {
+            Optional("default_quota", default=0): Use(int),
+            Optional("quotas", default={}): {Optional(str): Use(int)},
+            Optional("priorities", default=["interactive", "ci", "nightly"]): And([Use(str)], len),
+            Optional("default_priority", default="ci"): Use(str),
+            Optional("tenant_priorities", default={}): {Optional(str): Use(str)},
+            Optional("session_timeout", default=1800): And(Use(float), lambda timeout: timeout > 0)
+        },
+        Optional("remote_grids", default=[]): [
+            And(
+                {
+                    "name": Use(str),
+                    "type": And(
+                        Use(str),
+                        lambda s: s in REMOTE_GRID_TYPES,
+                        error="Remote grid type must be one of: %s" % ", ".join(REMOTE_GRID_TYPES)
+                    ),
+                    Optional("url"): Use(str),
+                    Optional("username"): Use(str),
+                    Optional("accesskey"): Use(str),
+                    Optional("api_url"): Use(str),
+                    Optional("cache_ttl", default=5.0): Use(float),
+                    Optional("idle_timeout", default=60.0): Use(float),
+                    Optional("cost_weight", default=1.0): Use(float)
+                },
+                lambda grid: all(key in grid for key in REMOTE_GRID_REQUIRED_KEYS[grid["type"]]),
+                error="Selenium and amplium remote grids need a url, browserstack a username and accesskey"
+            )
+        ],
+        Optional("overflow", default={
+            "enabled": False,
+            "queue_wait_threshold": 30,
+            "queue_length_threshold": 0,
+            "max_predicted_wait": 0,
+            "browsers": []
+        }): {
+            Optional("enabled", default=False): bool,
+            Optional("queue_wait_threshold", default=30): Use(int),
+            Optional("queue_length_threshold", default=0): Use(int),
+            Optional("max_predicted_wait", default=0): Use(float),
+            Optional("browsers", default=[]): [Use(str)]
+        }
     },
     ignore_extra_keys=True
 )
@@ -87,9 +319,14 @@ class Config:
 
     def __init__(self, config=None):
         logging.basicConfig(level=logging.DEBUG)
+        self._config = self._validate_config(config or self._read_config_file())
+
+    @staticmethod
+    def _read_config_file():
+        """Reads the config file named by the environment, or the default one"""
         config_path = os.getenv(ENVVAR_CONFIG_PATH, DEFAULT_CONFIG_PATH)
 
-        if not config and not os.path.isfile(config_path):
+        if not os.path.isfile(config_path):
             raise Exception(
                 'No config provided. Please set environment variable {0} with /path/'
                 'to/amplium_config.yml or use the default path: {1}'.format(
@@ -98,9 +335,32 @@ class Config:
                 )
             )
 
-        config = config or yaml.safe_load(open(config_path))
+        return yaml.safe_load(open(config_path))
 
-        self._config = self._validate_config(config)
+    def reload(self, config=None):
+        """
+        Re-reads the config file and applies it, keeping the current configuration if it is invalid. Sections
+        are updated in place, so that classes holding on to a section see its new settings.
+        :param config: The new configuration, instead of reading the config file.
+        :return: Names of the sections that changed.
+        :raises SchemaError: If the new configuration is invalid.
+        """
+        new_config = self._validate_config(config or self._read_config_file())
+        changed = []
+        for name in set(self._config) | set(new_config):
+            current, new = self._config.get(name), new_config.get(name)
+            if current == new:
+                continue
+            changed.append(name)
+            if isinstance(current, dict) and isinstance(new, dict):
+                current.clear()
+                current.update(new)
+            elif name in new_config:
+                self._config[name] = new
+            else:
+                del self._config[name]
+        logger.info('Reloaded configuration, changed sections: %s', ', '.join(sorted(changed)) or 'none')
+        return sorted(changed)
 
     @property
     def zookeeper(self):
@@ -132,9 +392,105 @@ class Config:
         """Dictionary containing integrations configuration"""
         return self._config.get('session_queue_time')
 
+    @property
+    def placement(self):
+        """Dictionary containing placement configuration"""
+        return self._config.get('placement')
+
+    @property
+    def affinity(self):
+        """Dictionary containing configuration for placing the sessions of a build together"""
+        return self._config.get('affinity')
+
+    @property
+    def zones(self):
+        """Dictionary containing configuration for zone aware placement"""
+        return self._config.get('zones')
+
+    @property
+    def request_logging(self):
+        """Dictionary containing configuration for logging proxied requests"""
+        return self._config.get('request_logging')
+
+    @property
+    def large_payloads(self):
+        """Dictionary containing configuration for passing large payloads through as bytes"""
+        return self._config.get('large_payloads')
+
+    @property
+    def compression(self):
+        """Dictionary containing configuration for compressing responses to clients"""
+        return self._config.get('compression')
+
+    @property
+    def bulk(self):
+        """Dictionary containing configuration for the bulk session endpoints"""
+        return self._config.get('bulk')
+
+    @property
+    def session_pool(self):
+        """Dictionary containing configuration for the pool of pre-created sessions"""
+        return self._config.get('session_pool')
+
+    @property
+    def reuse(self):
+        """Dictionary containing configuration for reusing sessions across tests"""
+        return self._config.get('reuse')
+
+    @property
+    def session_info(self):
+        """Dictionary containing configuration for the cache of what the hubs report about each session"""
+        return self._config.get('session_info')
+
+    @property
+    def node_routing(self):
+        """Dictionary containing configuration for sending commands straight to the nodes"""
+        return self._config.get('node_routing')
+
+    @property
+    def snapshot(self):
+        """Dictionary containing configuration for persisting the routing state across restarts"""
+        return self._config.get('snapshot')
+
+    @property
+    def drain(self):
+        """Dictionary containing configuration for taking Amplium out of service"""
+        return self._config.get('drain')
+
+    @property
+    def admin(self):
+        """Dictionary containing configuration for who may use the admin endpoints"""
+        return self._config.get('admin')
+
+    @property
+    def websockets(self):
+        """Dictionary containing configuration for forwarding the WebSocket channels of sessions"""
+        return self._config.get('websockets')
+
+    @property
+    def admission(self):
+        """Dictionary containing configuration for limiting the requests in flight"""
+        return self._config.get('admission')
+
+    @property
+    def tenants(self):
+        """Dictionary containing configuration for tenant quotas and priority classes"""
+        return self._config.get('tenants')
+
+    @property
+    def remote_grids(self):
+        """List of remote grid configurations"""
+        return self._config.get('remote_grids')
+
+    @property
+    def overflow(self):
+        """Dictionary containing overflow configuration"""
+        return self._config.get('overflow')
+
     def _validate_config(self, config):
         """Convenience function for validating a testillery config after it is parsed"""
         # Checks if integrations is included in the config
         if config.get('integrations') is None:
             config['integrations'] = {}
-        return SCHEMA_CONFIG.validate(config)
+        # The defaults of missing sections are the schema's own objects, which reload() updates in place
+        return copy.deepcopy(SCHEMA_CONFIG.validate(config))
@@ -1,6 +1,6 @@
 """Helpful dataclasses to make the rest of the program more type safe"""
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 
 @dataclass
@@ -9,3 +9,5 @@ class GridNodeData:
     name: Optional[str]
     host: str
     port: int
+    # Anything else discovery knows about the node, such as its datacenter or zone
+    metadata: Dict[str, str] = field(default_factory=dict)
@@ -0,0 +1,10 @@
+"""Dataclass for the node a session's commands can be sent to directly"""
+from dataclasses import dataclass
+
+
+@dataclass
+class NodeRoute:
+    """Represents the Selenium Grid node running a session"""
+    session_id: str
+    node_url: str
+    hub_contact: float
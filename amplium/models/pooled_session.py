@@ -0,0 +1,15 @@
+"""Dataclass for sessions Amplium holds on to until a client claims them"""
+from dataclasses import dataclass
+from typing import Dict
+
+
+@dataclass
+class PooledSession:
+    """Represents an idle session held in a pool"""
+    session_id: str
+    grid_url: str
+    response: Dict
+    idle_since: float
+    uses: int = 1
+    # Whether the client deleted the session, so that deleting it again doesn't recycle it twice
+    released: bool = False
@@ -0,0 +1,32 @@
+"""Base class that different placement strategies will extend"""
+from abc import ABC, abstractmethod
+
+from typing import Dict, List, Optional
+
+
+class AbstractPlacementStrategy(ABC):
+    """Base class that different placement strategies will extend"""
+
+    def __init__(self, config, stats, forecaster=None):
+        self.config = config
+        self.stats = stats
+        self.forecaster = forecaster
+
+    @abstractmethod
+    def select(self, grids: List[Dict], session_request: Optional[Dict] = None) -> Dict:
+        """
+        Chooses the grid a new session should be placed on.
+        :param grids: Capacity snapshot, as returned by get_grid_info, of the grids with available capacity.
+        :param session_request: Dictionary representing the request for a new session.
+        :return: One of the given grids.
+        """
+
+    # pylint: disable=unused-argument
+    def select_when_full(self, grids: List[Dict], session_request: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Chooses a grid to queue a new session on when no grid has available capacity.
+        :param grids: Capacity snapshot, as returned by get_grid_info, of all grids.
+        :param session_request: Dictionary representing the request for a new session.
+        :return: One of the given grids, or None to keep waiting for capacity in Amplium.
+        """
+        return None
@@ -0,0 +1,79 @@
+"""Placement strategy that keeps the sessions of a build on the same grids"""
+import bisect
+import hashlib
+import math
+import threading
+from typing import Dict, List, Optional
+
+from amplium.placement.abstract_placement import AbstractPlacementStrategy
+from amplium.utils.grid_handler import get_capabilities
+from amplium.utils.tracekey import client_tracekey
+from amplium.utils.utils import format_url
+
+BUILD_ID_CAPABILITY = 'amplium:buildId'
+
+
+def hash_key(key: str) -> int:
+    """Position of a key on the hash ring"""
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class AffinityStrategy(AbstractPlacementStrategy):
+    """
+    Places the sessions of a build on the same grids, so that its shards share warm browser caches and
+    downloaded extensions. The build is named by the 'amplium:buildId' capability, or else by the first
+    segment of the client's X_WGEN_TRACEKEY. Grids are chosen by consistent hashing with bounded load: the
+    first grid after the build on the hash ring with fewer sessions than 'load_factor' times its fair share,
+    in proportion to its capacity. Sessions without a build are placed by the wrapped strategy.
+    """
+
+    def __init__(self, config, stats, strategy, forecaster=None):
+        super().__init__(config, stats, forecaster)
+        self.strategy = strategy
+        self._ring = ((), [], [])
+        self._lock = threading.Lock()
+
+    def get_build_id(self, session_request: Optional[Dict] = None) -> Optional[str]:
+        """Build a new session belongs to, if the client named one"""
+        build_id = get_capabilities(session_request or {}).get(BUILD_ID_CAPABILITY)
+        if build_id is None and self.config.affinity['use_tracekey']:
+            build_id = (client_tracekey() or '').split('/')[0] or None
+        return build_id
+
+    def _get_ring(self, grid_urls: List[str]):
+        """Hash ring of the given grids, rebuilt only when they change"""
+        urls = tuple(sorted(grid_urls))
+        with self._lock:
+            if self._ring[0] == urls:
+                return self._ring
+            points = sorted(
+                (hash_key('{0}#{1}'.format(url, replica)), url)
+                for url in urls
+                for replica in range(self.config.affinity['virtual_nodes'])
+            )
+            self._ring = (urls, [point for point, _ in points], [url for _, url in points])
+            return self._ring
+
+    def select(self, grids: List[Dict], session_request: Optional[Dict] = None) -> Dict:
+        build_id = self.get_build_id(session_request)
+        if build_id is None:
+            return self.strategy.select(grids, session_request)
+
+        by_url = {format_url(grid['host'], grid['port']): grid for grid in grids}
+        _, points, urls = self._get_ring(list(by_url))
+
+        total = sum(grid['total_capacity'] for grid in grids)
+        used = sum(grid['total_capacity'] - grid['available_capacity'] for grid in grids)
+        # Counting the new session in the fair share lets an idle build start on its own grid
+        bound = self.config.affinity['load_factor'] * (used + 1) / max(total, 1)
+
+        start = bisect.bisect(points, hash_key(build_id))
+        for index in range(len(points)):
+            grid = by_url[urls[(start + index) % len(points)]]
+            grid_used = grid['total_capacity'] - grid['available_capacity']
+            if grid_used + 1 <= math.ceil(bound * grid['total_capacity']):
+                return grid
+        return self.strategy.select(grids, session_request)
+
+    def select_when_full(self, grids: List[Dict], session_request: Optional[Dict] = None) -> Optional[Dict]:
+        return self.strategy.select_when_full(grids, session_request)
@@ -0,0 +1,19 @@
+"""Placement strategy that fills grids before spilling onto the next one"""
+from amplium.placement.least_queue import LeastQueueStrategy
+
+
+class BinPackingStrategy(LeastQueueStrategy):
+    """Places sessions on the fullest grid that still has capacity, so idle grids can be scaled down"""
+
+    def compare_node(self, node1, node2):
+        """Sorts nodes based on lowest available capacity, lowest queue and highest total capacity"""
+        compare_available = node1['available_capacity'] - node2['available_capacity']
+        if compare_available != 0:
+            return compare_available
+
+        compare_queue = node1['queue'] - node2['queue']
+        if compare_queue != 0:
+            return compare_queue
+
+        # Note the inversion, because we want the LARGEST total capacity
+        return node2['total_capacity'] - node1['total_capacity']
@@ -0,0 +1,26 @@
+"""Placement strategy that queues sessions on the grid expected to free a slot soonest"""
+from typing import Dict, List, Optional
+
+from amplium.placement.least_queue import LeastQueueStrategy
+from amplium.utils.grid_handler import get_capabilities
+
+
+class ForecastStrategy(LeastQueueStrategy):
+    """
+    Places sessions like least_queue while grids have capacity. Once every grid is full, rather than waiting
+    in Amplium, the session is queued on the grid the forecaster expects to free a slot soonest, as long as
+    that is within the session queue time.
+    """
+
+    def select_when_full(self, grids: List[Dict], session_request: Optional[Dict] = None) -> Optional[Dict]:
+        browser = get_capabilities(session_request or {}).get('browserName')
+        predictions = [
+            (self.forecaster.predict_wait(grid, browser, grids=len(grids)), grid)
+            for grid in grids
+        ]
+        predictions = [(wait, grid) for wait, grid in predictions if wait is not None]
+        if not predictions:
+            return None
+
+        wait, grid = min(predictions, key=lambda prediction: prediction[0])
+        return grid if wait <= self.config.session_queue_time else None
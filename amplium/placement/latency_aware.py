@@ -0,0 +1,27 @@
+"""Placement strategy that penalizes grids that are slow or failing to create sessions"""
+from amplium.placement.least_queue import LeastQueueStrategy
+from amplium.utils.grid_stats import SESSION_OPERATION
+from amplium.utils.utils import format_url
+
+
+class LatencyAwareStrategy(LeastQueueStrategy):
+    """Places sessions on the grid with the lowest queue, then the lowest rolling session creation latency"""
+
+    def compare_node(self, node1, node2):
+        """Sorts nodes based on lowest queue, then lowest latency penalized by error rate"""
+        compare_queue = node1['queue'] - node2['queue']
+        if compare_queue != 0:
+            return compare_queue
+
+        compare_latency = self._latency_score(node1) - self._latency_score(node2)
+        if compare_latency != 0:
+            return -1 if compare_latency < 0 else 1
+
+        return super().compare_node(node1, node2)
+
+    def _latency_score(self, node):
+        """Rolling session creation latency of a node, with failures counted as a fixed penalty"""
+        url = format_url(node['host'], node['port'])
+        latency = self.stats.get_latency(url, SESSION_OPERATION)
+        error_rate = self.stats.get_error_rate(url, SESSION_OPERATION)
+        return latency + error_rate * self.config.placement['error_penalty']
@@ -0,0 +1,26 @@
+"""Placement strategy that prefers the grid with the shortest queue"""
+from typing import Dict, List, Optional
+
+from amplium.placement.abstract_placement import AbstractPlacementStrategy
+from amplium.utils.utils import cmp_to_key
+
+
+class LeastQueueStrategy(AbstractPlacementStrategy):
+    """Places sessions on the grid with the lowest queue, highest total and lowest available capacity"""
+
+    def select(self, grids: List[Dict], session_request: Optional[Dict] = None) -> Dict:
+        return min(grids, key=cmp_to_key(self.compare_node))
+
+    def compare_node(self, node1, node2):
+        """Sorts nodes based on lowest queue,highest total, and lowest available capacity"""
+        compare_queue = node1['queue'] - node2['queue']
+        if compare_queue != 0:
+            return compare_queue
+
+        compare_total = node1['total_capacity'] - node2['total_capacity']
+        if compare_total != 0:
+            # Note the inversion, because we want the LARGEST total capacity
+            return -compare_total
+
+        compare_available = node1['available_capacity'] - node2['available_capacity']
+        return compare_available
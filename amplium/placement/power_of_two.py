@@ -0,0 +1,17 @@
+"""Placement strategy that samples two random grids and picks the better one"""
+import random
+from typing import Dict, List, Optional
+
+from amplium.placement.least_queue import LeastQueueStrategy
+
+
+class PowerOfTwoStrategy(LeastQueueStrategy):
+    """
+    Places sessions using power-of-two-choices: two grids are sampled at random and the one with the lower
+    queue wins. This avoids every Amplium instance stampeding the same "best" grid at once.
+    """
+
+    def select(self, grids: List[Dict], session_request: Optional[Dict] = None) -> Dict:
+        if len(grids) > 2:
+            grids = random.sample(grids, 2)
+        return super().select(grids, session_request)
@@ -0,0 +1,32 @@
+"""Placement strategy that rotates through grids proportionally to their size"""
+import threading
+from typing import Dict, List, Optional
+
+from amplium.placement.abstract_placement import AbstractPlacementStrategy
+from amplium.utils.utils import format_url
+
+
+class WeightedRoundRobinStrategy(AbstractPlacementStrategy):
+    """Places sessions using smooth weighted round-robin, weighted by each grid's total capacity"""
+
+    def __init__(self, config, stats, forecaster=None):
+        super().__init__(config, stats, forecaster)
+        self._lock = threading.Lock()
+        self._current_weights: Dict[str, int] = {}
+
+    def select(self, grids: List[Dict], session_request: Optional[Dict] = None) -> Dict:
+        with self._lock:
+            # Forget grids that have disappeared or filled up so they don't come back with a stale weight
+            urls = [format_url(grid['host'], grid['port']) for grid in grids]
+            self._current_weights = {url: self._current_weights.get(url, 0) for url in urls}
+
+            total_weight = 0
+            for url, grid in zip(urls, grids):
+                weight = max(grid['total_capacity'], 1)
+                self._current_weights[url] += weight
+                total_weight += weight
+
+            selected_url = max(urls, key=self._current_weights.__getitem__)
+            self._current_weights[selected_url] -= total_weight
+
+        return grids[urls.index(selected_url)]
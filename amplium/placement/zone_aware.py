@@ -0,0 +1,50 @@
+"""Placement strategy that keeps sessions in the same zone as their client"""
+from typing import Dict, List, Optional
+
+from amplium.placement.abstract_placement import AbstractPlacementStrategy
+from amplium.utils.grid_handler import get_capabilities
+
+ZONE_CAPABILITY = 'amplium:zone'
+
+
+class ZoneAwareStrategy(AbstractPlacementStrategy):
+    """
+    Narrows the grids another strategy chooses from to those in the preferred zone, which is the zone asked
+    for with the 'amplium:zone' capability or else the zone of this Amplium instance. Grids in other zones
+    are only used once the preferred zone has fewer than 'min_local_capacity' available slots. The zone of a
+    grid is read from the discovery metadata key 'metadata_key'.
+    """
+
+    def __init__(self, config, stats, strategy, forecaster=None):
+        super().__init__(config, stats, forecaster)
+        self.strategy = strategy
+
+    def get_zone(self, grid: Dict) -> Optional[str]:
+        """Zone a grid is in, according to discovery"""
+        return grid.get('metadata', {}).get(self.config.zones['metadata_key'])
+
+    def get_preferred_zone(self, session_request: Optional[Dict] = None) -> Optional[str]:
+        """Zone a new session should preferably be placed in"""
+        requested_zone = get_capabilities(session_request or {}).get(ZONE_CAPABILITY)
+        return requested_zone or self.config.zones['local_zone'] or None
+
+    def _get_local_grids(self, grids: List[Dict], session_request: Optional[Dict]) -> List[Dict]:
+        """The grids in the preferred zone"""
+        zone = self.get_preferred_zone(session_request)
+        if zone is None:
+            return []
+        return [grid for grid in grids if self.get_zone(grid) == zone]
+
+    def select(self, grids: List[Dict], session_request: Optional[Dict] = None) -> Dict:
+        local_grids = self._get_local_grids(grids, session_request)
+        local_capacity = sum(grid['available_capacity'] for grid in local_grids)
+        if local_grids and local_capacity >= self.config.zones['min_local_capacity']:
+            return self.strategy.select(local_grids, session_request)
+        return self.strategy.select(grids, session_request)
+
+    def select_when_full(self, grids: List[Dict], session_request: Optional[Dict] = None) -> Optional[Dict]:
+        # Queueing in the preferred zone is worth more than queueing anywhere
+        local_grids = self._get_local_grids(grids, session_request)
+        return (
+            local_grids and self.strategy.select_when_full(local_grids, session_request)
+        ) or self.strategy.select_when_full(grids, session_request)
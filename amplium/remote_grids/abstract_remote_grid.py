@@ -0,0 +1,141 @@
+"""Base class that different remote grid providers will extend"""
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from amplium.api.exceptions import NoAvailableCapacityException
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEBDRIVER_PATH = '/wd/hub'
+
+
+class AbstractRemoteGrid(ABC):
+    """
+    Base class that different remote grid providers will extend. The provider's capacity is cached for
+    'cache_ttl' seconds, and sessions dispatched to the provider are counted against the cached capacity
+    until the next refresh. The capacity is refreshed in the background while it is in use, and only when it
+    is next needed once it hasn't been used for 'idle_timeout' seconds, so that idle providers aren't polled.
+    """
+    # Path under the provider's URL that serves the WebDriver API
+    webdriver_path = DEFAULT_WEBDRIVER_PATH
+
+    def __init__(self, config, session):
+        self.config = config
+        self.session = session
+        self._lock = threading.Lock()
+        self._capacity = None
+        self._fetched_at = 0.0
+        self._used_at = None
+        self._reservations = 0
+        self._stopped = threading.Event()
+
+    def get_config(self):
+        """Dictionary containing the provider's configuration"""
+        return self.config
+
+    @property
+    def name(self):
+        """Unique name of the provider, used to request it in capabilities"""
+        return self.get_config()['name']
+
+    @abstractmethod
+    def get_url(self):
+        """Base URL that sessions on this provider should be sent to"""
+
+    @abstractmethod
+    def _get_available_capacity(self):
+        """Requests the number of sessions the provider can currently start"""
+
+    @property
+    def cost_weight(self):
+        """Relative cost of running a session on this provider, lower is preferred"""
+        return self.get_config().get('cost_weight', 1.0)
+
+    def start_listening(self):
+        """Start refreshing the cached capacity in the background"""
+        # Start the refresh in a separate thread because it loops forever
+        thread = threading.Thread(target=self._refresh_forever, daemon=True)
+        thread.start()
+
+    def _refresh_forever(self):
+        """Refresh the cached capacity before it expires, while it is in use"""
+        while not self._stopped.is_set():
+            if self.is_in_use():
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception('Error refreshing capacity of remote grid %s', self.name)
+            self._stopped.wait(self.get_config().get('cache_ttl', 5.0) / 2)
+
+    def is_in_use(self):
+        """Whether the capacity was needed within the idle timeout"""
+        with self._lock:
+            return self._used_at is not None and (
+                time.monotonic() - self._used_at < self.get_config().get('idle_timeout', 60.0)
+            )
+
+    def stop(self):
+        """Stop refreshing the cached capacity, once the remote grid has been removed"""
+        self._stopped.set()
+
+    def refresh(self):
+        """Fetch the current capacity from the provider and replace the cached value"""
+        capacity = self._get_available_capacity()
+
+        with self._lock:
+            self._capacity = capacity
+            self._fetched_at = time.monotonic()
+            # The fresh usage from the provider already includes the sessions we reserved
+            self._reservations = 0
+
+    def get_available_capacity(self):
+        """
+        Gets the number of sessions the provider can currently start. Uses the cached capacity if it is
+        still fresh, minus any sessions dispatched to the provider since it was fetched.
+        :return: The number of available sessions.
+        """
+        cache_ttl = self.get_config().get('cache_ttl', 0)
+
+        with self._lock:
+            self._used_at = time.monotonic()
+            is_stale = self._capacity is None or self._used_at - self._fetched_at >= cache_ttl
+
+        if is_stale:
+            self.refresh()
+
+        with self._lock:
+            return self._capacity - self._reservations
+
+    def is_available(self):
+        """
+        Convenience function for checking whether the provider has available capacity.
+        :return: True if the provider has available capacity, false otherwise.
+        """
+        return self.get_available_capacity() > 0
+
+    def reserve(self):
+        """
+        Optimistically count a session against the cached capacity until the next refresh, so that
+        sessions dispatched between refreshes don't oversubscribe the provider.
+        """
+        with self._lock:
+            self._reservations += 1
+
+    def acquire_url(self):
+        """
+        Reserves a session on the provider.
+        :return: The URL the session should be sent to.
+        """
+        # Refreshes the cached capacity if it is stale, which is a request, so it happens outside the lock
+        self.get_available_capacity()
+
+        # Concurrent session requests mustn't all see the same free capacity before any of them reserves it
+        with self._lock:
+            is_reserved = self._capacity - self._reservations > 0
+            if is_reserved:
+                self._reservations += 1
+        if is_reserved:
+            return self.get_url()
+        raise NoAvailableCapacityException("Remote grid {0} has no available capacity.".format(self.name))
@@ -0,0 +1,27 @@
+"""Handles another Amplium cluster as a remote grid"""
+from amplium.api.exceptions import AmpliumException
+from amplium.remote_grids.abstract_remote_grid import AbstractRemoteGrid
+
+
+class AmpliumGrid(AbstractRemoteGrid):
+    """Sends sessions to another Amplium cluster, so that clusters in different regions can share load"""
+    webdriver_path = '/proxy'
+
+    def get_url(self):
+        return self.config['url']
+
+    def _get_available_capacity(self):
+        """
+        Requests the status of the other Amplium cluster.
+        :return: The number of sessions available across all of its grids.
+        """
+        response = self.session.get(self.config['url'] + "/status")
+
+        if response.status_code != 200:
+            raise AmpliumException(
+                message="Error communicating with Amplium {0}".format(self.name),
+                error="AMPLIUM_REMOTE_GRID_ERROR",
+                status_code=500
+            )
+
+        return sum(node['available_capacity'] for node in response.json()['nodes'])
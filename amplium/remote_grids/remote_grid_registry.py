@@ -0,0 +1,83 @@
+"""Registry of the remote grids sessions can be sent to besides the discovered Selenium Grid Hubs"""
+import logging
+from typing import Dict, List
+
+from amplium.api.exceptions import IntegrationNotConfigured, NoAvailableCapacityException
+from amplium.remote_grids.abstract_remote_grid import AbstractRemoteGrid, DEFAULT_WEBDRIVER_PATH
+from amplium.utils.utils import is_truthy
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteGridRegistry:
+    """Registry of the remote grids sessions can be sent to besides the discovered Selenium Grid Hubs"""
+
+    def __init__(self, remote_grids: List[AbstractRemoteGrid]):
+        self.remote_grids = {remote_grid.name: remote_grid for remote_grid in remote_grids}
+
+    def register(self, remote_grid: AbstractRemoteGrid):
+        """Adds a remote grid to the registry"""
+        self.remote_grids[remote_grid.name] = remote_grid
+
+    def replace(self, remote_grids: List[AbstractRemoteGrid]):
+        """
+        Replaces every remote grid, such as when the configuration is reloaded. The new remote grids have to
+        be started with start_listening(), the old ones are stopped.
+        :param remote_grids: The remote grids to use from now on.
+        """
+        old_remote_grids = self.remote_grids
+        self.remote_grids = {remote_grid.name: remote_grid for remote_grid in remote_grids}
+        for remote_grid in old_remote_grids.values():
+            remote_grid.stop()
+
+    def start_listening(self):
+        """Start refreshing the capacity of every remote grid in the background"""
+        for remote_grid in self.remote_grids.values():
+            remote_grid.start_listening()
+
+    def get_requested(self, capabilities: Dict):
+        """
+        Finds the remote grid a capabilities dictionary asks for, via 'amplium:remoteGrid' or the legacy
+        'amplium:useSauceLabs'.
+        :param capabilities: Dictionary of capabilities.
+        :return: The requested remote grid, or None if no remote grid was requested.
+        """
+        name = capabilities.get('amplium:remoteGrid')
+        if not name and is_truthy(str(capabilities.get('amplium:useSauceLabs', False))):
+            name = 'saucelabs'
+
+        if not name:
+            return None
+
+        if name not in self.remote_grids:
+            raise IntegrationNotConfigured(
+                "Attempted to use remote grid {0}, but it is not configured.".format(name)
+            )
+        return self.remote_grids[name]
+
+    def acquire_overflow_url(self):
+        """
+        Reserves a session on the cheapest remote grid with available capacity.
+        :return: The URL the session should be sent to.
+        """
+        for remote_grid in sorted(self.remote_grids.values(), key=lambda grid: grid.cost_weight):
+            try:
+                return remote_grid.acquire_url()
+            except NoAvailableCapacityException:
+                logger.debug("Remote grid %s has no available capacity", remote_grid.name)
+        raise NoAvailableCapacityException("No available capacity on any remote grid")
+
+    def get_urls(self):
+        """List of the base URLs of every remote grid"""
+        return [remote_grid.get_url() for remote_grid in self.remote_grids.values()]
+
+    def get_webdriver_path(self, url):
+        """
+        Gets the path that serves the WebDriver API for a grid.
+        :param url: The base URL of a Selenium Grid Hub or remote grid.
+        :return: The WebDriver path, '/wd/hub' unless the URL belongs to a remote grid that overrides it.
+        """
+        for remote_grid in self.remote_grids.values():
+            if remote_grid.get_url() == url:
+                return remote_grid.webdriver_path
+        return DEFAULT_WEBDRIVER_PATH
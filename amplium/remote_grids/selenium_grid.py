@@ -0,0 +1,27 @@
+"""Handles another Selenium Grid Hub as a remote grid"""
+from amplium.api.exceptions import AmpliumException
+from amplium.remote_grids.abstract_remote_grid import AbstractRemoteGrid
+
+
+class SeleniumGrid(AbstractRemoteGrid):
+    """Sends sessions to a Selenium Grid Hub outside of service discovery, e.g. in another region"""
+
+    def get_url(self):
+        return self.config['url']
+
+    def _get_available_capacity(self):
+        """
+        Requests the free slots of the hub.
+        :return: The number of sessions the hub can currently start.
+        """
+        response = self.session.get(self.config['url'] + "/grid/api/hub")
+
+        if response.status_code != 200:
+            raise AmpliumException(
+                message="Error communicating with Selenium Grid {0}".format(self.name),
+                error="AMPLIUM_REMOTE_GRID_ERROR",
+                status_code=500
+            )
+
+        hub = response.json()
+        return hub['slotCounts']['free'] - hub['newSessionRequestCount']
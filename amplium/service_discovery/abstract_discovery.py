@@ -17,3 +17,6 @@ class AbstractDiscovery(ABC):
     @abstractmethod
     def start_listening(self):
         """Start polling the backend for node data"""
+
+    def stop(self):
+        """Stop polling the backend, once this discovery has been replaced by another"""
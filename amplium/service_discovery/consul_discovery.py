@@ -21,6 +21,7 @@ class ConsulGridNodeStatus(AbstractDiscovery):
         self.service_name = service_name
         self.nodes = []
         self.consul = consul.Consul(self.host, self.port)
+        self._stopped = threading.Event()
 
     def start_listening(self):
         # Start a watch in a separate thread because it loops forever
@@ -31,7 +32,7 @@ class ConsulGridNodeStatus(AbstractDiscovery):
         """Start polling consul for catalog updates"""
         index = None
         logger.info('Starting to watch for changes to consul service %s', self.service_name)
-        while True:
+        while not self._stopped.is_set():
             try:
                 index, data = self.consul.catalog.service(
                     self.service_name,
@@ -54,6 +55,10 @@ class ConsulGridNodeStatus(AbstractDiscovery):
                 # sleep for a few seconds so we don't end up in a tight infinite loop
                 sleep(5)
 
+    def stop(self):
+        # The watch stops once its current query returns
+        self._stopped.set()
+
     def _is_node_healthy(self, node: str):
         _, node_health_checks = self.consul.health.node(node)
         for check in node_health_checks:
@@ -69,5 +74,6 @@ class ConsulGridNodeStatus(AbstractDiscovery):
         return GridNodeData(
             host=node['Address'],
             port=node['ServicePort'],
-            name=node['Node']
+            name=node['Node'],
+            metadata={**(node.get('NodeMeta') or {}), **(node.get('ServiceMeta') or {})}
         )
@@ -32,6 +32,9 @@ class ZookeeperGridNodeStatus(AbstractDiscovery):
         self.zookeeper.start()
         ChildrenWatch(self.zookeeper, self.nerve_directory, self.get_nodes)
 
+    def stop(self):
+        self.zookeeper.stop()
+
     def get_nodes(self, children: List[str] = None):
         """
         Gets the data for the grid nodes.
@@ -53,11 +56,16 @@ class ZookeeperGridNodeStatus(AbstractDiscovery):
         """Gets host, port, and name from the grid node"""
         child_directory = "{0}/{1}".format(self.nerve_directory, grid_node)
         child_data = self.zookeeper.retry(self.zookeeper.get, child_directory)
-        # Gets host, port, and name
+        # Gets host, port, and name, anything else nerve registered is kept as metadata
         data = json.loads(child_data[0])
+        metadata = {
+            key: value for key, value in data.items() if key not in ('host', 'port', 'name', 'labels')
+        }
+        metadata.update(data.get('labels') or {})
 
         return GridNodeData(
             host=data.get('host'),
             port=data.get('port'),
-            name=data.get('name')
+            name=data.get('name'),
+            metadata=metadata
         )
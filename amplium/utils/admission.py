@@ -0,0 +1,143 @@
+"""Classes for limiting how many requests Amplium proxies at once"""
+import functools
+import logging
+import threading
+import time
+
+import requests
+
+from amplium.api.exceptions import AmpliumException, OverloadedException
+
+logger = logging.getLogger(__name__)
+
+
+def is_overload_error(error):
+    """Whether a handler failed because the grids failed or couldn't be reached, rather than the request"""
+    if isinstance(error, requests.RequestException):
+        return True
+    return isinstance(error, AmpliumException) and error.status_code >= 500
+
+
+class AdaptiveLimiter:
+    """
+    Limits the requests in flight with an additive increase, multiplicative decrease (AIMD) limit. The limit
+    grows by one for every request that succeeds while the limit is in use, and shrinks by 'backoff_ratio'
+    for every request the grids failed with an overload status, or that took more than 'latency_tolerance'
+    times the usual latency. A latency tolerance of 0 only reacts to failures.
+    """
+
+    def __init__(self, name, config):
+        self.name = name
+        self.config = config
+        self.limit = float(config['initial_limit'])
+        self.in_flight = 0
+        self.baseline = None
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """
+        Claims a slot for a request.
+        :return: Whether the request was admitted, if so release() must be called when it is done.
+        """
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, duration, overloaded=False):
+        """
+        Frees the slot of a request and adapts the limit to how the request went.
+        :param duration: How long the request took, in seconds.
+        :param overloaded: Whether the grids failed the request because they are overloaded.
+        """
+        with self._lock:
+            in_use = self.in_flight >= self.limit / 2
+            self.in_flight -= 1
+
+            tolerance = self.config['latency_tolerance']
+            is_slow = tolerance > 0 and self.baseline is not None and duration > self.baseline * tolerance
+            if overloaded or is_slow:
+                self.limit = max(self.config['min_limit'], self.limit * self.config['backoff_ratio'])
+                return
+
+            # Only requests the grids handled well make up the usual latency, so it doesn't drift upwards
+            if self.baseline is None:
+                self.baseline = duration
+            else:
+                self.baseline += self.config['latency_alpha'] * (duration - self.baseline)
+            # Growing the limit while most of it is unused would let it grow without bound
+            if in_use:
+                self.limit = min(self.config['max_limit'], self.limit + 1)
+
+    def to_dict(self):
+        """Returns the current state of the limiter as a dictionary"""
+        return {
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'baseline_latency': round(self.baseline or 0.0, 4)
+        }
+
+
+class AdmissionController:
+    """
+    Sheds requests with a 503 and a Retry-After header once too many are in flight, instead of letting them
+    queue for a worker. Session creation and in-session commands are limited separately, so that a storm of
+    new sessions can't starve the tests that are already running.
+    """
+
+    def __init__(self, config, datadog):
+        self.config = config
+        self.datadog = datadog
+        self.sessions = AdaptiveLimiter('sessions', config['sessions'])
+        self.commands = AdaptiveLimiter('commands', config['commands'])
+
+    def admit(self, limiter_name, is_overloaded=lambda response: False):
+        """
+        Decorates a handler so that it is only run if its limiter has room.
+        :param limiter_name: Either 'sessions' or 'commands'.
+        :param is_overloaded: Function telling whether the handler's response shows the grids are overloaded.
+                              Handlers that raise are overloaded if the grids failed or couldn't be reached.
+        :return: The decorator.
+        """
+        def decorator(handler):
+            @functools.wraps(handler)
+            def wrapper(*args, **kwargs):
+                if not self.config['enabled']:
+                    return handler(*args, **kwargs)
+
+                limiter = getattr(self, limiter_name)
+                if not limiter.try_acquire():
+                    self._shed(limiter)
+
+                start = time.monotonic()
+                overloaded = False
+                try:
+                    response = handler(*args, **kwargs)
+                    overloaded = is_overloaded(response)
+                    return response
+                except Exception as error:
+                    overloaded = is_overload_error(error)
+                    raise
+                finally:
+                    limiter.release(time.monotonic() - start, overloaded)
+            return wrapper
+        return decorator
+
+    def _shed(self, limiter):
+        """Rejects a request because its limiter is full"""
+        logger.warning("Shedding request, %d %s requests are in flight", limiter.in_flight, limiter.name)
+        self.datadog.send(
+            metric='amplium.admission.shed',
+            metric_type='counter',
+            value=1,
+            tags=['limiter:{0}'.format(limiter.name)]
+        )
+        raise OverloadedException(
+            "Too many {0} requests in flight".format(limiter.name),
+            retry_after=self.config['retry_after']
+        )
+
+    def to_dict(self):
+        """Returns the current state of every limiter as a dictionary"""
+        return {'sessions': self.sessions.to_dict(), 'commands': self.commands.to_dict()}
@@ -0,0 +1,131 @@
+"""Class for forecasting when grids will have capacity for new sessions"""
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from amplium.utils.grid_stats import EwmaStat
+
+# Key of the duration of sessions of any browser
+ALL_BROWSERS = '*'
+
+
+class CapacityForecaster:
+    """
+    Forecasts how long a session request will wait for a slot on a grid, from the rate at which session
+    requests arrive and the rolling average duration of sessions per browser. Session requests waiting in
+    Amplium retry rather than being served in order, so when requests arrive faster than slots free up, the
+    ones arriving later compete for the same slots and the wait grows accordingly.
+    """
+
+    def __init__(self, alpha=0.2, max_active_sessions=10000):
+        self.alpha = alpha
+        self.max_active_sessions = max_active_sessions
+        self._lock = threading.Lock()
+        self._arrival_gap = EwmaStat(alpha)
+        self._last_arrival = None
+        self._durations = defaultdict(self._new_stat)
+        # Sessions that have started but not ended, oldest first, so abandoned sessions can be dropped
+        self._active = OrderedDict()
+
+    def _new_stat(self):
+        return EwmaStat(self.alpha)
+
+    def record_arrival(self, count=1):
+        """
+        Records session requests arriving at Amplium.
+        :param count: Number of session requests that arrived together.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._last_arrival is not None:
+                gap = (now - self._last_arrival) / count
+                for _ in range(count):
+                    self._arrival_gap.record(gap, False)
+            self._last_arrival = now
+
+    def session_started(self, session_id, capabilities):
+        """
+        Records a session being handed to a client.
+        :param session_id: Amplium's id of the session.
+        :param capabilities: Dictionary of the capabilities the session was requested with.
+        """
+        with self._lock:
+            self._active[session_id] = (capabilities.get('browserName') or ALL_BROWSERS, time.monotonic())
+            while len(self._active) > self.max_active_sessions:
+                self._active.popitem(last=False)
+
+    def session_ended(self, session_id):
+        """
+        Records a client deleting its session, folding its duration into the averages.
+        :param session_id: Amplium's id of the session.
+        """
+        with self._lock:
+            browser, started_at = self._active.pop(session_id, (None, None))
+            if browser is None:
+                return
+            duration = time.monotonic() - started_at
+            self._durations[browser].record(duration, False)
+            if browser != ALL_BROWSERS:
+                self._durations[ALL_BROWSERS].record(duration, False)
+
+    def get_arrival_rate(self):
+        """
+        Gets the rolling rate at which session requests arrive.
+        :return: Session requests per second, or None if too few have arrived to tell.
+        """
+        with self._lock:
+            if not self._arrival_gap.count or self._arrival_gap.latency <= 0:
+                return None
+            return 1 / self._arrival_gap.latency
+
+    def get_session_duration(self, browser=None):
+        """
+        Gets the rolling average duration of sessions.
+        :param browser: The browser to get the duration for, falling back to all browsers if it has no data.
+        :return: The duration in seconds, or None if no session has ended yet.
+        """
+        with self._lock:
+            for key in (browser, ALL_BROWSERS):
+                stat = self._durations.get(key)
+                if stat is not None and stat.count:
+                    return stat.latency
+        return None
+
+    def predict_wait(self, grid, browser=None, grids=1):
+        """
+        Predicts how long a new session request would wait for a slot on a grid.
+        :param grid: Capacity snapshot of the grid, as returned by get_grid_info.
+        :param browser: The browser the session request is for.
+        :param grids: Number of grids the session requests are spread across.
+        :return: The predicted wait in seconds, or None if it can't be predicted yet.
+        """
+        if grid['available_capacity'] > 0:
+            return 0.0
+
+        duration = self.get_session_duration(browser)
+        if duration is None or grid['total_capacity'] <= 0:
+            return None
+
+        # Slots free up at a rate of total / duration per second, and every queued request is served first
+        free_rate = grid['total_capacity'] / duration
+        wait = (grid['queue'] + 1) / free_rate
+
+        # Arrivals beyond the rate slots free up at grow the queue, taking their share of the freed slots
+        arrival_rate = self.get_arrival_rate()
+        if arrival_rate is not None:
+            wait *= max(1.0, arrival_rate / max(grids, 1) / free_rate)
+        return wait
+
+    def to_dict(self):
+        """Returns the current forecast inputs as a dictionary"""
+        arrival_rate = self.get_arrival_rate()
+        with self._lock:
+            durations = {
+                browser: round(stat.latency, 1) for browser, stat in self._durations.items() if stat.count
+            }
+            active_sessions = len(self._active)
+        return {
+            'arrival_rate': round(arrival_rate, 4) if arrival_rate is not None else None,
+            'session_durations': durations,
+            'active_sessions': active_sessions
+        }
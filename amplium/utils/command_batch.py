@@ -0,0 +1,115 @@
+"""Functions for running a batch of WebDriver commands, where commands can use earlier commands' results"""
+import re
+
+from amplium.api.exceptions import InvalidBatchException
+
+# '${2}' is replaced by the value returned by the third command of the batch, '${2.name}' by a field of it
+REFERENCE = re.compile(r'\$\{(\d+)((?:\.[^.}]+)*)\}')
+
+# Keys that identify a web element in the W3C protocol and in the legacy JSON wire protocol
+ELEMENT_KEYS = ('element-6066-11e4-a52e-4f735466cecf', 'ELEMENT')
+
+
+def resolve_references(obj, results):
+    """
+    Replaces the references to earlier results in a command's path or parameters.
+    A string that is a single reference is replaced by the referenced value as it is, such as an element to
+    pass to a script. References within a longer string, such as 'element/${0}/click', are replaced by the
+    id of the referenced element or the referenced value as text.
+    :param obj: The command's path or parameters.
+    :param results: The responses to the commands of the batch so far.
+    :return: The path or parameters with every reference replaced.
+    :raises InvalidBatchException: If a reference isn't to the value of an earlier command.
+    """
+    if isinstance(obj, dict):
+        return {key: resolve_references(value, results) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [resolve_references(value, results) for value in obj]
+    if not isinstance(obj, str):
+        return obj
+
+    match = REFERENCE.fullmatch(obj)
+    if match:
+        return _get_referenced_value(match, results)
+    return resolve_path(obj, results)
+
+
+def resolve_path(path, results):
+    """
+    Replaces the references to earlier results in a command's path. Unlike in parameters, a path that is a
+    single reference is still a path, so every reference is replaced by the id of the referenced element or
+    the referenced value as text.
+    :param path: The command's path.
+    :param results: The responses to the commands of the batch so far.
+    :return: The path with every reference replaced.
+    :raises InvalidBatchException: If a reference isn't to the value of an earlier command, or the value
+                                   can't be part of a path.
+    """
+    def format_segment(match):
+        value = _get_referenced_value(match, results)
+        if isinstance(value, (dict, list)) and _get_element_id(value) is None:
+            raise InvalidBatchException("{0} isn't an element or a value that can be in a path".format(
+                match.group(0)
+            ))
+        return _format_value(value)
+
+    if not isinstance(path, str):
+        raise InvalidBatchException("The command {0!r} isn't a path".format(path))
+    return REFERENCE.sub(format_segment, path)
+
+
+def check_command(command):
+    """
+    Makes sure a command of a batch runs within the session. Deleting the session itself would skip the
+    bookkeeping done when a session is deleted, so the session has to be deleted on its own.
+    :param command: The command's path, relative to the session, with its references replaced.
+    :raises InvalidBatchException: If the path is empty or has empty, '.' or '..' segments.
+    """
+    segments = command.split('/')
+    if any(segment in ('', '.', '..') for segment in segments):
+        raise InvalidBatchException("{0!r} isn't a command within the session".format(command))
+
+
+def _get_referenced_value(match, results):
+    """Looks up the value a reference points at"""
+    index = int(match.group(1))
+    if index >= len(results):
+        raise InvalidBatchException("{0} refers to a command that hasn't run yet".format(match.group(0)))
+
+    value = results[index].get('value')
+    for key in filter(None, match.group(2).split('.')):
+        try:
+            value = value[int(key) if isinstance(value, list) else key]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise InvalidBatchException(
+                "{0} isn't in the result of command {1}".format(match.group(0), index)
+            )
+    return value
+
+
+def _get_element_id(value):
+    """Gets the id of a referenced element, or None if the value isn't an element"""
+    if isinstance(value, dict):
+        for key in ELEMENT_KEYS:
+            if key in value:
+                return str(value[key])
+    return None
+
+
+def _format_value(value):
+    """Formats a referenced value for use within a string, such as a command's path"""
+    element_id = _get_element_id(value)
+    return element_id if element_id is not None else str(value)
+
+
+def is_error(response):
+    """
+    Checks whether a WebDriver command failed.
+    :param response: The decoded response to the command, or a tuple of it and the status code if Amplium
+                     couldn't proxy it.
+    :return: Whether the command failed in either the W3C protocol or the legacy JSON wire protocol.
+    """
+    if isinstance(response, tuple):
+        return True
+    value = response.get('value')
+    return response.get('status', 0) != 0 or (isinstance(value, dict) and 'error' in value)
@@ -0,0 +1,91 @@
+"""Negotiation and application of compressed response bodies between clients, Amplium and hubs"""
+import zlib
+
+# Window bits selecting the container zlib writes for each HTTP content coding
+ENCODINGS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS
+}
+
+
+def parse_accept_encoding(accept_encoding):
+    """
+    Parses an Accept-Encoding header.
+    :param accept_encoding: The header's value.
+    :return: Dictionary of content coding to its quality value.
+    """
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name] = quality
+    return qualities
+
+
+class CompressionHandler:
+    """Chooses and applies compression for response bodies sent to clients"""
+
+    def __init__(self, config):
+        self.config = config
+
+    @property
+    def min_size(self):
+        """Size in bytes below which bodies aren't worth compressing"""
+        return self.config['min_size']
+
+    def negotiate(self, accept_encoding, preferred=None):
+        """
+        Chooses the content coding to send a client.
+        :param accept_encoding: The client's Accept-Encoding header.
+        :param preferred: A coding to choose if the client accepts it, such as the one a body already has.
+        :return: 'gzip', 'deflate', or None if the body should not be compressed.
+        """
+        if not self.config['enabled'] or not accept_encoding:
+            return None
+
+        qualities = parse_accept_encoding(accept_encoding)
+        wildcard = qualities.get('*', 0.0)
+        accepted = [
+            encoding for encoding in ENCODINGS if qualities.get(encoding, wildcard) > 0
+        ]
+        if preferred in accepted:
+            return preferred
+        if not accepted:
+            return None
+        return max(accepted, key=lambda encoding: qualities.get(encoding, wildcard))
+
+    def _compressor(self, encoding):
+        return zlib.compressobj(self.config['level'], zlib.DEFLATED, ENCODINGS[encoding])
+
+    def compress(self, body, encoding):
+        """
+        Compresses a body.
+        :param body: The body to compress.
+        :param encoding: Either 'gzip' or 'deflate'.
+        :return: The compressed body.
+        """
+        compressor = self._compressor(encoding)
+        return compressor.compress(body) + compressor.flush()
+
+    def compress_stream(self, chunks, encoding):
+        """
+        Compresses a body as it is streamed.
+        :param chunks: Iterable of the body's chunks.
+        :param encoding: Either 'gzip' or 'deflate'.
+        :return: Generator of compressed chunks.
+        """
+        compressor = self._compressor(encoding)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
@@ -0,0 +1,94 @@
+"""Class for applying a changed config file without restarting Amplium"""
+import logging
+import logging.config
+import signal
+import threading
+
+from schema import SchemaError
+
+from amplium.api.exceptions import InvalidConfigException
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigReloader:
+    """
+    Applies a changed config file to a running process. Most classes read their section of the
+    configuration whenever they use it, so updating the sections in place is enough for them. Discovery,
+    the remote grids and the Datadog integration are rebuilt when their sections change, and logging is
+    reconfigured. The placement strategy, session pools and admission limits are only built at startup, so
+    changes to them need a restart.
+    """
+
+    def __init__(self, config, grid_handler, datadog, create_discovery, create_remote_grids):
+        self.config = config
+        self.grid_handler = grid_handler
+        self.datadog = datadog
+        self.create_discovery = create_discovery
+        self.create_remote_grids = create_remote_grids
+        self._discovery_started = False
+        self._lock = threading.Lock()
+
+    def start_discovery(self):
+        """Starts the current discovery, which is the one to start rather than the one Amplium started with"""
+        with self._lock:
+            if self._discovery_started:
+                return
+            # Only counts as started once it succeeds, so that the next request tries again
+            self.grid_handler.discovery.start_listening()
+            self._discovery_started = True
+
+    def reload(self):
+        """
+        Re-reads the config file and applies it.
+        :return: Names of the sections that changed.
+        :raises InvalidConfigException: If the config file is invalid, in which case nothing changes.
+        """
+        with self._lock:
+            try:
+                changed = self.config.reload()
+            except SchemaError as error:
+                raise InvalidConfigException("Invalid configuration: {0}".format(error))
+
+            if 'logging' in changed:
+                logging.config.dictConfig(self.config.logging)
+            if 'zookeeper' in changed or 'consul' in changed:
+                self._replace_discovery()
+            if 'remote_grids' in changed or 'integrations' in changed:
+                self.grid_handler.remote_grids.replace(self.create_remote_grids(self.config))
+                self.grid_handler.remote_grids.start_listening()
+            if 'integrations' in changed:
+                self.datadog.configure(self.config.integrations.get('datadog'))
+            return changed
+
+    def _replace_discovery(self):
+        """Starts discovery with the new configuration and stops the old one"""
+        old_discovery = self.grid_handler.discovery
+        discovery = self.create_discovery(self.config)
+        # Before the first request, start_discovery() starts the new discovery instead
+        if self._discovery_started:
+            discovery.start_listening()
+        # Keep routing to the grids known so far until the new discovery has found its own
+        if not discovery.nodes:
+            discovery.nodes = list(old_discovery.nodes)
+        self.grid_handler.discovery = discovery
+        old_discovery.stop()
+        logger.info("Replaced discovery with %s", type(discovery).__name__)
+
+    def install_signal_handler(self, signum=signal.SIGHUP):
+        """
+        Reloads the configuration when the process receives a signal.
+        :param signum: The signal to reload on.
+        """
+        # Signal handlers can only be installed from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        def reload():
+            try:
+                self.reload()
+            except Exception:
+                logger.exception("Unable to reload the configuration")
+
+        # Reloading connects to discovery, which shouldn't happen inside the signal handler
+        signal.signal(signum, lambda *_: threading.Thread(target=reload, daemon=True).start())
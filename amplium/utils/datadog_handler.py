@@ -22,8 +22,14 @@ class DatadogHandler:
 
     def __init__(self, config):
         self.identifier = str(uuid.uuid1())
+        self.configure(config)
 
-        # Initialize the datadog API if it was configured
+    @staticmethod
+    def configure(config):
+        """
+        Initializes the Datadog API if it was configured, also when the configuration is reloaded.
+        :param config: Dictionary of the Datadog API keys, or None if Datadog isn't configured.
+        """
         if config:
             initialize(**config)
 
@@ -0,0 +1,140 @@
+"""Class for taking an Amplium process out of service without failing the requests it is serving"""
+import logging
+import os
+import signal
+import threading
+import time
+
+import flask
+
+from amplium.api.exceptions import DrainingException
+
+logger = logging.getLogger(__name__)
+
+
+class DrainController:
+    """
+    Drains a process before it stops. While draining, new session requests are rejected with a 503 and a
+    Retry-After header so that clients retry them on another process, while the requests already in flight,
+    such as long running commands, get until the deadline to finish. The session pools stop starting and
+    recycling sessions, and their idle sessions are deleted once drained. The routing state is written to the
+    snapshot when draining starts and again once it is done, which is how the successor process takes over
+    the sessions of this one.
+    """
+
+    def __init__(self, config, snapshot, pools=()):
+        self.config = config
+        self.snapshot = snapshot
+        self.pools = pools
+        self.draining = False
+        self.deadline = None
+        self.in_flight = 0
+        self._idle = threading.Condition()
+
+    def request_started(self):
+        """Counts the current request as in flight"""
+        with self._idle:
+            self.in_flight += 1
+        flask.g.drain_counted = True
+
+    def request_finished(self, _=None):
+        """Stops counting the current request as in flight, if it was counted"""
+        # Teardown also runs for requests that failed before request_started was called
+        if not flask.g.pop('drain_counted', False):
+            return
+        with self._idle:
+            self.in_flight -= 1
+            if self.in_flight <= 0:
+                self._idle.notify_all()
+
+    def check_accepting_sessions(self):
+        """
+        Makes sure new sessions can be created on this process.
+        :raises DrainingException: If the process is draining.
+        """
+        if self.draining:
+            raise DrainingException(
+                "Amplium is draining and not accepting new sessions",
+                retry_after=self.config['retry_after']
+            )
+
+    def start(self, deadline=None):
+        """
+        Starts draining.
+        :param deadline: Seconds the requests in flight get to finish, the configured deadline if None.
+        :return: Whether draining started, False if the process was already draining.
+        """
+        with self._idle:
+            if self.draining:
+                return False
+            self.draining = True
+            self.deadline = time.monotonic() + (self.config['deadline'] if deadline is None else deadline)
+        logger.warning("Draining, %d requests are in flight", self.in_flight)
+        for pool in self.pools:
+            pool.stop()
+        self.snapshot.save()
+        return True
+
+    def wait(self):
+        """
+        Waits for the requests in flight to finish, or for the deadline to pass.
+        :return: Whether every request finished before the deadline.
+        """
+        with self._idle:
+            finished = self._idle.wait_for(
+                lambda: self.in_flight <= 0,
+                timeout=max(0.0, self.deadline - time.monotonic())
+            )
+        # Routes resolved while draining are handed off too
+        self.snapshot.save()
+        if finished:
+            logger.info("Drained, no requests are in flight")
+        else:
+            logger.warning("Drain deadline passed with %d requests in flight", self.in_flight)
+        return finished
+
+    def drain_in_background(self, deadline=None, then=None):
+        """
+        Starts draining and waits for the requests in flight in a separate thread.
+        :param deadline: Seconds the requests in flight get to finish, the configured deadline if None.
+        :param then: Function to call once drained, such as stopping the process.
+        """
+        if not self.start(deadline):
+            return
+
+        def drain():
+            self.wait()
+            for pool in self.pools:
+                pool.close()
+            if then is not None:
+                then()
+
+        thread = threading.Thread(target=drain, daemon=True)
+        thread.start()
+
+    def install_signal_handler(self, signum=signal.SIGTERM):
+        """
+        Drains the process when it is asked to stop, then stops it the way it would have been stopped. Sending
+        the signal again while draining stops the process straight away.
+        :param signum: The signal to drain on.
+        """
+        # Signal handlers can only be installed from the main thread
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        previous = signal.getsignal(signum)
+
+        def handle(received, _):
+            signal.signal(received, previous if previous is not None else signal.SIG_DFL)
+            self.drain_in_background(then=lambda: os.kill(os.getpid(), received))
+
+        signal.signal(signum, handle)
+
+    def to_dict(self):
+        """Returns the current state of the drain as a dictionary"""
+        remaining = max(0.0, self.deadline - time.monotonic()) if self.draining else None
+        return {
+            'draining': self.draining,
+            'in_flight': self.in_flight,
+            'remaining': round(remaining, 1) if remaining is not None else None
+        }
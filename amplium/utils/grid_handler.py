@@ -1,29 +1,43 @@
 """Class for handling grid state"""
 
 import hashlib
-import json
 import logging
+import time
 from collections import defaultdict, Counter
 
 import re
 from requests.exceptions import RequestException
 
 from amplium.api.exceptions import NoAvailableGridsException, NoAvailableCapacityException
-from amplium.utils.utils import retry
+from amplium.placement.least_queue import LeastQueueStrategy
+from amplium.utils import json_codec
+from amplium.utils.capacity_forecaster import CapacityForecaster
+from amplium.utils.grid_stats import GridStats
+from amplium.utils.utils import retry, format_url
 
 logger = logging.getLogger(__name__)
 
 
-class GridHandler:
+class GridHandler:  # pylint: disable=too-many-instance-attributes
     """Class for handling grid state"""
 
-    def __init__(self, config, discovery, datadog, saucelabs, session):
+    def __init__(self, config, discovery, datadog, remote_grids, session, stats=None, placement=None,
+                 forecaster=None, tenants=None):
         self.hashes_to_grids = {}
         self.config = config
         self.discovery = discovery
         self.datadog = datadog
-        self.saucelabs = saucelabs
+        self.remote_grids = remote_grids
         self.session = session
+        self.stats = stats or GridStats()
+        self.forecaster = forecaster or CapacityForecaster()
+        self.placement = placement or LeastQueueStrategy(
+            config=config,
+            stats=self.stats,
+            forecaster=self.forecaster
+        )
+        self.tenants = tenants
+        self.grid_snapshot = []
 
     def store_grid_url(self, url):
         """
@@ -46,8 +60,18 @@ class GridHandler:
         if desired_hash not in self.hashes_to_grids:
             for grid in self.discovery.nodes:
                 self.store_grid_url(self._format_url(grid.host, grid.port))
+            for url in self.remote_grids.get_urls():
+                self.store_grid_url(url)
         return self.hashes_to_grids[desired_hash]
 
+    def get_webdriver_url(self, grid_url):
+        """
+        Gets the URL serving the WebDriver API of a grid.
+        :param grid_url: The base URL of a Selenium Grid Hub or remote grid.
+        :return: The URL that WebDriver paths such as '/session' should be appended to.
+        """
+        return grid_url + self.remote_grids.get_webdriver_path(grid_url)
+
     def generate_session_id(self, session_id, grid_url) -> str:
         """
         Convenience function for generating our own session id on top of the Selenium Grid's session id.
@@ -74,37 +98,135 @@ class GridHandler:
 
         return session_id, url
 
-    def get_base_url(self, session_request):
+    def get_base_url(self, session_request, priority=None):
         """
         Determines the base URL that the given session should use.
         :param session_request: Dictionary representing the request for a new session
+        :param priority: Index of the request's priority class, None to ignore priorities.
         :return: A URL to a Selenium Grid matching the session request.
         """
-        # Look through the request keys for capabilities, because they might want to use SauceLabs
-        for key, value in session_request.items():
-            if key.endswith('Capabilities'):
-                # If SauceLabs is not used, use zookeeper to find the url
-                if self.saucelabs.is_saucelabs_requested(value):
-                    host_and_ip = retry(
-                        func=self.saucelabs.get_sauce_url,
-                        max_time=self.config.session_queue_time
-                    )
-                    return self._format_url(*host_and_ip)
-
-        # If SauceLabs didn't yield a url, get a normal grid.
+        # Look through the request capabilities, because they might ask for a remote grid such as SauceLabs
+        remote_grid = self.remote_grids.get_requested(get_capabilities(session_request))
+        if remote_grid:
+            return retry(
+                func=remote_grid.acquire_url,
+                max_time=self.config.session_queue_time
+            )
+
+        # If the session may overflow to a remote grid, only wait for a normal grid until overflow kicks in
+        if self._is_overflow_eligible(session_request):
+            return retry(
+                func=self._get_selenium_grid_or_overflow,
+                max_time=self.config.session_queue_time,
+                session_request=session_request,
+                started_at=time.monotonic(),
+                priority=priority
+            )
+
+        # If no remote grid was requested, get a normal grid.
         host_and_ip = retry(
             func=self._get_selenium_grid,
-            max_time=self.config.session_queue_time
+            max_time=self.config.session_queue_time,
+            session_request=session_request,
+            priority=priority
         )
 
         return self._format_url(*host_and_ip)
 
-    def _get_selenium_grid(self):
+    def plan_base_urls(self, session_request, count, priority=None):
+        """
+        Places a batch of identical sessions on the Selenium Grid Hubs in one decision, against a single
+        snapshot of their capacity.
+        :param session_request: Dictionary representing the request for the new sessions
+        :param count: Number of sessions in the batch.
+        :param priority: Index of the batch's priority class, None to ignore priorities.
+        :return: URLs of the Selenium Grid Hubs for as many sessions as the hubs currently have capacity for,
+                 which may be fewer than requested. Sessions asking for a remote grid are never planned.
+        """
+        if self.remote_grids.get_requested(get_capabilities(session_request)):
+            return []
+
+        discovered_grids = self.get_grid_info()
+        self.grid_snapshot = discovered_grids
+        for grid in discovered_grids:
+            self.store_grid_url(self._format_url(grid["host"], grid["port"]))
+
+        # Copies, so that capacity can be claimed by each placement without touching the snapshot
+        grids = [dict(grid) for grid in discovered_grids if grid['available_capacity'] > 0]
+        available = sum(grid['available_capacity'] for grid in grids)
+        count = min(count, available - self._get_waiting_ahead(priority))
+        urls = []
+        while grids and len(urls) < count:
+            grid = self.placement.select(grids, session_request)
+            urls.append(self._format_url(grid['host'], grid['port']))
+            grid['available_capacity'] -= 1
+            if grid['available_capacity'] <= 0:
+                grids.remove(grid)
+        return urls
+
+    def _is_overflow_eligible(self, session_request):
+        """
+        Checks whether a session request may be sent to a remote grid when the grids are saturated.
+        :param session_request: Dictionary representing the request for a new session
+        :return: True if overflow is enabled and the requested capabilities allow it.
+        """
+        overflow_config = self.config.overflow
+        if not overflow_config['enabled']:
+            return False
+
+        capabilities = get_capabilities(session_request)
+        if str(capabilities.get('amplium:overflow', True)).lower() == 'false':
+            return False
+
+        browsers = overflow_config['browsers']
+        return not browsers or capabilities.get('browserName') in browsers
+
+    def _get_selenium_grid_or_overflow(self, session_request, started_at, priority=None):
+        """
+        Gets a Selenium Grid Hub, falling back to a remote grid if the grids have been saturated too long.
+        :param session_request: Dictionary representing the request for a new session
+        :param started_at: Monotonic time at which the session request started waiting.
+        :param priority: Index of the request's priority class, None to ignore priorities.
+        :return: A URL to a Selenium Grid Hub or to a remote grid.
+        """
+        try:
+            return self._format_url(*self._get_selenium_grid(session_request, priority))
+        except NoAvailableCapacityException as exception:
+            overflow_config = self.config.overflow
+            waited = time.monotonic() - started_at
+            queue_length = sum(grid['queue'] for grid in self.grid_snapshot)
+            queue_length_threshold = overflow_config['queue_length_threshold']
+            max_predicted_wait = overflow_config['max_predicted_wait']
+            predicted_wait = exception.predicted_wait
+
+            if waited < overflow_config['queue_wait_threshold'] and not (
+                    queue_length_threshold and queue_length >= queue_length_threshold
+            ) and not (
+                max_predicted_wait and predicted_wait is not None and predicted_wait > max_predicted_wait
+            ):
+                raise
+
+        logger.info(
+            "Grids saturated for %.1f seconds with %d queued, overflowing to a remote grid",
+            waited,
+            queue_length
+        )
+        self.datadog.send(
+            metric='amplium.overflow',
+            metric_type='counter',
+            value=1
+        )
+        return self.remote_grids.acquire_overflow_url()
+
+    def _get_selenium_grid(self, session_request=None, priority=None):
         """
         Function for getting a Selenium Grid Hub from Zookeeper.
+        :param session_request: Dictionary representing the request for a new session
+        :param priority: Index of the request's priority class, None to ignore priorities.
         :return: Host and port of a Selenium Grid Hub as a tuple.
         """
         discovered_grids = self.get_grid_info()
+        self.grid_snapshot = discovered_grids
         if not discovered_grids:
             raise NoAvailableGridsException("No grids are registered to Amplium")
 
@@ -112,16 +234,24 @@ class GridHandler:
         for grid in discovered_grids:
             self.store_grid_url(self._format_url(grid["host"], grid["port"]))
 
-        nodes = sorted(
-            [
-                grid for grid in discovered_grids
-                if grid['available_capacity'] > 0
-            ],
-            key=_cmp_to_key(self._compare_node)
-        )
+        nodes = [
+            grid for grid in discovered_grids
+            if grid['available_capacity'] > 0
+        ]
+
+        # Capacity that more urgent session requests are waiting for is left to them
+        available = sum(grid['available_capacity'] for grid in nodes)
+        if nodes and self._get_waiting_ahead(priority) >= available:
+            raise NoAvailableCapacityException("Available capacity is held for more urgent session requests")
 
         if nodes:
-            return nodes[0]['host'], nodes[0]['port']
+            node = self.placement.select(nodes, session_request)
+            return node['host'], node['port']
+
+        # Some strategies would rather queue the session on a grid than wait for capacity in Amplium
+        node = self.placement.select_when_full(discovered_grids, session_request)
+        if node:
+            return node['host'], node['port']
 
         self.datadog.send(
             metric='amplium.queue_length',
@@ -129,28 +259,28 @@ class GridHandler:
             value=1
         )
 
-        raise NoAvailableCapacityException("No available capacity on any grid")
-
-    def _compare_node(self, node1, node2):
-        """Sorts nodes based on lowest queue,highest total, and lowest available capacity"""
-        compare_queue = node1['queue'] - node2['queue']
-        if compare_queue != 0:
-            return compare_queue
-
-        compare_total = node1['total_capacity'] - node2['total_capacity']
-        if compare_total != 0:
-            # Note the inversion, because we want the LARGEST total capacity
-            return -compare_total
+        browser = get_capabilities(session_request).get('browserName') if session_request else None
+        predicted_waits = [
+            wait for wait in (
+                self.forecaster.predict_wait(grid, browser, grids=len(discovered_grids))
+                for grid in discovered_grids
+            )
+            if wait is not None
+        ]
+        raise NoAvailableCapacityException(
+            "No available capacity on any grid",
+            predicted_wait=min(predicted_waits) if predicted_waits else None
+        )
 
-        compare_available = node1['available_capacity'] - node2['available_capacity']
-        return compare_available
+    def _get_waiting_ahead(self, priority):
+        """Number of session requests waiting for capacity that are more urgent than the given priority"""
+        if self.tenants is None or priority is None:
+            return 0
+        return self.tenants.get_waiting_ahead(priority)
 
     def _format_url(self, host, port):
         """Builds the url based on the port number"""
-        protocol = "http"
-        if int(port) == 443:
-            protocol = "https"
-        return "{0}://{1}:{2}".format(protocol, host, port)
+        return format_url(host, port)
 
     def get_grid_info(self):
         """
@@ -159,7 +289,7 @@ class GridHandler:
         """
         data = []
         for node in self.discovery.nodes:
-            host_data = {'host': node.host, 'port': node.port}
+            host_data = {'host': node.host, 'port': node.port, 'metadata': node.metadata}
             node_ip = self._format_url(node.host, node.port)
 
             try:
@@ -172,8 +302,17 @@ class GridHandler:
                 host_data['available_capacity'] = host_data['total_capacity'] - browsers['total']
 
                 # Gets the queue
-                response = self.session.get(node_ip + "/grid/api/hub").json()
+                response = json_codec.loads(self.session.get(node_ip + "/grid/api/hub").content)
                 host_data['queue'] = response['newSessionRequestCount']
+
+                # Gets the rolling latency and error statistics
+                host_data['stats'] = self.stats.get_stats(node_ip)
+
+                # Gets the predicted wait for a slot
+                host_data['predicted_wait'] = self.forecaster.predict_wait(
+                    host_data,
+                    grids=len(self.discovery.nodes)
+                )
             except RequestException:
                 self.discovery.get_nodes()
                 continue
@@ -195,7 +334,8 @@ class GridHandler:
         # get all max sessions info from each nodes configuration
         for node in self.get_all_registered_nodes_ip(url):
             data = {"id": node}
-            response = self.session.get(url + "/grid/api/proxy/", data=json.dumps(data)).json()
+            response = self.session.get(url + "/grid/api/proxy/", data=json_codec.dumps(data))
+            response = json_codec.loads(response.content)
             hub_max_capacity += response["request"]["configuration"]["maxSession"]
         return hub_max_capacity
 
@@ -208,7 +348,7 @@ class GridHandler:
 
         # Get all sessions info for each node in nodes list
         for node_ip in self.get_all_registered_nodes_ip(url):
-            data = self.session.get(node_ip + "/wd/hub/sessions/").json()
+            data = json_codec.loads(self.session.get(node_ip + "/wd/hub/sessions/").content)
             nodes.append(data)
 
         # parse dictionary to get total browser type on each node
@@ -236,29 +376,43 @@ class GridHandler:
         return browser_stats_dict
 
 
-def _cmp_to_key(mycmp):
-    """Convert a cmp= function into a key= function"""
-    class Key:
-        """Convert a cmp= function into a key= function"""
-        def __init__(self, obj):
-            self.obj = obj
-
-        def __lt__(self, other):
-            return mycmp(self.obj, other.obj) < 0
-
-        def __gt__(self, other):
-            return mycmp(self.obj, other.obj) > 0
-
-        def __eq__(self, other):
-            return mycmp(self.obj, other.obj) == 0
-
-        def __le__(self, other):
-            return mycmp(self.obj, other.obj) <= 0
-
-        def __ge__(self, other):
-            return mycmp(self.obj, other.obj) >= 0
-
-        def __ne__(self, other):
-            return mycmp(self.obj, other.obj) != 0
-
-    return Key
+def get_capabilities(session_request):
+    """
+    Collects the capabilities of a session request, for both the legacy JSON wire protocol and W3C.
+    :param session_request: Dictionary representing the request for a new session
+    :return: Dictionary of all requested capabilities.
+    """
+    capabilities = {}
+    for key, value in session_request.items():
+        if key.endswith('Capabilities') and isinstance(value, dict):
+            capabilities.update(value)
+
+    w3c_capabilities = session_request.get('capabilities')
+    if isinstance(w3c_capabilities, dict):
+        capabilities.update(w3c_capabilities.get('alwaysMatch') or {})
+    return capabilities
+
+
+def get_session_id(response):
+    """
+    Gets the session id from the response to a session request, for both the JSON wire protocol and W3C.
+    :param response: The decoded response to the session request.
+    :return: The session id, or None if no session was created.
+    """
+    value = response.get('value')
+    if response.get('sessionId') is None and isinstance(value, dict):
+        return value.get('sessionId')
+    return response.get('sessionId')
+
+
+def set_session_id(response, session_id):
+    """
+    Replaces the session id in the response to a session request, wherever the protocol put it.
+    :param response: The decoded response to the session request.
+    :param session_id: The session id to replace it with.
+    """
+    value = response.get('value')
+    if isinstance(value, dict) and value.get('sessionId') is not None:
+        value['sessionId'] = session_id
+    if response.get('sessionId') is not None or not isinstance(value, dict):
+        response['sessionId'] = session_id
@@ -0,0 +1,95 @@
+"""Class for tracking rolling latency and error statistics per grid"""
+import threading
+from collections import defaultdict
+
+SESSION_OPERATION = 'session'
+COMMAND_OPERATION = 'command'
+
+
+class EwmaStat:
+    """Exponentially weighted moving average of latency and error rate for a single operation"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.count = 0
+
+    def record(self, duration, error):
+        """
+        Folds a single observation into the moving averages.
+        :param duration: How long the operation took, in seconds.
+        :param error: Whether the operation failed.
+        """
+        error_value = 1.0 if error else 0.0
+
+        # Seed the averages with the first observation so a new grid isn't treated as instant
+        if self.count == 0:
+            self.latency = duration
+            self.error_rate = error_value
+        else:
+            self.latency += self.alpha * (duration - self.latency)
+            self.error_rate += self.alpha * (error_value - self.error_rate)
+        self.count += 1
+
+    def to_dict(self):
+        """Returns the current state of the statistic as a dictionary"""
+        return {
+            'latency': round(self.latency, 4),
+            'error_rate': round(self.error_rate, 4),
+            'count': self.count
+        }
+
+
+class GridStats:
+    """Tracks rolling latency and error rates per grid for session creation and command proxying"""
+    OPERATIONS = (SESSION_OPERATION, COMMAND_OPERATION)
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._stats = defaultdict(self._new_grid_stats)
+
+    def _new_grid_stats(self):
+        return {operation: EwmaStat(self.alpha) for operation in self.OPERATIONS}
+
+    def record(self, grid_url, operation, duration, error=False):
+        """
+        Records a single request made against a grid.
+        :param grid_url: The base URL of the Selenium Grid Hub.
+        :param operation: One of 'session' or 'command'.
+        :param duration: How long the request took, in seconds.
+        :param error: Whether the request failed.
+        """
+        with self._lock:
+            self._stats[grid_url][operation].record(duration, error)
+
+    def get_latency(self, grid_url, operation=SESSION_OPERATION):
+        """
+        Gets the rolling latency of an operation against a grid.
+        :param grid_url: The base URL of the Selenium Grid Hub.
+        :param operation: One of 'session' or 'command'.
+        :return: The rolling latency in seconds, or 0 if the grid has never been used.
+        """
+        stats = self._stats.get(grid_url)
+        return stats[operation].latency if stats else 0.0
+
+    def get_error_rate(self, grid_url, operation=SESSION_OPERATION):
+        """
+        Gets the rolling error rate of an operation against a grid.
+        :param grid_url: The base URL of the Selenium Grid Hub.
+        :param operation: One of 'session' or 'command'.
+        :return: The rolling error rate between 0 and 1, or 0 if the grid has never been used.
+        """
+        stats = self._stats.get(grid_url)
+        return stats[operation].error_rate if stats else 0.0
+
+    def get_stats(self, grid_url):
+        """
+        Gets all statistics for a grid.
+        :param grid_url: The base URL of the Selenium Grid Hub.
+        :return: Dictionary of operation to its latency, error rate and sample count.
+        """
+        with self._lock:
+            stats = self._stats.get(grid_url) or self._new_grid_stats()
+            return {operation: stat.to_dict() for operation, stat in stats.items()}
@@ -0,0 +1,57 @@
+"""
+JSON encoding and decoding for proxied payloads.
+
+Uses the fastest JSON library installed, in order of preference orjson, ujson and finally the standard
+library, so that installing one of the optional libraries is enough to speed up every proxied command.
+"""
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIMETYPE = 'application/json'
+
+# pylint: disable=import-outside-toplevel,invalid-name
+try:
+    import orjson
+
+    BACKEND = 'orjson'
+
+    def dumps(obj) -> bytes:
+        """
+        Encodes an object as JSON.
+        :param obj: The object to encode.
+        :return: The UTF-8 encoded JSON document.
+        """
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+
+        BACKEND = 'ujson'
+
+        def dumps(obj) -> bytes:
+            """
+            Encodes an object as JSON.
+            :param obj: The object to encode.
+            :return: The UTF-8 encoded JSON document.
+            """
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+
+        loads = ujson.loads
+    except ImportError:
+        BACKEND = 'json'
+
+        def dumps(obj) -> bytes:
+            """
+            Encodes an object as JSON.
+            :param obj: The object to encode.
+            :return: The UTF-8 encoded JSON document.
+            """
+            return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        loads = json.loads
+
+logger.debug("Using %s for JSON encoding", BACKEND)
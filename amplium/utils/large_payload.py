@@ -0,0 +1,71 @@
+"""Handling of WebDriver payloads too large to decode and re-encode, such as screenshots and file uploads"""
+import tempfile
+
+
+class LargePayloadHandler:
+    """
+    Moves large request and response bodies through Amplium as raw bytes. Uploads are streamed to the hub
+    in chunks of the request body buffer, and responses are spooled to a temporary file once they exceed a
+    threshold so that concurrent screenshots don't each hold a copy in memory.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+    def is_large(self, command):
+        """
+        Checks whether a command is expected to carry large payloads.
+        :param command: The WebDriver command, relative to the session.
+        :return: Whether the command's bodies should be passed through as bytes.
+        """
+        return command is not None and any(command.endswith(large) for large in self.config['commands'])
+
+    def iter_chunks(self, body):
+        """
+        Splits a request body into chunks without copying it.
+        :param body: The raw request body.
+        :return: Generator of memoryviews over the body.
+        """
+        view = memoryview(body)
+        chunk_size = self.config['chunk_size']
+        for offset in range(0, len(view), chunk_size):
+            yield view[offset:offset + chunk_size]
+
+    def spool(self, response, decode_content=True):
+        """
+        Reads a streamed response body, keeping it in memory only while it is smaller than the threshold.
+        :param response: The streamed response from the hub. It is closed once it has been read.
+        :param decode_content: Whether to decompress the body, or spool it as it was sent by the hub.
+        :return: Tuple of the spooled body, positioned at its start, and its size in bytes.
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=self.config['spool_threshold'])
+        chunk_size = self.config['chunk_size']
+        try:
+            if decode_content:
+                chunks = response.iter_content(chunk_size=chunk_size)
+            else:
+                chunks = response.raw.stream(chunk_size, decode_content=False)
+            for chunk in chunks:
+                spool.write(chunk)
+        except Exception:
+            spool.close()
+            raise
+        finally:
+            response.close()
+        size = spool.tell()
+        spool.seek(0)
+        return spool, size
+
+    def stream(self, spool):
+        """
+        Reads a spooled body back in chunks, closing it once it has been read.
+        :param spool: The spooled body.
+        :return: Generator of the body's chunks.
+        """
+        try:
+            chunk = spool.read(self.config['chunk_size'])
+            while chunk:
+                yield chunk
+                chunk = spool.read(self.config['chunk_size'])
+        finally:
+            spool.close()
@@ -0,0 +1,117 @@
+"""Class for routing the commands of a session straight to the node running it"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import replace
+
+from requests.exceptions import RequestException
+
+from amplium.models.node_route import NodeRoute
+from amplium.remote_grids.abstract_remote_grid import DEFAULT_WEBDRIVER_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class NodeRouter:
+    """
+    Looks up the node running each session on a Selenium Grid Hub in the session info cache, so that
+    the session's commands can skip the hub. A command goes through the hub again whenever the hub hasn't
+    seen the session for 'hub_touch_interval' seconds, so that the hub doesn't time the session out.
+    """
+
+    def __init__(self, config, grid_handler, session_info, executor):
+        self.config = config
+        self.grid_handler = grid_handler
+        self.session_info = session_info
+        self.executor = executor
+        self._routes = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def is_enabled(self):
+        """Whether commands are routed to the nodes at all"""
+        return self.config['enabled']
+
+    def resolve(self, session_id):
+        """
+        Looks up the node running a session in the background, if it isn't known yet.
+        :param session_id: Amplium's id of the session.
+        """
+        if self.is_enabled and session_id not in self._routes:
+            self.executor.submit(self._resolve, session_id)
+
+    def _resolve(self, session_id):
+        """Looks up the node running a session on its hub and remembers it"""
+        hub_session_id, grid_url = self.grid_handler.unroll_session_id(session_id)
+        # Remote grids don't expose their nodes
+        if grid_url in self.grid_handler.remote_grids.get_urls():
+            return
+
+        try:
+            session_info = self.session_info.get(session_id)
+        except (RequestException, ValueError):
+            logger.exception("Unable to look up the node running session %s", session_id)
+            return
+
+        node_url = session_info.get('proxyId')
+        if not session_info.get('success') or not node_url:
+            logger.warning("Hub %s doesn't know the node running session %s", grid_url, session_id)
+            return
+
+        with self._lock:
+            self._routes[session_id] = NodeRoute(
+                session_id=hub_session_id,
+                node_url=node_url,
+                hub_contact=time.monotonic()
+            )
+            # Sessions that are never deleted through Amplium would otherwise be remembered forever
+            while len(self._routes) > self.config['max_routes']:
+                self._routes.popitem(last=False)
+        logger.debug("Routing the commands of session %s to %s", session_id, node_url)
+
+    def get_command_url(self, session_id, command):
+        """
+        Builds the URL of a command on the node running a session.
+        :param session_id: Amplium's id of the session.
+        :param command: The WebDriver command, relative to the session.
+        :return: The command's URL on the node, or None if the command should go through the hub.
+        """
+        now = time.monotonic()
+        with self._lock:
+            route = self._routes.get(session_id)
+            if route is None:
+                return None
+            if now - route.hub_contact > self.config['hub_touch_interval']:
+                route.hub_contact = now
+                return None
+        return '{0}{1}/session/{2}/{3}'.format(
+            route.node_url, DEFAULT_WEBDRIVER_PATH, route.session_id, command
+        )
+
+    def get_routes(self):
+        """
+        Copies the routing table, for example to persist it.
+        :return: Dictionary of Amplium's session ids to the routes of their commands.
+        """
+        with self._lock:
+            return {session_id: replace(route) for session_id, route in self._routes.items()}
+
+    def restore(self, routes):
+        """
+        Adds routes that were known before, such as those of a previous process. Known routes are kept.
+        :param routes: Dictionary of Amplium's session ids to the routes of their commands.
+        """
+        with self._lock:
+            for session_id, route in routes.items():
+                self._routes.setdefault(session_id, route)
+            while len(self._routes) > self.config['max_routes']:
+                self._routes.popitem(last=False)
+
+    def forget(self, session_id):
+        """
+        Stops routing a session's commands to its node, because the session ended or the node failed.
+        :param session_id: Amplium's id of the session.
+        """
+        with self._lock:
+            self._routes.pop(session_id, None)
@@ -0,0 +1,99 @@
+"""Logging of proxied requests whose cost doesn't grow with the size of the payload"""
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+
+class LazyPayload:
+    """
+    Wraps a request or response payload so that it is only converted to a string, and truncated, if a log
+    record containing it is actually emitted.
+    """
+    __slots__ = ('payload', 'max_length')
+
+    def __init__(self, payload, max_length):
+        self.payload = payload
+        self.max_length = max_length
+
+    def __str__(self):
+        payload = self.payload
+        if hasattr(payload, 'content'):
+            payload = payload.content
+        # Only the part of a body that will be logged is decoded, never the whole body
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            text = bytes(payload[:self.max_length + 1]).decode(errors='replace')
+            return self._truncate(text, len(payload))
+        text = str(payload)
+        return self._truncate(text, len(text))
+
+    def _truncate(self, text, length):
+        if length <= self.max_length:
+            return text
+        return "{0}... ({1} characters truncated)".format(text[:self.max_length], length - self.max_length)
+
+
+class RequestLogger:
+    """Logs proxied requests and responses with size caps, sampling and per-command suppression"""
+
+    def __init__(self, config):
+        self.config = config
+
+    def _is_suppressed(self, command):
+        """Checks whether the bodies of a command should never be logged, e.g. screenshots"""
+        return command is not None and any(
+            command.endswith(suppressed) for suppressed in self.config['suppressed_commands']
+        )
+
+    def _body(self, command, payload):
+        """The body as it should appear in the log"""
+        if self.config['max_body_length'] <= 0 or self._is_suppressed(command):
+            return '<suppressed>'
+        return LazyPayload(payload, self.config['max_body_length'])
+
+    def log_request(self, session_id, method, url, command, data):
+        """
+        Logs a request about to be proxied.
+        :return: Whether the request was logged. The response should only be logged if it was.
+        """
+        if not logger.isEnabledFor(logging.INFO) or random.random() >= self.config['sample_rate']:
+            return False
+
+        extra = {'session_id': session_id, 'method': method, 'url': url, 'command': command}
+        if self.config['structured']:
+            extra['body'] = self._body(command, data)
+            logger.info("Sent request", extra=extra)
+        else:
+            logger.info(
+                "%s | Sent %s request to (%s) with data: %s",
+                session_id,
+                method,
+                url,
+                self._body(command, data),
+                extra=extra
+            )
+        return True
+
+    def log_response(self, session_id, url, command, response, streamed=False):
+        """
+        Logs a response received from a proxied request.
+        :param streamed: Whether the body was streamed, in which case it is no longer available to log.
+        """
+        extra = {
+            'session_id': session_id,
+            'url': url,
+            'command': command,
+            'status_code': response.status_code
+        }
+        body = '<streamed>' if streamed else self._body(command, response)
+        if self.config['structured']:
+            extra['body'] = body
+            logger.info("Received response", extra=extra)
+        else:
+            logger.info(
+                "%s | Received from (%s) with response: %s",
+                session_id,
+                url,
+                body,
+                extra=extra
+            )
@@ -0,0 +1,73 @@
+"""Class for caching what the hubs report about each session"""
+import logging
+import threading
+from collections import OrderedDict
+
+from amplium.utils import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Fields of the testsession API that change during a session, everything else is fixed when it starts
+VOLATILE_FIELDS = ('inactivityTime',)
+
+
+class SessionInfoCache:
+    """
+    Caches the response of a hub's /grid/api/testsession API for each session, such as the node running it,
+    until the session is deleted. Only responses that found the session are cached.
+    """
+
+    def __init__(self, config, grid_handler, session):
+        self.config = config
+        self.grid_handler = grid_handler
+        self.session = session
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id, refresh=False):
+        """
+        Gets the information the hub has about a session, looking it up on the hub if it isn't cached yet.
+        :param session_id: Amplium's id of the session.
+        :param refresh: Whether to look up the fields that change during the session on the hub again.
+        :return: The hub's response, with 'success' false if the hub doesn't know the session.
+        :raises RequestException: If the hub couldn't be reached.
+        :raises ValueError: If the hub's response isn't JSON.
+        """
+        with self._lock:
+            session_info = self._sessions.get(session_id)
+        if session_info is not None and not refresh:
+            return dict(session_info)
+
+        response = self._fetch(session_id)
+        if not response.get('success'):
+            return response
+
+        with self._lock:
+            if session_info is not None:
+                session_info.update({
+                    field: response[field] for field in VOLATILE_FIELDS if field in response
+                })
+            else:
+                session_info = self._sessions.setdefault(session_id, response)
+            # Sessions that are never deleted through Amplium would otherwise be remembered forever
+            while len(self._sessions) > self.config['max_sessions']:
+                self._sessions.popitem(last=False)
+            return dict(session_info)
+
+    def _fetch(self, session_id):
+        """Looks up a session on its hub"""
+        hub_session_id, grid_url = self.grid_handler.unroll_session_id(session_id)
+        response = self.session.get(
+            '{0}/grid/api/testsession'.format(grid_url),
+            params={'session': hub_session_id},
+            headers={'Accept': json_codec.MIMETYPE}
+        )
+        return json_codec.loads(response.content)
+
+    def invalidate(self, session_id):
+        """
+        Forgets a session, because it was deleted.
+        :param session_id: Amplium's id of the session.
+        """
+        with self._lock:
+            self._sessions.pop(session_id, None)
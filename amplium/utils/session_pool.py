@@ -0,0 +1,395 @@
+"""Pools of idle sessions that session requests can claim instead of waiting for a browser to start"""
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from requests.exceptions import RequestException
+
+from amplium.models.pooled_session import PooledSession
+from amplium.utils import json_codec
+from amplium.utils.grid_handler import get_capabilities, get_session_id, set_session_id
+from amplium.utils.grid_stats import SESSION_OPERATION
+from amplium.utils.utils import is_truthy
+
+logger = logging.getLogger(__name__)
+
+REUSABLE_CAPABILITY = 'amplium:reusable'
+# Capabilities that only control pooling, all others such as 'amplium:remoteGrid' pick different sessions
+POOL_CAPABILITIES = (REUSABLE_CAPABILITY,)
+
+# Clears the storage of the current page, which has to happen before navigating away from it. Pages without
+# an origin such as about:blank, where every reused session is left, deny access to storage they don't have.
+CLEAR_STORAGE_SCRIPT = (
+    'try { window.localStorage.clear(); window.sessionStorage.clear(); } '
+    'catch (error) { if (error.name !== "SecurityError") { throw error; } }'
+)
+
+
+def capabilities_key(capabilities):
+    """
+    Builds a key identifying the session a set of capabilities asks for, ignoring the pooling capabilities.
+    :param capabilities: Dictionary of requested capabilities.
+    :return: A string that is equal for equivalent capabilities.
+    """
+    return json.dumps(
+        {name: value for name, value in capabilities.items() if name not in POOL_CAPABILITIES},
+        sort_keys=True
+    )
+
+
+class SessionPool:
+    """
+    Base class for pools of idle sessions, grouped by the capabilities they were started with. Sessions idle
+    longer than 'idle_timeout' are deleted in the background before the hubs time them out.
+    """
+
+    def __init__(self, config, grid_handler, session, executor, datadog):
+        self.config = config
+        self.grid_handler = grid_handler
+        self.session = session
+        self.executor = executor
+        self.datadog = datadog
+        self._idle = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    @property
+    def is_enabled(self):
+        """Whether the pool can hold sessions at all"""
+        return True
+
+    def stop(self):
+        """Stops adding sessions to the pool, such as when the process is draining"""
+        self._stopped.set()
+        self._wake.set()
+
+    def close(self):
+        """Deletes every idle session in the pool, so that a stopped process doesn't leave them behind"""
+        with self._lock:
+            idle = [pooled for sessions in self._idle.values() for pooled in sessions]
+            self._idle.clear()
+        for pooled in idle:
+            self._delete_session(pooled)
+
+    def start_listening(self):
+        """Start maintaining the pool in the background, if it is enabled"""
+        if not self.is_enabled:
+            return
+
+        # Start the maintenance in a separate thread because it loops forever
+        thread = threading.Thread(target=self._maintain_forever, daemon=True)
+        thread.start()
+
+    def _maintain_forever(self):
+        """Maintain the pool periodically, or as soon as a session is claimed from it"""
+        while not self._stopped.is_set():
+            try:
+                self.maintain()
+            except Exception:
+                logger.exception('Error maintaining the %s', type(self).__name__)
+            self._wake.wait(self.config['refresh_interval'])
+            self._wake.clear()
+
+    def maintain(self):
+        """Periodic maintenance of the pool"""
+        self.reap()
+
+    def get_size(self, key):
+        """Number of idle sessions pooled for a set of capabilities"""
+        with self._lock:
+            return len(self._idle[key])
+
+    def _take(self, key):
+        """Removes the oldest idle session for a set of capabilities from the pool, if there is one"""
+        with self._lock:
+            return self._idle[key].popleft() if self._idle[key] else None
+
+    def _put(self, key, pooled):
+        """Adds an idle session to the pool"""
+        pooled.idle_since = time.monotonic()
+        with self._lock:
+            self._idle[key].append(pooled)
+
+    def reap(self):
+        """Delete pooled sessions that have been idle longer than the idle timeout"""
+        for pooled in self._expire():
+            self._delete_session(pooled)
+
+    def _expire(self):
+        """Removes the sessions idle longer than the idle timeout from the pool, and returns them"""
+        expired = []
+        now = time.monotonic()
+        with self._lock:
+            for idle in self._idle.values():
+                # Sessions are pooled in the order they became idle, so the oldest are first
+                while idle and now - idle[0].idle_since > self.config['idle_timeout']:
+                    expired.append(idle.popleft())
+        return expired
+
+    def _get_session_url(self, pooled):
+        """URL of a pooled session on its grid"""
+        session_id, grid_url = self.grid_handler.unroll_session_id(pooled.session_id)
+        return '{0}/session/{1}'.format(self.grid_handler.get_webdriver_url(grid_url), session_id)
+
+    def _delete_session(self, pooled):
+        """Deletes a pooled session from its grid"""
+        try:
+            self.session.delete(self._get_session_url(pooled))
+        except RequestException:
+            logger.exception("Unable to delete pooled session %s", pooled.session_id)
+
+
+class WarmSessionPool(SessionPool):
+    """
+    Keeps sessions for the configured capability profiles started on grids with spare capacity, so that a
+    matching session request can be answered without waiting for a browser to start. The pool is refilled in
+    the background.
+    """
+
+    def __init__(self, config, grid_handler, session, executor, datadog):
+        super().__init__(config, grid_handler, session, executor, datadog)
+        self.profiles = {capabilities_key(profile['capabilities']): profile for profile in config['profiles']}
+
+    @property
+    def is_enabled(self):
+        return bool(self.profiles)
+
+    def acquire(self, session_request):
+        """
+        Claims a pooled session matching a session request.
+        :param session_request: Dictionary representing the request for a new session
+        :return: The response the pooled session was created with, or None if there is no matching session.
+        """
+        if not self.profiles:
+            return None
+
+        capabilities = get_capabilities(session_request)
+        key = capabilities_key(capabilities)
+        if key not in self.profiles or self.grid_handler.remote_grids.get_requested(capabilities):
+            return None
+
+        pooled = self._take(key)
+        self._wake.set()
+
+        self.datadog.send(
+            metric='amplium.session_pool.hit' if pooled else 'amplium.session_pool.miss',
+            metric_type='counter',
+            value=1,
+            tags=['profile:{0}'.format(self.profiles[key]['name'])]
+        )
+        if pooled is None:
+            return None
+        logger.info("Claimed pooled session %s on %s", pooled.session_id, pooled.grid_url)
+        return pooled.response
+
+    def maintain(self):
+        """Delete expired sessions, then start sessions for every profile below its size on spare capacity"""
+        self.reap()
+
+        for key, profile in self.profiles.items():
+            deficit = profile['size'] - self.get_size(key)
+            if deficit <= 0:
+                continue
+
+            # Both forms, so that the session suits clients of the legacy JSON wire protocol and of W3C
+            session_request = {
+                'desiredCapabilities': profile['capabilities'],
+                'capabilities': {'alwaysMatch': profile['capabilities']}
+            }
+            grid_urls = self.grid_handler.plan_base_urls(session_request, deficit)
+            # Never hold on to capacity that waiting session requests could use
+            if any(grid['queue'] for grid in self.grid_handler.grid_snapshot):
+                return
+
+            start_session = functools.partial(self._start_session, session_request)
+            for pooled in self.executor.map(start_session, grid_urls):
+                if pooled is not None:
+                    self._put(key, pooled)
+
+    def _start_session(self, session_request, grid_url):
+        """
+        Starts a session to pool.
+        :return: The pooled session, or None if it could not be started.
+        """
+        url = '{0}/session'.format(self.grid_handler.get_webdriver_url(grid_url))
+        start = time.monotonic()
+        try:
+            response = self.session.post(
+                url,
+                data=json_codec.dumps(session_request),
+                headers={'Content-Type': json_codec.MIMETYPE}
+            )
+            response = json_codec.loads(response.content)
+        except (RequestException, ValueError):
+            logger.exception("Unable to start a session for the pool on %s", grid_url)
+            self.grid_handler.stats.record(grid_url, SESSION_OPERATION, time.monotonic() - start, error=True)
+            return None
+
+        session_id = get_session_id(response)
+        self.grid_handler.stats.record(
+            grid_url, SESSION_OPERATION, time.monotonic() - start, error=session_id is None
+        )
+        if session_id is None:
+            return None
+
+        session_id = self.grid_handler.generate_session_id(session_id, grid_url)
+        set_session_id(response, session_id)
+        return PooledSession(
+            session_id=session_id,
+            grid_url=grid_url,
+            response=response,
+            idle_since=time.monotonic()
+        )
+
+
+class ReusableSessionPool(SessionPool):
+    """
+    Recycles sessions created with the 'amplium:reusable' capability. Deleting such a session resets its
+    state and returns it to the pool instead of quitting the browser, and the next session request with the
+    same capabilities reclaims it. Sessions are quit for real once they have been used 'max_uses' times.
+    """
+
+    def __init__(self, config, grid_handler, session, executor, datadog):
+        super().__init__(config, grid_handler, session, executor, datadog)
+        # Reusable sessions started through this instance, whether in use or idle, with their capabilities key
+        self._tracked = {}
+
+    @staticmethod
+    def is_reusable(capabilities):
+        """Whether a session request opted in to reuse"""
+        return is_truthy(str(capabilities.get(REUSABLE_CAPABILITY, False)))
+
+    def acquire(self, session_request):
+        """
+        Reclaims an idle session matching a reusable session request.
+        :param session_request: Dictionary representing the request for a new session
+        :return: The response the session was created with, or None if there is no matching session.
+        """
+        capabilities = get_capabilities(session_request)
+        if not self.is_reusable(capabilities):
+            return None
+
+        pooled = self._take(capabilities_key(capabilities))
+        self.datadog.send(
+            metric='amplium.reuse_pool.hit' if pooled else 'amplium.reuse_pool.miss',
+            metric_type='counter',
+            value=1
+        )
+        if pooled is None:
+            return None
+
+        with self._lock:
+            pooled.uses += 1
+            pooled.released = False
+        logger.info("Reclaimed session %s for its use %d", pooled.session_id, pooled.uses)
+        return pooled.response
+
+    def track(self, session_request, response):
+        """
+        Remembers a newly created session if its request opted in to reuse.
+        :param session_request: Dictionary representing the request for the new session
+        :param response: The response to the session request, containing Amplium's session id.
+        """
+        capabilities = get_capabilities(session_request)
+        session_id = get_session_id(response)
+        if session_id is None or not self.is_reusable(capabilities):
+            return
+
+        with self._lock:
+            if session_id in self._tracked:
+                return
+            self._tracked[session_id] = (capabilities_key(capabilities), PooledSession(
+                session_id=session_id,
+                grid_url=self.grid_handler.unroll_session_id(session_id)[1],
+                response=response,
+                idle_since=time.monotonic(),
+                uses=1
+            ))
+
+    def release(self, session_id):
+        """
+        Returns a reusable session to the pool instead of deleting it. Its state is reset in the background.
+        :param session_id: Amplium's id of the session being deleted.
+        :return: Whether the session will be reused, otherwise it should be deleted as usual.
+        """
+        with self._lock:
+            key, pooled = self._tracked.get(session_id, (None, None))
+            if pooled is None:
+                return False
+            if pooled.released:
+                logger.debug("Session %s was already released", session_id)
+                return True
+            is_full = len(self._idle[key]) >= self.config['max_idle']
+            if self._stopped.is_set() or pooled.uses >= self.config['max_uses'] or is_full:
+                del self._tracked[session_id]
+                return False
+            pooled.released = True
+
+        self.executor.submit(self._recycle, key, pooled)
+        return True
+
+    def _recycle(self, key, pooled):
+        """Resets a session's state and pools it, deleting it instead if it could not be reset"""
+        try:
+            self._reset(pooled)
+        except (RequestException, ValueError):
+            logger.exception("Unable to reset session %s, deleting it instead", pooled.session_id)
+            self._untrack(pooled)
+            self._delete_session(pooled)
+            return
+        if self._stopped.is_set():
+            self._untrack(pooled)
+            self._delete_session(pooled)
+            return
+        self._put(key, pooled)
+
+    def _reset(self, pooled):
+        """
+        Clears the state a test may have left in a session's browser.
+        :raises ValueError: If the browser refused a command.
+        """
+        session_url = self._get_session_url(pooled)
+        try:
+            self._command('POST', session_url + '/execute/sync', {'script': CLEAR_STORAGE_SCRIPT, 'args': []})
+        except ValueError:
+            # Browsers only speaking the legacy JSON wire protocol have no /execute/sync
+            self._command('POST', session_url + '/execute', {'script': CLEAR_STORAGE_SCRIPT, 'args': []})
+        self._command('DELETE', session_url + '/cookie')
+        self._command('POST', session_url + '/url', {'url': 'about:blank'})
+
+    def _command(self, method, url, data=None):
+        """Sends a WebDriver command to a pooled session, raising ValueError if it failed"""
+        response = self.session.request(
+            method=method,
+            url=url,
+            data=json_codec.dumps(data) if data is not None else None,
+            headers={'Content-Type': json_codec.MIMETYPE}
+        )
+        body = json_codec.loads(response.content) if response.content else {}
+        if response.status_code >= 400 or body.get('status', 0) != 0:
+            raise ValueError("{0} {1} failed with {2}: {3}".format(method, url, response.status_code, body))
+
+    def _untrack(self, pooled):
+        """Forgets a session that will not be reused"""
+        with self._lock:
+            self._tracked.pop(pooled.session_id, None)
+
+    def close(self):
+        """Deletes every idle session in the pool, and forgets them"""
+        with self._lock:
+            idle = [pooled for sessions in self._idle.values() for pooled in sessions]
+            self._idle.clear()
+            for pooled in idle:
+                self._tracked.pop(pooled.session_id, None)
+        for pooled in idle:
+            self._delete_session(pooled)
+
+    def reap(self):
+        """Delete pooled sessions that have been idle longer than the idle timeout, and forget them"""
+        for pooled in self._expire():
+            self._untrack(pooled)
+            self._delete_session(pooled)
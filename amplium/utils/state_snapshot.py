@@ -0,0 +1,160 @@
+"""Class for persisting Amplium's routing state across restarts"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict
+from urllib.parse import urlsplit
+
+from amplium.models.grid_node_data import GridNodeData
+from amplium.models.node_route import NodeRoute
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+class StateSnapshot:
+    """
+    Periodically writes the discovered grids, the hashes of every grid sessions were created on, the routes
+    of sessions to their nodes and the last capacity snapshot to a JSON lines file, one record per line.
+    A restarted process loads the file before serving requests, so that it can route the sessions created
+    by its predecessor straight away, while discovery reconnects and replaces the loaded state in the
+    background. Remote grids are left out, since their URLs can hold credentials and are known from the config
+    anyway, and the file is only readable by its owner.
+    """
+
+    def __init__(self, config, grid_handler, node_router):
+        self.config = config
+        self.grid_handler = grid_handler
+        self.node_router = node_router
+        self._lock = threading.Lock()
+
+    @property
+    def is_enabled(self):
+        """Whether the state is persisted at all"""
+        return bool(self.config['path'])
+
+    def start_listening(self):
+        """Start writing the snapshot in the background, if it is enabled"""
+        if not self.is_enabled:
+            return
+
+        # Write a last snapshot on the way out, so that the successor has the freshest routes
+        atexit.register(self.save)
+        thread = threading.Thread(target=self._save_forever, daemon=True)
+        thread.start()
+
+    def _save_forever(self):
+        """Write the snapshot periodically"""
+        while True:
+            time.sleep(self.config['interval'])
+            try:
+                self.save()
+            except Exception:
+                logger.exception('Error writing the state snapshot')
+
+    def get_records(self):
+        """
+        Collects the state to persist.
+        :return: List of JSON serializable records, each of which has a 'type'.
+        """
+        records = [{'type': 'header', 'version': SNAPSHOT_VERSION, 'written_at': time.time()}]
+        records.extend(
+            {'type': 'node', **asdict(node)}
+            for node in self.grid_handler.discovery.nodes
+        )
+        remote_urls = set(self.grid_handler.remote_grids.get_urls())
+        records.extend(
+            {'type': 'grid', 'hash': grid_hash, 'url': url}
+            for grid_hash, url in list(self.grid_handler.hashes_to_grids.items())
+            if url not in remote_urls and urlsplit(url).password is None
+        )
+        records.extend(
+            {'type': 'route', 'id': session_id, 'session_id': route.session_id, 'node_url': route.node_url}
+            for session_id, route in self.node_router.get_routes().items()
+        )
+        records.extend({'type': 'capacity', 'grid': grid} for grid in self.grid_handler.grid_snapshot)
+        return records
+
+    def save(self):
+        """Writes the snapshot, replacing the previous one only once it is complete"""
+        if not self.is_enabled:
+            return
+
+        path = self.config['path']
+        temporary_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        with self._lock:
+            descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, 'w') as snapshot:
+                for record in self.get_records():
+                    snapshot.write(json.dumps(record, separators=(',', ':')) + '\n')
+            os.replace(temporary_path, path)
+
+    def load(self):
+        """
+        Restores the state of a previous process, unless the snapshot is missing, unreadable or stale.
+        :return: Whether a snapshot was loaded.
+        """
+        if not self.is_enabled:
+            return False
+
+        try:
+            with open(self.config['path']) as snapshot:
+                records = [json.loads(line) for line in snapshot if line.strip()]
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError):
+            logger.exception('Unable to read the state snapshot %s', self.config['path'])
+            return False
+
+        header = records[0] if records and isinstance(records[0], dict) else {}
+        is_current = header.get('type') == 'header' and header.get('version') == SNAPSHOT_VERSION
+        if not is_current or not isinstance(header.get('written_at'), (int, float)):
+            logger.warning('Ignoring state snapshot %s written by another version', self.config['path'])
+            return False
+        age = time.time() - header['written_at']
+        if age > self.config['max_age']:
+            logger.info('Ignoring state snapshot %s written %d seconds ago', self.config['path'], age)
+            return False
+
+        self._restore(records[1:])
+        logger.info('Loaded state snapshot %s written %d seconds ago', self.config['path'], age)
+        return True
+
+    def _restore(self, records):
+        """
+        Restores the state in a list of records, without replacing anything already known. Records that are
+        invalid, such as those with a missing type or unknown fields, are skipped.
+        """
+        nodes, routes, capacity = [], {}, []
+        for record in records:
+            try:
+                fields = dict(record)
+                record_type = fields.pop('type', None)
+                if record_type == 'node':
+                    nodes.append(GridNodeData(**fields))
+                elif record_type == 'grid':
+                    self.grid_handler.hashes_to_grids.setdefault(fields['hash'], fields['url'])
+                elif record_type == 'route':
+                    # The hub may not have seen the session lately, so its next command goes through the hub
+                    routes[fields['id']] = NodeRoute(
+                        session_id=fields['session_id'],
+                        node_url=fields['node_url'],
+                        hub_contact=float('-inf')
+                    )
+                elif record_type == 'capacity':
+                    capacity.append(fields['grid'])
+                else:
+                    raise ValueError('Unknown record type {0!r}'.format(record_type))
+            except (KeyError, TypeError, ValueError):
+                logger.warning('Skipping invalid state snapshot record %r', record)
+
+        # Discovery may have connected already, in which case what it found is fresher
+        if not self.grid_handler.discovery.nodes:
+            self.grid_handler.discovery.nodes = nodes
+        if not self.grid_handler.grid_snapshot:
+            self.grid_handler.grid_snapshot = capacity
+        self.node_router.restore(routes)
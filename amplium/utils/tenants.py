@@ -0,0 +1,171 @@
+"""Class for sharing the grids fairly between tenants and between priority classes of session requests"""
+import contextlib
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from amplium.api.exceptions import TenantQuotaExceededException
+
+logger = logging.getLogger(__name__)
+
+TENANT_HEADER = 'X-Amplium-Tenant'
+TENANT_CAPABILITY = 'amplium:tenant'
+PRIORITY_CAPABILITY = 'amplium:priority'
+DEFAULT_TENANT = 'default'
+
+
+class TenantManager:
+    """
+    Identifies the tenant and priority class of session requests. Each tenant may have at most its quota of
+    sessions at once, counted by this instance of Amplium. Session requests waiting for capacity hold back
+    the requests of lower priority classes, so that freed capacity goes to the most urgent requests first.
+    Sessions that are never deleted through Amplium, such as those of crashed clients or those the hub timed
+    out, stop counting once they haven't been used for 'session_timeout' seconds.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        # Tenant and time of last use of every session, least recently used first
+        self._sessions = OrderedDict()
+        self._active = Counter()
+        self._waiting = Counter()
+        self._lock = threading.Lock()
+
+    def get_tenant(self, capabilities, header=None):
+        """
+        Identifies the tenant a session request is for.
+        :param capabilities: Dictionary of requested capabilities.
+        :param header: Value of the X-Amplium-Tenant header of the request, if it has one.
+        :return: The tenant's name, 'default' if the request doesn't name one.
+        """
+        return header or capabilities.get(TENANT_CAPABILITY) or DEFAULT_TENANT
+
+    def get_priority(self, capabilities, tenant):
+        """
+        Finds the priority class of a session request, from its 'amplium:priority' capability or the tenant's.
+        :param capabilities: Dictionary of requested capabilities.
+        :param tenant: The tenant the request is for.
+        :return: Index of the priority class, 0 being the most urgent.
+        """
+        priorities = self.config['priorities']
+        for name in (
+                capabilities.get(PRIORITY_CAPABILITY),
+                self.config['tenant_priorities'].get(tenant),
+                self.config['default_priority']
+        ):
+            if name in priorities:
+                return priorities.index(name)
+        return len(priorities) - 1
+
+    def get_quota(self, tenant):
+        """Most sessions a tenant may have at once, 0 for no limit"""
+        return self.config['quotas'].get(tenant, self.config['default_quota'])
+
+    def reserve(self, tenant, count=1):
+        """
+        Counts sessions being created against a tenant's quota.
+        :param tenant: The tenant the sessions are for.
+        :param count: Number of sessions being created.
+        :raises TenantQuotaExceededException: If the tenant doesn't have room for the sessions.
+        """
+        quota = self.get_quota(tenant)
+        with self._lock:
+            self._expire_sessions()
+            if quota and self._active[tenant] + count > quota:
+                raise TenantQuotaExceededException(
+                    "Tenant {0} has {1} of its {2} sessions".format(tenant, self._active[tenant], quota)
+                )
+            self._active[tenant] += count
+
+    def release(self, tenant, count=1):
+        """
+        Stops counting sessions that weren't created against a tenant's quota.
+        :param tenant: The tenant the sessions were for.
+        :param count: Number of sessions that weren't created.
+        """
+        with self._lock:
+            self._release(tenant, count)
+
+    def _release(self, tenant, count=1):
+        """Stops counting sessions against a tenant's quota, with the lock held"""
+        self._active[tenant] -= count
+        if self._active[tenant] <= 0:
+            del self._active[tenant]
+
+    def session_started(self, session_id, tenant):
+        """
+        Remembers the tenant of a reserved session, or releases the reservation if no session was created.
+        :param session_id: Amplium's id of the session, or None if it couldn't be created.
+        :param tenant: The tenant the session is for.
+        """
+        if session_id is None:
+            self.release(tenant)
+            return
+        with self._lock:
+            self._sessions[session_id] = (tenant, time.monotonic())
+
+    def session_used(self, session_id):
+        """
+        Records a command of a session, which keeps it counting against its tenant's quota.
+        :param session_id: Amplium's id of the session.
+        """
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id] = (self._sessions[session_id][0], time.monotonic())
+                self._sessions.move_to_end(session_id)
+
+    def session_ended(self, session_id):
+        """
+        Stops counting a session against its tenant's quota.
+        :param session_id: Amplium's id of the session.
+        """
+        with self._lock:
+            tenant, _ = self._sessions.pop(session_id, (None, None))
+            if tenant is not None:
+                self._release(tenant)
+
+    def _expire_sessions(self):
+        """Stops counting the sessions that weren't used within the session timeout, with the lock held"""
+        expired_before = time.monotonic() - self.config['session_timeout']
+        while self._sessions:
+            session_id, (tenant, used_at) = next(iter(self._sessions.items()))
+            if used_at >= expired_before:
+                break
+            logger.info("Session %s of tenant %s timed out without being deleted", session_id, tenant)
+            del self._sessions[session_id]
+            self._release(tenant)
+
+    @contextlib.contextmanager
+    def waiting(self, priority):
+        """
+        Counts a session request as waiting for capacity while the context is active.
+        :param priority: Index of the request's priority class.
+        """
+        with self._lock:
+            self._waiting[priority] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._waiting[priority] -= 1
+
+    def get_waiting_ahead(self, priority):
+        """
+        Counts the session requests of more urgent priority classes waiting for capacity.
+        :param priority: Index of a priority class.
+        :return: The number of waiting requests that capacity should go to first.
+        """
+        with self._lock:
+            return sum(count for ahead, count in self._waiting.items() if ahead < priority)
+
+    def to_dict(self):
+        """Returns the sessions of every tenant and the waiting requests of every priority class"""
+        with self._lock:
+            self._expire_sessions()
+            return {
+                'sessions': dict(self._active),
+                'waiting': {
+                    name: self._waiting[index] for index, name in enumerate(self.config['priorities'])
+                }
+            }
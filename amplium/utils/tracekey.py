@@ -25,9 +25,7 @@ def tracekey():
         return flask.g.tracekey
 
     # If we haven't, generate a new one, prepending the tracekey from our client if they gave us one
-    headers = flask.request.headers
-    original_tracekey = headers.get("X_WGEN_TRACEKEY")
-    new_tracekey = generate_tracekey(original_tracekey)
+    new_tracekey = generate_tracekey(client_tracekey())
 
     # Store our new tracekey for future reuse
     flask.g.tracekey = new_tracekey
@@ -35,6 +33,13 @@ def tracekey():
     return new_tracekey
 
 
+def client_tracekey():
+    """ Returns the tracekey the client sent with the current request, or None if it didn't send one """
+    if not flask.has_request_context():
+        return None
+    return flask.request.headers.get("X_WGEN_TRACEKEY")
+
+
 class TracekeyFilter(logging.Filter):
     """ Logging filter for making the tracekey available """
     def filter(self, record):
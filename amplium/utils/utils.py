@@ -31,3 +31,39 @@ def is_truthy(value):
     Return true if value resembles a affirmation
     """
     return value and value.lower() in ['true', 'yes', 't', 'y', 'aye', '1']
+
+
+def format_url(host, port):
+    """Builds the url of a Selenium Grid Hub based on the port number"""
+    protocol = "http"
+    if int(port) == 443:
+        protocol = "https"
+    return "{0}://{1}:{2}".format(protocol, host, port)
+
+
+def cmp_to_key(mycmp):
+    """Convert a cmp= function into a key= function"""
+    class Key:
+        """Convert a cmp= function into a key= function"""
+        def __init__(self, obj):
+            self.obj = obj
+
+        def __lt__(self, other):
+            return mycmp(self.obj, other.obj) < 0
+
+        def __gt__(self, other):
+            return mycmp(self.obj, other.obj) > 0
+
+        def __eq__(self, other):
+            return mycmp(self.obj, other.obj) == 0
+
+        def __le__(self, other):
+            return mycmp(self.obj, other.obj) <= 0
+
+        def __ge__(self, other):
+            return mycmp(self.obj, other.obj) >= 0
+
+        def __ne__(self, other):
+            return mycmp(self.obj, other.obj) != 0
+
+    return Key
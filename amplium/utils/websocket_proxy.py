@@ -0,0 +1,141 @@
+"""Class for proxying the WebSocket channels of sessions, such as Chrome DevTools and WebDriver BiDi"""
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp import web
+
+from amplium.utils.grid_handler import get_session_id
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_SCHEMES = {'http': 'ws', 'https': 'wss'}
+
+
+class WebSocketProxy:
+    """
+    Forwards the WebSocket channels of sessions, such as the 'se:cdp' and BiDi 'webSocketUrl' capabilities,
+    through Amplium. The WebSocket URLs in new sessions' capabilities are rewritten to point at the
+    forwarder, which is an asyncio application run next to the WSGI one, so that a single process holds
+    every open channel on one event loop. Channels are forwarded to the WebDriver URL of the session's hub
+    or remote grid, which is where Selenium Grid serves them.
+    """
+
+    def __init__(self, config, grid_handler):
+        self.config = config
+        self.grid_handler = grid_handler
+        self._client_session = None
+
+    @property
+    def is_enabled(self):
+        """Whether WebSocket URLs are rewritten to point at the forwarder"""
+        return bool(self.config['public_url'])
+
+    def rewrite_urls(self, response):
+        """
+        Points the WebSocket URLs in the capabilities of a new session at the forwarder.
+        :param response: The response to the session request, containing Amplium's session id.
+        """
+        session_id = get_session_id(response)
+        value = response.get('value')
+        if not self.is_enabled or session_id is None or not isinstance(value, dict):
+            return
+
+        # W3C responses nest the capabilities, legacy JSON wire protocol responses don't
+        capabilities = value.get('capabilities', value)
+        hub_session_id = self.grid_handler.unroll_session_id(session_id)[0]
+        for name, url in capabilities.items():
+            if isinstance(url, str) and url.startswith(('ws://', 'wss://')):
+                capabilities[name] = self._rewrite_url(url, session_id, hub_session_id)
+
+    def _rewrite_url(self, url, session_id, hub_session_id):
+        """Points a session's WebSocket URL at the forwarder, keeping the channel's path"""
+        prefix = '/session/{0}'.format(hub_session_id)
+        path = urlsplit(url).path
+        if url.startswith(self.config['public_url']) or not path.startswith(prefix + '/'):
+            return url
+        return '{0}/session/{1}{2}'.format(self.config['public_url'], session_id, path[len(prefix):])
+
+    def create_app(self):
+        """
+        Creates the forwarder's application.
+        :return: The aiohttp application serving the rewritten WebSocket URLs.
+        """
+        app = web.Application()
+        app.router.add_get('/session/{session_id}/{channel:.+}', self.handle)
+        app.on_startup.append(self._open_client_session)
+        app.on_cleanup.append(self._close_client_session)
+        return app
+
+    async def _open_client_session(self, _):
+        """Opens the client used for the hub side of every channel"""
+        # Channels are long lived, so the connection limit has to allow for every open channel
+        self._client_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.config['max_connections'])
+        )
+
+    async def _close_client_session(self, _):
+        """Closes the client used for the hub side of every channel"""
+        await self._client_session.close()
+
+    def get_upstream_url(self, session_id, channel):
+        """
+        Builds the URL of a session's WebSocket channel on its hub.
+        :param session_id: Amplium's id of the session.
+        :param channel: Path of the channel relative to the session, such as 'se/cdp'.
+        :return: The WebSocket URL on the hub.
+        """
+        hub_session_id, grid_url = self.grid_handler.unroll_session_id(session_id)
+        scheme, rest = self.grid_handler.get_webdriver_url(grid_url).split('://', 1)
+        return '{0}://{1}/session/{2}/{3}'.format(WEBSOCKET_SCHEMES[scheme], rest, hub_session_id, channel)
+
+    async def handle(self, request):
+        """Forwards a WebSocket channel between a client and the session's hub until either side closes it"""
+        session_id = request.match_info['session_id']
+        try:
+            upstream_url = self.get_upstream_url(session_id, request.match_info['channel'])
+        except KeyError as error:
+            raise web.HTTPNotFound(text='Unknown session {0}'.format(session_id)) from error
+
+        try:
+            upstream = await self._client_session.ws_connect(
+                upstream_url,
+                heartbeat=self.config['heartbeat'],
+                max_msg_size=self.config['max_message_size']
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            logger.exception("Unable to open WebSocket %s", upstream_url)
+            raise web.HTTPBadGateway(text='Unable to reach the grid') from error
+
+        client = web.WebSocketResponse(
+            heartbeat=self.config['heartbeat'],
+            max_msg_size=self.config['max_message_size']
+        )
+        await client.prepare(request)
+        logger.debug("Forwarding WebSocket of session %s to %s", session_id, upstream_url)
+
+        forwards = [
+            asyncio.ensure_future(self._forward(client, upstream)),
+            asyncio.ensure_future(self._forward(upstream, client))
+        ]
+        try:
+            await asyncio.wait(forwards, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for forward in forwards:
+                forward.cancel()
+            await upstream.close()
+            await client.close()
+        return client
+
+    @staticmethod
+    async def _forward(source, target):
+        """Sends every message received on one WebSocket to the other, until the first one closes"""
+        async for message in source:
+            if message.type == aiohttp.WSMsgType.TEXT:
+                await target.send_str(message.data)
+            elif message.type == aiohttp.WSMsgType.BINARY:
+                await target.send_bytes(message.data)
+            elif message.type == aiohttp.WSMsgType.ERROR:
+                logger.warning("WebSocket closed with error: %s", source.exception())
+                break
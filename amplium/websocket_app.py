@@ -0,0 +1,16 @@
+""" Run of Amplium's WebSocket forwarder, which runs next to the WSGI application """
+from aiohttp import web
+
+from amplium import CONFIG, RELOADER, STATE_SNAPSHOT, WEBSOCKETS
+
+
+def main():
+    """Serves the WebSocket channels of sessions until the process is stopped"""
+    # Sessions are resolved to their hub like in the WSGI application, which needs the discovered hubs
+    STATE_SNAPSHOT.load()
+    RELOADER.start_discovery()
+    web.run_app(WEBSOCKETS.create_app(), port=CONFIG.websockets['port'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""
+Benchmarks for Amplium. These are not collected as unit tests, run them as modules, e.g.
+AMPLIUM_CONFIG=config/example.yml python -m test.benchmark.load_benchmark --help
+"""
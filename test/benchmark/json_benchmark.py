@@ -0,0 +1,97 @@
+"""
+Benchmark of the JSON backends Amplium can use to decode and re-encode proxied WebDriver responses.
+
+Every proxied command decodes the hub's response and encodes it again for the client. This measures that
+round trip for each installed backend on typical WebDriver response sizes, so the per-command CPU savings
+of installing orjson or ujson can be seen before deploying them:
+
+    python -m test.benchmark.json_benchmark
+"""
+import argparse
+import base64
+import importlib
+import json
+import os
+import time
+
+PAYLOADS = {
+    'status': {'sessionId': 'a0b1c2d3e4f5', 'status': 0, 'value': None},
+    'find_elements': {
+        'status': 0,
+        'value': [
+            {'element-6066-11e4-a52e-4f735466cecf': 'element-{0}'.format(index)} for index in range(200)
+        ]
+    },
+    'capabilities': {
+        'sessionId': 'a0b1c2d3e4f5',
+        'status': 0,
+        'value': {
+            'browserName': 'chrome',
+            'browserVersion': '86.0.4240.75',
+            'platformName': 'linux',
+            'acceptInsecureCerts': False,
+            'timeouts': {'implicit': 0, 'pageLoad': 300000, 'script': 30000},
+            'goog:chromeOptions': {'debuggerAddress': 'localhost:42463'},
+            'chrome': {'chromedriverVersion': '86.0.4240.22', 'userDataDir': '/tmp/.com.google.Chrome.m1D4e6'}
+        }
+    },
+    'page_source': {'status': 0, 'value': '<div class="row">élément</div>\n' * 5000},
+    'screenshot': {'status': 0, 'value': base64.b64encode(os.urandom(750 * 1024)).decode('ascii')},
+}
+
+
+def load_backends():
+    """Imports the codec of every installed JSON backend, the same way json_codec would pick it"""
+    backends = {'json': (json.loads, lambda obj: json.dumps(obj, ensure_ascii=False).encode('utf-8'))}
+    for name in ('ujson', 'orjson'):
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        if name == 'orjson':
+            backends[name] = (module.loads, module.dumps)
+        else:
+            backends[name] = (module.loads, lambda obj, dumps=module.dumps: dumps(obj).encode('utf-8'))
+    return backends
+
+
+def measure(loads, dumps, body, min_time):
+    """
+    Measures decoding and re-encoding a response body.
+    :param loads: Function decoding JSON bytes.
+    :param dumps: Function encoding an object to JSON bytes.
+    :param body: The encoded response body.
+    :param min_time: Minimum number of seconds to run for.
+    :return: Microseconds of CPU time per round trip.
+    """
+    iterations = 0
+    start = time.process_time()
+    elapsed = 0.0
+    while elapsed < min_time:
+        dumps(loads(body))
+        iterations += 1
+        elapsed = time.process_time() - start
+    return elapsed / iterations * 1e6
+
+
+def main():
+    """Entry point for the JSON benchmark"""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--min-time', type=float, default=0.5, help='Seconds to run each benchmark for')
+    args = parser.parse_args()
+
+    backends = load_backends()
+    print('{0:<14} {1:>10} {2}'.format('payload', 'bytes', ''.join('{0:>14}'.format(n) for n in backends)))
+    for name, payload in PAYLOADS.items():
+        body = json.dumps(payload).encode('utf-8')
+        timings = [measure(loads, dumps, body, args.min_time) for loads, dumps in backends.values()]
+        print('{0:<14} {1:>10,} {2}'.format(
+            name, len(body), ''.join('{0:>11,.1f} us'.format(timing) for timing in timings)
+        ))
+
+
+if __name__ == '__main__':
+    main()
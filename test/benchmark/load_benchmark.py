@@ -0,0 +1,237 @@
+"""
+End to end load benchmark for Amplium against simulated Selenium Grid hubs.
+
+Starts a number of fake hubs, points Amplium's discovery at them, serves Amplium over HTTP and drives it
+with concurrent simulated WebDriver clients. Results are printed and can be written to a JSON file and
+compared against a previous run to catch regressions between commits:
+
+    AMPLIUM_CONFIG=config/example.yml python -m test.benchmark.load_benchmark --output before.json
+    AMPLIUM_CONFIG=config/example.yml python -m test.benchmark.load_benchmark --compare before.json
+"""
+import argparse
+import json
+import logging
+import resource
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from werkzeug.serving import make_server
+
+from test.helpers.fake_grid import FakeDiscovery, FakeHub  # pylint: disable=wrong-import-order
+
+
+def percentiles(samples):
+    """Summarizes a list of durations, in milliseconds"""
+    if not samples:
+        return {}
+    samples = sorted(samples)
+
+    def percentile(fraction):
+        return round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 3)
+
+    return {
+        'count': len(samples),
+        'mean': round(sum(samples) / len(samples) * 1000, 3),
+        'p50': percentile(0.5),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'max': round(samples[-1] * 1000, 3)
+    }
+
+
+class LoadBenchmark:
+    """Drives Amplium with simulated WebDriver clients and records what it costs"""
+
+    def __init__(self, args):
+        self.args = args
+        self.hubs = [
+            FakeHub(
+                nodes=args.nodes,
+                max_sessions=args.max_sessions,
+                latency=args.hub_latency,
+                session_start_latency=args.session_start_latency,
+                failure_rate=args.failure_rate,
+                screenshot_size=args.screenshot_size
+            ).start()
+            for _ in range(args.hubs)
+        ]
+        self.samples = {'create_session': [], 'command': [], 'screenshot': [], 'delete_session': []}
+        self.errors = 0
+        self._lock = threading.Lock()
+
+        # Point Amplium at the fake hubs before the app registers discovery with Flask
+        # pylint: disable=import-outside-toplevel
+        import amplium
+        amplium.DISCOVERY = FakeDiscovery([hub.grid_node_data for hub in self.hubs])
+        amplium.GRID_HANDLER.discovery = amplium.DISCOVERY
+        amplium.GRID_HANDLER.remote_grids.remote_grids.clear()
+        from amplium.app import application
+
+        self.grid_handler = amplium.GRID_HANDLER
+        self.server = make_server('127.0.0.1', 0, application, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{0}/proxy'.format(self.server.server_port)
+
+        self.client = requests.Session()
+        adapter = HTTPAdapter(pool_connections=args.clients, pool_maxsize=args.clients)
+        self.client.mount('http://', adapter)
+
+    def _timed(self, name, method, url, **kwargs):
+        start = time.perf_counter()
+        response = self.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.samples[name].append(elapsed)
+            if response.status_code >= 400:
+                self.errors += 1
+        return response
+
+    def run_client(self, _):
+        """Runs a single simulated test: create a session, run some commands and delete it"""
+        response = self._timed(
+            'create_session',
+            'POST',
+            self.url + '/session',
+            json={'desiredCapabilities': {'browserName': 'chrome'}}
+        )
+        session_id = response.json().get('sessionId')
+        if not session_id:
+            return
+
+        session_url = '{0}/session/{1}'.format(self.url, session_id)
+        for _ in range(self.args.commands):
+            self._timed('command', 'POST', session_url + '/url', json={'url': 'about:blank'})
+        if self.args.screenshot_size:
+            self._timed('screenshot', 'GET', session_url + '/screenshot')
+        self._timed('delete_session', 'DELETE', session_url)
+
+    def measure_scrape(self, iterations=20):
+        """Measures the time and allocations of scraping every hub for capacity"""
+        tracemalloc.start()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            self.grid_handler.get_grid_info()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'per_scrape_ms': round(elapsed / iterations * 1000, 3),
+            'per_hub_ms': round(elapsed / iterations / len(self.hubs) * 1000, 3),
+            'peak_allocated_kb': round(peak / 1024, 1)
+        }
+
+    def run(self):
+        """Runs the benchmark and returns its results"""
+        scrape = self.measure_scrape()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.clients) as executor:
+            list(executor.map(self.run_client, range(self.args.sessions)))
+        wall_time = time.perf_counter() - start
+
+        commands = percentiles(self.samples['command'])
+        return {
+            'commit': _git_commit(),
+            'parameters': vars(self.args),
+            'wall_time_s': round(wall_time, 3),
+            'sessions_per_s': round(len(self.samples['create_session']) / wall_time, 2),
+            'errors': self.errors,
+            'create_session': percentiles(self.samples['create_session']),
+            'command': commands,
+            # The fake hub sleeps for hub_latency on every command, anything on top is Amplium's overhead
+            'command_overhead_p50_ms': round(commands.get('p50', 0) - self.args.hub_latency * 1000, 3),
+            'screenshot': percentiles(self.samples['screenshot']),
+            'delete_session': percentiles(self.samples['delete_session']),
+            'scrape': scrape,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        }
+
+    def stop(self):
+        """Stops Amplium and the fake hubs"""
+        self.server.shutdown()
+        for hub in self.hubs:
+            hub.stop()
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD']).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the change of the headline metrics against a baseline run.
+    :return: True if no metric regressed by more than the tolerance.
+    """
+    metrics = [
+        ('create_session', 'p50'), ('create_session', 'p99'),
+        ('command', 'p50'), ('command', 'p99'),
+        ('screenshot', 'p50'), ('scrape', 'per_scrape_ms')
+    ]
+    passed = True
+    for section, metric in metrics:
+        before = baseline.get(section, {}).get(metric)
+        after = results.get(section, {}).get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        regressed = change > tolerance
+        passed = passed and not regressed
+        print('{0}.{1}: {2} -> {3} ({4:+.1%}){5}'.format(
+            section, metric, before, after, change, ' REGRESSION' if regressed else ''
+        ))
+    return passed
+
+
+def main():
+    """Entry point for the load benchmark"""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--hubs', type=int, default=4, help='Number of fake hubs')
+    parser.add_argument('--nodes', type=int, default=2, help='Number of fake nodes per hub')
+    parser.add_argument('--max-sessions', type=int, default=10, help='Sessions per fake node')
+    parser.add_argument('--clients', type=int, default=50, help='Concurrent simulated WebDriver clients')
+    parser.add_argument('--sessions', type=int, default=500, help='Total sessions to run')
+    parser.add_argument('--commands', type=int, default=10, help='Commands per session')
+    parser.add_argument('--hub-latency', type=float, default=0.0, help='Seconds the hubs take per command')
+    parser.add_argument('--session-start-latency', type=float, default=0.0,
+                        help='Seconds the hubs take to start a browser')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests the hubs fail')
+    parser.add_argument('--screenshot-size', type=int, default=0,
+                        help='Bytes of screenshot to take once per session, 0 to skip screenshots')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Compare the results against this JSON file from a previous run')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed regression when comparing')
+    args = parser.parse_args()
+
+    # Logging every proxied request would dominate the results
+    logging.disable(logging.INFO)
+
+    benchmark = LoadBenchmark(args)
+    try:
+        results = benchmark.run()
+    finally:
+        benchmark.stop()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            if not compare(results, json.load(baseline), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Micro-benchmarks for the routing and placement functions Amplium runs on every request.
+
+Each function is measured against synthetic fleets of increasing size, reporting operations per second and
+the peak memory allocated by a single call, so that scaling behaviour can be compared between commits:
+
+    AMPLIUM_CONFIG=config/example.yml python -m test.benchmark.micro_benchmark --output before.json
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+
+from mock import MagicMock
+
+from amplium import CONFIG
+from amplium.api import proxy
+from amplium.models.grid_node_data import GridNodeData
+from amplium.placement.least_queue import LeastQueueStrategy
+from amplium.remote_grids.remote_grid_registry import RemoteGridRegistry
+from amplium.utils.grid_handler import GridHandler
+from amplium.utils.grid_stats import GridStats
+from amplium.utils.utils import cmp_to_key, format_url
+from test.helpers.fake_grid import FakeDiscovery  # pylint: disable=wrong-import-order
+
+FLEET_SIZES = (1, 10, 100, 1000, 10000)
+
+
+class CannedSession:
+    """Stands in for a requests session, returning the same prebuilt response for every request"""
+
+    def __init__(self, payload):
+        self.response = MagicMock(status_code=200, content=json.dumps(payload).encode('utf-8'))
+
+    def get(self, *_, **__):
+        """Returns the canned response"""
+        return self.response
+
+    def request(self, *_, **__):
+        """Returns the canned response"""
+        return self.response
+
+
+def measure(func, min_time):
+    """
+    Measures a function.
+    :param func: Function taking no arguments.
+    :param min_time: Minimum number of seconds to run the function for.
+    :return: Dictionary of operations per second and the peak memory allocated by one call.
+    """
+    iterations = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        func()
+        iterations += 1
+        elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'ops_per_s': round(iterations / elapsed, 1),
+        'peak_allocated_bytes': peak - baseline
+    }
+
+
+def synthetic_grids(size):
+    """Capacity snapshot of a fleet of grids with a spread of queues and capacities"""
+    return [
+        {
+            'host': 'grid-{0}'.format(index),
+            'port': 4444,
+            'queue': index % 3,
+            'total_capacity': 10 + index % 7,
+            'available_capacity': 1 + index % 5
+        }
+        for index in range(size)
+    ]
+
+
+def synthetic_sessions(size):
+    """A node's session list with the given number of sessions"""
+    return {
+        'status': 0,
+        'value': [
+            {
+                'capabilities': {
+                    'browserName': ('chrome', 'firefox')[index % 2],
+                    'browserVersion': str(index % 4)
+                }
+            }
+            for index in range(size)
+        ]
+    }
+
+
+def make_grid_handler(size):
+    """GridHandler with a fleet of the given size in discovery and in its hash table"""
+    discovery = FakeDiscovery([
+        GridNodeData(name=None, host='grid-{0}'.format(index), port=4444)
+        for index in range(size)
+    ])
+    grid_handler = GridHandler(
+        config=CONFIG,
+        discovery=discovery,
+        datadog=MagicMock(),
+        remote_grids=RemoteGridRegistry([]),
+        session=CannedSession(synthetic_sessions(size)),
+        stats=GridStats()
+    )
+    for node in discovery.nodes:
+        grid_handler.store_grid_url(format_url(node.host, node.port))
+    grid_handler.get_all_registered_nodes_ip = MagicMock(return_value=['http://node:5555'])
+    return grid_handler
+
+
+def benchmark_fleet(size, min_time):
+    """Runs every micro-benchmark against a fleet of the given size"""
+    grid_handler = make_grid_handler(size)
+    session_id = grid_handler.generate_session_id('a0b1c2d3-e4f5', 'http://grid-0:4444')
+    grid_hash = session_id.split('-')[-1]
+    grids = synthetic_grids(size)
+    strategy = LeastQueueStrategy(config=CONFIG, stats=grid_handler.stats)
+
+    def retrieve_grid_url_miss():
+        grid_handler.hashes_to_grids.clear()
+        grid_handler.retrieve_grid_url(grid_hash)
+
+    proxy.GRID_HANDLER = grid_handler
+    proxy.SESSION = CannedSession({'status': 0, 'value': None})
+
+    return {
+        'generate_session_id': measure(
+            lambda: grid_handler.generate_session_id('a0b1c2d3-e4f5', 'http://grid-0:4444'), min_time
+        ),
+        'unroll_session_id': measure(lambda: grid_handler.unroll_session_id(session_id), min_time),
+        'retrieve_grid_url': measure(lambda: grid_handler.retrieve_grid_url(grid_hash), min_time),
+        'retrieve_grid_url_miss': measure(retrieve_grid_url_miss, min_time),
+        'placement_select': measure(lambda: strategy.select(grids), min_time),
+        'cmp_to_key_sort': measure(lambda: sorted(grids, key=cmp_to_key(strategy.compare_node)), min_time),
+        'get_usage_per_browser_type': measure(
+            lambda: grid_handler.get_usage_per_browser_type('http://grid-0:4444'), min_time
+        ),
+        'send_request': measure(
+            lambda: proxy.send_request('POST', session_id, 'url', {'url': 'about:blank'}), min_time
+        ),
+    }
+
+
+def main():
+    """Entry point for the micro-benchmarks"""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=FLEET_SIZES, help='Fleet sizes to benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds to run each benchmark for')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    # Keep INFO logging enabled but discarded, so send_request pays for its log records like in production
+    logging.getLogger('amplium').handlers = [logging.NullHandler()]
+    logging.getLogger('amplium').propagate = False
+
+    results = {}
+    for size in args.sizes:
+        results[size] = benchmark_fleet(size, args.min_time)
+        for name, result in results[size].items():
+            print('{0:>6} {1:<28} {2:>14,.1f} ops/s {3:>12,} bytes'.format(
+                size, name, result['ops_per_s'], result['peak_allocated_bytes']
+            ))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
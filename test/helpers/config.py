@@ -0,0 +1,16 @@
+"""
+Mocked configuration sections for unit tests
+"""
+import copy
+
+
+def mock_config(defaults, **overrides):
+    """
+    Mocks a section of the configuration.
+    :param defaults: Dictionary of the settings of the section the tests rely on.
+    :param overrides: Settings replacing the defaults.
+    :return: A new dictionary of the settings, which tests may change like a reloaded configuration.
+    """
+    config = copy.deepcopy(defaults)
+    config.update(overrides)
+    return config
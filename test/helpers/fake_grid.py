@@ -0,0 +1,260 @@
+"""
+Simulated Selenium Grid hubs and nodes for load testing and benchmarking Amplium without real browsers
+"""
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+from amplium.models.grid_node_data import GridNodeData
+from amplium.service_discovery.abstract_discovery import AbstractDiscovery
+
+
+class FakeDiscovery(AbstractDiscovery):
+    """Stands in for Zookeeper or Consul discovery with a fixed list of grids"""
+
+    def __init__(self, nodes: List[GridNodeData]):
+        self.nodes = nodes
+
+    def get_nodes(self, children: List[str] = None):
+        pass
+
+    def start_listening(self):
+        pass
+
+
+class _FakeServer(ThreadingHTTPServer):
+    """HTTP server that knows about the fake grid component it serves"""
+    daemon_threads = True
+
+    def __init__(self, component, handler_class):
+        super().__init__(('127.0.0.1', 0), handler_class)
+        self.component = component
+
+    @property
+    def url(self):
+        """Base URL of the server"""
+        return "http://{0}:{1}".format(*self.server_address)
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    """Request handler that dispatches to the fake grid component and speaks JSON"""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Keep the benchmark output clean"""
+
+    def _handle(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, payload, content_type = self.server.component.handle(method, self.path, body)
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handles GET requests"""
+        self._handle('GET')
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handles POST requests"""
+        self._handle('POST')
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        """Handles DELETE requests"""
+        self._handle('DELETE')
+
+
+class FakeNode:
+    """A simulated Selenium Grid node that reports the sessions running on it"""
+
+    def __init__(self, max_sessions):
+        self.max_sessions = max_sessions
+        self.sessions: Dict[str, Dict] = {}
+        self.server = _FakeServer(self, _JsonHandler)
+
+    @property
+    def url(self):
+        """Base URL of the node"""
+        return self.server.url
+
+    def handle(self, method, path, _):
+        """Serves the node's session list"""
+        if method == 'GET' and path.rstrip('/').endswith('/sessions'):
+            sessions = [
+                {'id': session_id, 'capabilities': capabilities}
+                for session_id, capabilities in list(self.sessions.items())
+            ]
+            return 200, {'status': 0, 'value': sessions}, 'application/json'
+        return 404, {'status': 9, 'value': 'Unknown command'}, 'application/json'
+
+
+class FakeHub:
+    """
+    A simulated Selenium Grid hub with a number of nodes. Supports enough of the Grid 3 API for Amplium to
+    scrape its capacity and enough of WebDriver to run sessions. Grid 4 style routes without the '/wd/hub'
+    prefix and the Grid 4 '/status' endpoint are also served.
+    """
+
+    def __init__(self, nodes=2, max_sessions=5, latency=0.0, session_start_latency=0.0,
+                 failure_rate=0.0, screenshot_size=0, queue_timeout=30.0):
+        # pylint: disable=too-many-arguments
+        self.latency = latency
+        self.session_start_latency = session_start_latency
+        self.failure_rate = failure_rate
+        self.queue_timeout = queue_timeout
+        self.screenshot = base64.b64encode(b'\0' * screenshot_size) if screenshot_size else b''
+        self.nodes = [FakeNode(max_sessions) for _ in range(nodes)]
+        self.sessions: Dict[str, FakeNode] = {}
+        self.queue = 0
+        self._slot_freed = threading.Condition()
+        self.server = _FakeServer(self, _JsonHandler)
+
+    @property
+    def url(self):
+        """Base URL of the hub"""
+        return self.server.url
+
+    @property
+    def grid_node_data(self):
+        """Discovery data for the hub"""
+        host, port = self.server.server_address
+        return GridNodeData(name=self.url, host=host, port=port)
+
+    def start(self):
+        """Starts serving the hub and its nodes in background threads"""
+        for server in [self.server] + [node.server for node in self.nodes]:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stops serving the hub and its nodes"""
+        for server in [self.server] + [node.server for node in self.nodes]:
+            server.shutdown()
+            server.server_close()
+
+    def handle(self, method, path, body):  # pylint: disable=too-many-return-statements
+        """Routes a request to the hub"""
+        parsed = urlparse(path)
+        route = parsed.path
+        if route.startswith('/wd/hub'):
+            route = route[len('/wd/hub'):]
+
+        if route == '/grid/console':
+            return 200, self._console().encode(), 'text/html'
+        if route.rstrip('/') == '/grid/api/proxy':
+            return 200, self._proxy_configuration(json.loads(body or b'{}')), 'application/json'
+        if route == '/grid/api/hub':
+            return 200, self._hub_status(), 'application/json'
+        if route == '/grid/api/testsession':
+            return self._test_session(parse_qs(parsed.query).get('session', [''])[0])
+        if route == '/status':
+            return 200, self._grid4_status(), 'application/json'
+        if route == '/session' and method == 'POST':
+            return self._create_session(json.loads(body or b'{}'))
+        if route.startswith('/session/'):
+            return self._command(method, route.split('/')[2], '/'.join(route.split('/')[3:]))
+        return 404, {'status': 9, 'value': 'Unknown command'}, 'application/json'
+
+    def _console(self):
+        return ''.join('<p>id : {0}, OS : LINUX</p>'.format(node.url) for node in self.nodes)
+
+    def _proxy_configuration(self, data):
+        node = next((node for node in self.nodes if node.url == data.get('id')), self.nodes[0])
+        return {'success': True, 'request': {'configuration': {'maxSession': node.max_sessions}}}
+
+    def _hub_status(self):
+        total = sum(node.max_sessions for node in self.nodes)
+        used = sum(len(node.sessions) for node in self.nodes)
+        return {
+            'success': True,
+            'newSessionRequestCount': self.queue,
+            'slotCounts': {'free': total - used, 'total': total}
+        }
+
+    def _grid4_status(self):
+        return {
+            'value': {
+                'ready': True,
+                'nodes': [
+                    {'uri': node.url, 'maxSessions': node.max_sessions, 'sessionCount': len(node.sessions)}
+                    for node in self.nodes
+                ]
+            }
+        }
+
+    def _test_session(self, session_id):
+        node = self.sessions.get(session_id)
+        if node is None:
+            return 200, {'success': False, 'msg': 'Cannot find test slot running session'}, 'application/json'
+        return 200, {
+            'success': True,
+            'msg': 'slot found !',
+            'session': session_id,
+            'internalKey': session_id,
+            'inactivityTime': 0,
+            'proxyId': node.url
+        }, 'application/json'
+
+    def _free_node(self) -> Optional[FakeNode]:
+        for node in self.nodes:
+            if len(node.sessions) < node.max_sessions:
+                return node
+        return None
+
+    def _create_session(self, session_request):
+        capabilities = dict(session_request.get('desiredCapabilities') or {})
+        capabilities.update((session_request.get('capabilities') or {}).get('alwaysMatch') or {})
+        capabilities.setdefault('browserName', 'chrome')
+        capabilities.setdefault('browserVersion', '1')
+
+        deadline = time.monotonic() + self.queue_timeout
+        with self._slot_freed:
+            self.queue += 1
+            node = self._free_node()
+            while node is None and time.monotonic() < deadline:
+                self._slot_freed.wait(deadline - time.monotonic())
+                node = self._free_node()
+            self.queue -= 1
+            if node is None:
+                error = {'message': 'Timed out waiting for a node'}
+                return 500, {'status': 33, 'value': error}, 'application/json'
+
+            session_id = uuid.uuid4().hex
+            node.sessions[session_id] = capabilities
+            self.sessions[session_id] = node
+
+        time.sleep(self.session_start_latency)
+        if random.random() < self.failure_rate:
+            self._release(session_id)
+            return 500, {'status': 33, 'value': {'message': 'Browser failed to start'}}, 'application/json'
+        return 200, {'status': 0, 'sessionId': session_id, 'value': capabilities}, 'application/json'
+
+    def _release(self, session_id):
+        with self._slot_freed:
+            node = self.sessions.pop(session_id, None)
+            if node is not None:
+                node.sessions.pop(session_id, None)
+            self._slot_freed.notify()
+
+    def _command(self, method, session_id, command):
+        time.sleep(self.latency)
+        if session_id not in self.sessions:
+            return 404, {'status': 6, 'value': {'error': 'invalid session id'}}, 'application/json'
+        if random.random() < self.failure_rate:
+            return 500, {'status': 13, 'value': {'error': 'unknown error'}}, 'application/json'
+        if method == 'DELETE' and not command:
+            self._release(session_id)
+        if command.endswith('screenshot'):
+            return 200, b'{"status": 0, "value": "' + self.screenshot + b'"}', 'application/json'
+        return 200, {'status': 0, 'sessionId': session_id, 'value': None}, 'application/json'
@@ -0,0 +1,172 @@
+"""Unit testing for util/admission.py"""
+import unittest
+
+import requests
+from mock import MagicMock
+
+from amplium.api.exceptions import IntegrationNotConfigured, NoAvailableCapacityException, OverloadedException
+from amplium.utils.admission import AdaptiveLimiter, AdmissionController
+from test.helpers.config import mock_config  # pylint: disable=wrong-import-order
+
+
+# Settings of a limiter the tests rely on
+LIMITER_CONFIG = {
+    'initial_limit': 4,
+    'min_limit': 2,
+    'max_limit': 6,
+    'latency_tolerance': 2.0,
+    'backoff_ratio': 0.5,
+    'latency_alpha': 0.5
+}
+
+
+class AdaptiveLimiterUnitTests(unittest.TestCase):
+    """Unit tests for the AIMD limiter"""
+
+    def setUp(self):
+        self.limiter = AdaptiveLimiter('commands', mock_config(LIMITER_CONFIG))
+
+    def fill(self):
+        """Admits requests until the limiter is full"""
+        admitted = 0
+        while self.limiter.try_acquire():
+            admitted += 1
+        return admitted
+
+    def test_limit(self):
+        """Tests that requests beyond the limit aren't admitted"""
+        self.assertEqual(self.fill(), 4)
+        self.limiter.release(1.0)
+        self.assertTrue(self.limiter.try_acquire())
+
+    def test_increase(self):
+        """Tests that the limit grows while it is in use and requests succeed, up to the maximum"""
+        self.fill()
+        for _ in range(4):
+            self.limiter.release(1.0)
+        self.assertEqual(self.limiter.limit, 6)
+
+        self.fill()
+        for _ in range(6):
+            self.limiter.release(1.0)
+        self.assertEqual(self.limiter.limit, 6)
+
+    def test_no_increase_when_unused(self):
+        """Tests that the limit doesn't grow while most of it is unused"""
+        for _ in range(10):
+            self.limiter.try_acquire()
+            self.limiter.release(1.0)
+        self.assertEqual(self.limiter.limit, 4)
+
+    def test_decrease_on_overload(self):
+        """Tests that the limit shrinks when the grids are overloaded, down to the minimum"""
+        self.limiter.try_acquire()
+        self.limiter.release(1.0, overloaded=True)
+        self.assertEqual(self.limiter.limit, 2)
+
+        self.limiter.try_acquire()
+        self.limiter.release(1.0, overloaded=True)
+        self.assertEqual(self.limiter.limit, 2)
+        self.assertIsNone(self.limiter.baseline)
+
+    def test_decrease_on_latency(self):
+        """Tests that the limit shrinks when requests take much longer than usual"""
+        self.limiter.try_acquire()
+        self.limiter.release(1.0)
+        self.limiter.try_acquire()
+        self.limiter.release(1.5)
+        self.assertEqual(self.limiter.limit, 4)
+        self.assertEqual(self.limiter.baseline, 1.25)
+
+        self.limiter.try_acquire()
+        self.limiter.release(3.0)
+        self.assertEqual(self.limiter.limit, 2)
+        self.assertEqual(self.limiter.baseline, 1.25)
+
+    def test_latency_tolerance_disabled(self):
+        """Tests that only failures shrink the limit without a latency tolerance"""
+        self.limiter.config = mock_config(LIMITER_CONFIG, latency_tolerance=0)
+        self.limiter.try_acquire()
+        self.limiter.release(1.0)
+        self.limiter.try_acquire()
+        self.limiter.release(100.0)
+        self.assertEqual(self.limiter.limit, 4)
+
+
+class AdmissionControllerUnitTests(unittest.TestCase):
+    """Unit tests for shedding requests"""
+
+    def setUp(self):
+        self.datadog = MagicMock()
+        self.controller = AdmissionController(
+            config={
+                'enabled': True,
+                'retry_after': 1.5,
+                'sessions': mock_config(LIMITER_CONFIG, initial_limit=1),
+                'commands': mock_config(LIMITER_CONFIG)
+            },
+            datadog=self.datadog
+        )
+
+    def test_admit(self):
+        """Tests that admitted handlers run and free their slot afterwards"""
+        handler = self.controller.admit('sessions')(MagicMock(return_value='response'))
+        self.assertEqual(handler('new_session'), 'response')
+        self.assertEqual(handler('new_session'), 'response')
+        self.assertEqual(self.controller.sessions.in_flight, 0)
+
+    def test_admit_error(self):
+        """Tests that handlers that raise free their slot"""
+        handler = self.controller.admit('sessions')(MagicMock(side_effect=ValueError))
+        with self.assertRaises(ValueError):
+            handler()
+        self.assertEqual(self.controller.sessions.in_flight, 0)
+
+    def test_shed(self):
+        """Tests that requests beyond the limit are shed with a Retry-After"""
+        self.controller.sessions.try_acquire()
+        handler = MagicMock()
+
+        with self.assertRaises(OverloadedException) as context:
+            self.controller.admit('sessions')(handler)()
+
+        handler.assert_not_called()
+        self.assertEqual(context.exception.status_code, 503)
+        self.assertEqual(context.exception.headers, {'Retry-After': '2'})
+        self.datadog.send.assert_called_once_with(
+            metric='amplium.admission.shed', metric_type='counter', value=1, tags=['limiter:sessions']
+        )
+
+    def test_separate_limits(self):
+        """Tests that full session creation doesn't stop commands"""
+        self.controller.sessions.try_acquire()
+        handler = self.controller.admit('commands')(MagicMock(return_value='response'))
+        self.assertEqual(handler(), 'response')
+
+    def test_overloaded(self):
+        """Tests that responses showing the grids are overloaded shrink the limit"""
+        handler = self.controller.admit('commands', is_overloaded=lambda response: True)(MagicMock())
+        handler()
+        self.assertEqual(self.controller.commands.limit, 2)
+
+    def test_overloaded_error(self):
+        """Tests that handlers failing because of the grids shrink the limit, unlike other errors"""
+        for error in (ValueError, NoAvailableCapacityException):
+            handler = self.controller.admit('commands')(MagicMock(side_effect=error))
+            with self.assertRaises(error):
+                handler()
+        self.assertEqual(self.controller.commands.limit, 4)
+
+        for error in (requests.ConnectionError, IntegrationNotConfigured):
+            handler = self.controller.admit('commands')(MagicMock(side_effect=error))
+            with self.assertRaises(error):
+                handler()
+        self.assertEqual(self.controller.commands.limit, 2)
+        self.assertEqual(self.controller.commands.in_flight, 0)
+
+    def test_disabled(self):
+        """Tests that nothing is shed when admission control is disabled"""
+        self.controller.config['enabled'] = False
+        self.controller.sessions.try_acquire()
+        handler = self.controller.admit('sessions')(MagicMock(return_value='response'))
+        self.assertEqual(handler(), 'response')
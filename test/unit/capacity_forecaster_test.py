@@ -0,0 +1,92 @@
+"""Unit testing for util/capacity_forecaster.py"""
+import unittest
+
+from mock import patch
+
+from amplium.utils.capacity_forecaster import CapacityForecaster
+
+
+def full_grid(queue=0, total_capacity=2):
+    """Capacity snapshot of a grid without available capacity"""
+    return {'host': 'test_host_1', 'port': 1234, 'available_capacity': 0, 'total_capacity': total_capacity,
+            'queue': queue}
+
+
+@patch('amplium.utils.capacity_forecaster.time.monotonic')
+class CapacityForecasterUnitTests(unittest.TestCase):
+    """Unit tests for the capacity forecaster"""
+
+    def setUp(self):
+        self.forecaster = CapacityForecaster(alpha=0.5)
+
+    def run_session(self, mock_monotonic, session_id, browser, start, end):
+        """Runs a session through the forecaster"""
+        mock_monotonic.return_value = start
+        self.forecaster.session_started(session_id, {'browserName': browser})
+        mock_monotonic.return_value = end
+        self.forecaster.session_ended(session_id)
+
+    def test_no_data(self, _):
+        """Tests that nothing is predicted before any session has ended"""
+        self.assertIsNone(self.forecaster.predict_wait(full_grid()))
+        self.assertIsNone(self.forecaster.get_arrival_rate())
+
+    def test_available_capacity(self, _):
+        """Tests that grids with available capacity have no wait"""
+        grid = dict(full_grid(), available_capacity=1)
+        self.assertEqual(self.forecaster.predict_wait(grid), 0.0)
+
+    def test_predict_wait(self, mock_monotonic):
+        """Tests that the wait accounts for the queue and how quickly the grid's slots turn over"""
+        self.run_session(mock_monotonic, 'a', 'chrome', 0, 100)
+
+        self.assertEqual(self.forecaster.predict_wait(full_grid(queue=0, total_capacity=2), 'chrome'), 50)
+        self.assertEqual(self.forecaster.predict_wait(full_grid(queue=3, total_capacity=2), 'chrome'), 200)
+
+    def test_predict_wait_arrivals(self, mock_monotonic):
+        """Tests that the wait grows when session requests arrive faster than slots free up"""
+        self.run_session(mock_monotonic, 'a', 'chrome', 0, 100)
+        for now in (100, 110, 120):
+            mock_monotonic.return_value = now
+            self.forecaster.record_arrival()
+
+        # Slots free up every 50 seconds, while a session request arrives every 10 seconds
+        self.assertEqual(self.forecaster.predict_wait(full_grid(queue=0, total_capacity=2), 'chrome'), 250)
+        # Spread across 5 grids, each grid's slots keep up with the arrivals
+        self.assertEqual(
+            self.forecaster.predict_wait(full_grid(queue=0, total_capacity=2), 'chrome', grids=5), 50
+        )
+
+    def test_predict_wait_per_browser(self, mock_monotonic):
+        """Tests that durations are kept per browser, falling back to all browsers"""
+        self.run_session(mock_monotonic, 'a', 'chrome', 0, 100)
+        self.run_session(mock_monotonic, 'b', 'firefox', 0, 300)
+
+        self.assertEqual(self.forecaster.get_session_duration('chrome'), 100)
+        self.assertEqual(self.forecaster.get_session_duration('firefox'), 300)
+        self.assertEqual(self.forecaster.get_session_duration('safari'), 200)
+
+    def test_unknown_session_ended(self, mock_monotonic):
+        """Tests that sessions the forecaster didn't see start are ignored"""
+        mock_monotonic.return_value = 100
+        self.forecaster.session_ended('unknown')
+        self.assertIsNone(self.forecaster.get_session_duration())
+
+    def test_arrival_rate(self, mock_monotonic):
+        """Tests that the arrival rate follows the gaps between session requests"""
+        for now in (0, 2, 4):
+            mock_monotonic.return_value = now
+            self.forecaster.record_arrival()
+        self.assertEqual(self.forecaster.get_arrival_rate(), 0.5)
+
+        mock_monotonic.return_value = 6
+        self.forecaster.record_arrival(count=4)
+        self.assertAlmostEqual(self.forecaster.get_arrival_rate(), 1 / 0.59375)
+
+    def test_max_active_sessions(self, mock_monotonic):
+        """Tests that sessions which are never deleted are eventually forgotten"""
+        mock_monotonic.return_value = 0
+        forecaster = CapacityForecaster(max_active_sessions=2)
+        for session_id in ('a', 'b', 'c'):
+            forecaster.session_started(session_id, {})
+        self.assertEqual(forecaster.to_dict()['active_sessions'], 2)
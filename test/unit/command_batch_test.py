@@ -0,0 +1,76 @@
+"""Unit testing for util/command_batch.py"""
+import unittest
+
+from amplium.api.exceptions import InvalidBatchException
+from amplium.utils.command_batch import check_command, is_error, resolve_path, resolve_references
+
+W3C_ELEMENT = {'element-6066-11e4-a52e-4f735466cecf': 'element_1'}
+
+
+class CommandBatchUnitTests(unittest.TestCase):
+    """Unit tests for running batches of commands"""
+
+    def setUp(self):
+        self.results = [
+            {'status': 0, 'value': W3C_ELEMENT},
+            {'status': 0, 'value': {'width': 1280, 'items': ['a', 'b']}},
+            {'status': 0, 'value': {'ELEMENT': 'element_2'}}
+        ]
+
+    def test_resolve_element_in_path(self):
+        """Tests that elements referred to in a path are replaced by their id"""
+        self.assertEqual(resolve_references('element/${0}/click', self.results), 'element/element_1/click')
+        self.assertEqual(resolve_references('element/${2}/text', self.results), 'element/element_2/text')
+
+    def test_resolve_path(self):
+        """Tests that a path that is a single reference is still formatted as a path"""
+        self.assertEqual(resolve_path('${0}', self.results), 'element_1')
+        self.assertEqual(resolve_path('${1.width}', self.results), '1280')
+        self.assertEqual(resolve_path('element/${2}/text', self.results), 'element/element_2/text')
+        with self.assertRaises(InvalidBatchException):
+            resolve_path('${3}', self.results)
+
+    def test_resolve_value(self):
+        """Tests that a parameter that is a single reference is replaced by the value as it is"""
+        params = {'script': 'arguments[0].click()', 'args': ['${0}', '${1.width}', '${1.items.1}']}
+        self.assertEqual(resolve_references(params, self.results), {
+            'script': 'arguments[0].click()',
+            'args': [W3C_ELEMENT, 1280, 'b']
+        })
+
+    def test_resolve_field_in_string(self):
+        """Tests that fields referred to within a string are formatted as text"""
+        params = {'text': 'width ${1.width}'}
+        self.assertEqual(resolve_references(params, self.results), {'text': 'width 1280'})
+
+    def test_resolve_nothing(self):
+        """Tests that commands without references are left alone"""
+        self.assertEqual(resolve_references('url', self.results), 'url')
+        self.assertIsNone(resolve_references(None, self.results))
+
+    def test_resolve_later_command(self):
+        """Tests that references to commands that haven't run are refused"""
+        with self.assertRaises(InvalidBatchException):
+            resolve_references('element/${3}/click', self.results)
+
+    def test_resolve_missing_field(self):
+        """Tests that references to fields that aren't in a result are refused"""
+        with self.assertRaises(InvalidBatchException):
+            resolve_references('${1.height}', self.results)
+        with self.assertRaises(InvalidBatchException):
+            resolve_references('${1.items.5}', self.results)
+
+    def test_check_command(self):
+        """Tests that only commands within the session are allowed"""
+        check_command('element/element_1/click')
+        for command in ('', '..', 'element/../..', './url', 'element//click'):
+            with self.assertRaises(InvalidBatchException):
+                check_command(command)
+
+    def test_is_error(self):
+        """Tests that failures are detected in both protocols and in proxying"""
+        self.assertFalse(is_error({'status': 0, 'value': None}))
+        self.assertFalse(is_error({'value': W3C_ELEMENT}))
+        self.assertTrue(is_error({'status': 7, 'value': {'message': 'no such element'}}))
+        self.assertTrue(is_error({'value': {'error': 'no such element', 'message': ''}}))
+        self.assertTrue(is_error(({'status': 502, 'message': 'Error occurred while proxying'}, 502)))
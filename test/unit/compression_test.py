@@ -0,0 +1,56 @@
+"""Unit testing for util/compression.py"""
+import gzip
+import unittest
+import zlib
+
+from amplium.utils.compression import CompressionHandler, parse_accept_encoding
+from test.helpers.config import mock_config  # pylint: disable=wrong-import-order
+
+
+# Settings of the compression configuration the tests rely on
+DEFAULT_CONFIG = {'enabled': True, 'min_size': 10, 'level': 6}
+
+
+class CompressionUnitTests(unittest.TestCase):
+    """Unit tests for the compression handler"""
+
+    def setUp(self):
+        self.handler = CompressionHandler(config=mock_config(DEFAULT_CONFIG))
+
+    def test_parse_accept_encoding(self):
+        """Tests parsing of quality values"""
+        self.assertEqual(
+            parse_accept_encoding('gzip;q=0.5, Deflate, br;q=invalid, '),
+            {'gzip': 0.5, 'deflate': 1.0, 'br': 0.0}
+        )
+
+    def test_negotiate(self):
+        """Tests that the client's preferred supported encoding is chosen"""
+        self.assertEqual(self.handler.negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(self.handler.negotiate('gzip;q=0.5, deflate'), 'deflate')
+        self.assertEqual(self.handler.negotiate('br, *;q=0.1'), 'gzip')
+        self.assertIsNone(self.handler.negotiate('br'))
+        self.assertIsNone(self.handler.negotiate('gzip;q=0, identity'))
+        self.assertIsNone(self.handler.negotiate(None))
+
+    def test_negotiate_preferred(self):
+        """Tests that an encoding the body already has is chosen if the client accepts it"""
+        self.assertEqual(self.handler.negotiate('gzip, deflate', preferred='deflate'), 'deflate')
+        self.assertEqual(self.handler.negotiate('gzip', preferred='deflate'), 'gzip')
+
+    def test_negotiate_disabled(self):
+        """Tests that nothing is compressed when compression is disabled"""
+        handler = CompressionHandler(config=mock_config(DEFAULT_CONFIG, enabled=False))
+        self.assertIsNone(handler.negotiate('gzip, deflate'))
+
+    def test_compress(self):
+        """Tests that bodies are compressed in the negotiated container"""
+        body = b'{"value": "' + b'a' * 1000 + b'"}'
+        self.assertEqual(gzip.decompress(self.handler.compress(body, 'gzip')), body)
+        self.assertEqual(zlib.decompress(self.handler.compress(body, 'deflate')), body)
+
+    def test_compress_stream(self):
+        """Tests that streamed bodies are compressed as a single document"""
+        chunks = [b'{"value": "', b'a' * 1000, b'"}']
+        compressed = b''.join(self.handler.compress_stream(iter(chunks), 'gzip'))
+        self.assertEqual(gzip.decompress(compressed), b''.join(chunks))
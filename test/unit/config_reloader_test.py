@@ -0,0 +1,84 @@
+"""Unit testing for util/config_reloader.py"""
+import unittest
+
+from mock import patch, MagicMock
+from schema import SchemaError
+
+from amplium.api.exceptions import InvalidConfigException
+from amplium.models.grid_node_data import GridNodeData
+from amplium.utils.config_reloader import ConfigReloader
+
+
+class ConfigReloaderUnitTests(unittest.TestCase):
+    """Unit tests for applying a changed config file"""
+
+    def setUp(self):
+        self.config = MagicMock(integrations={'datadog': {'api_key': 'key', 'app_key': 'app'}})
+        self.grid_handler = MagicMock()
+        self.old_discovery = self.grid_handler.discovery
+        self.old_discovery.nodes = [GridNodeData(name='hub', host='test_host_1', port=1234)]
+        self.discovery = MagicMock(nodes=[])
+        self.remote_grids = [MagicMock()]
+        self.datadog = MagicMock()
+        self.reloader = ConfigReloader(
+            config=self.config,
+            grid_handler=self.grid_handler,
+            datadog=self.datadog,
+            create_discovery=MagicMock(return_value=self.discovery),
+            create_remote_grids=MagicMock(return_value=self.remote_grids)
+        )
+
+    def test_reload_unchanged(self):
+        """Tests that nothing is rebuilt when only other sections changed"""
+        self.config.reload.return_value = ['tenants']
+
+        self.assertEqual(self.reloader.reload(), ['tenants'])
+        self.assertEqual(self.grid_handler.discovery, self.old_discovery)
+        self.grid_handler.remote_grids.replace.assert_not_called()
+        self.datadog.configure.assert_not_called()
+
+    def test_reload_discovery(self):
+        """Tests that discovery is replaced, keeping the known grids until the new one finds its own"""
+        self.config.reload.return_value = ['zookeeper']
+        self.reloader.start_discovery()
+        self.old_discovery.start_listening.assert_called_once_with()
+
+        self.reloader.reload()
+        self.discovery.start_listening.assert_called_once_with()
+        self.assertEqual(self.grid_handler.discovery, self.discovery)
+        self.assertEqual(self.discovery.nodes, self.old_discovery.nodes)
+        self.old_discovery.stop.assert_called_once_with()
+
+    def test_reload_discovery_before_start(self):
+        """Tests that discovery replaced before it was started is started by start_discovery()"""
+        self.config.reload.return_value = ['zookeeper']
+
+        self.reloader.reload()
+        self.discovery.start_listening.assert_not_called()
+
+        self.reloader.start_discovery()
+        self.reloader.start_discovery()
+        self.discovery.start_listening.assert_called_once_with()
+        self.old_discovery.start_listening.assert_not_called()
+
+    def test_reload_integrations(self):
+        """Tests that the remote grids and Datadog are rebuilt when the integrations change"""
+        self.config.reload.return_value = ['integrations']
+
+        self.reloader.reload()
+        self.grid_handler.remote_grids.replace.assert_called_once_with(self.remote_grids)
+        self.grid_handler.remote_grids.start_listening.assert_called_once_with()
+        self.datadog.configure.assert_called_once_with({'api_key': 'key', 'app_key': 'app'})
+
+    @patch('amplium.utils.config_reloader.logging.config.dictConfig')
+    def test_reload_logging(self, mock_dict_config):
+        """Tests that logging is reconfigured when its section changes"""
+        self.config.reload.return_value = ['logging']
+        self.reloader.reload()
+        mock_dict_config.assert_called_once_with(self.config.logging)
+
+    def test_reload_invalid(self):
+        """Tests that an invalid config file is reported as a bad request"""
+        self.config.reload.side_effect = SchemaError('bad')
+        with self.assertRaises(InvalidConfigException):
+            self.reloader.reload()
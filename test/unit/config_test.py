@@ -2,6 +2,7 @@
 import unittest
 
 from mock import patch, MagicMock
+from schema import SchemaError
 
 from amplium import config
 
@@ -71,3 +72,81 @@ class ConfigUnitTests(unittest.TestCase):
 
         results = config.Config()._config['integrations']
         self.assertEqual(results, {})
+
+    @patch('amplium.config.yaml.safe_load')
+    def test_reload(self, mock_yaml):
+        """Tests that reloading updates the sections in place and reports which changed"""
+        mock_yaml.return_value = {
+            'zookeeper':
+                {'host': 'test_host',
+                 'port': 1234,
+                 'selenium_grid_zookeeper_path': 'test_path'},
+            'logging': {},
+            'dynamodb': {
+                "table_name": 'test_name'},
+            'tenants': {'default_quota': 5}
+        }
+        amplium_config = config.Config()
+        tenants = amplium_config.tenants
+
+        mock_yaml.return_value = {
+            'zookeeper':
+                {'host': 'test_host',
+                 'port': 1234,
+                 'selenium_grid_zookeeper_path': 'test_path'},
+            'logging': {},
+            'dynamodb': {
+                "table_name": 'test_name'},
+            'tenants': {'default_quota': 10}
+        }
+        self.assertEqual(amplium_config.reload(), ['tenants'])
+        self.assertIs(amplium_config.tenants, tenants)
+        self.assertEqual(tenants['default_quota'], 10)
+
+    @patch('amplium.config.yaml.safe_load')
+    def test_reload_removed_section(self, mock_yaml):
+        """Tests that a section removed from the config file goes back to its default"""
+        base = {
+            'zookeeper':
+                {'host': 'test_host',
+                 'port': 1234,
+                 'selenium_grid_zookeeper_path': 'test_path'},
+            'logging': {},
+            'dynamodb': {
+                "table_name": 'test_name'}
+        }
+        mock_yaml.return_value = dict(base)
+        amplium_config = config.Config()
+
+        mock_yaml.return_value = dict(base, drain={'deadline': 99})
+        self.assertEqual(amplium_config.reload(), ['drain'])
+        self.assertEqual(amplium_config.drain['deadline'], 99)
+
+        mock_yaml.return_value = dict(base)
+        self.assertEqual(amplium_config.reload(), ['drain'])
+        self.assertEqual(amplium_config.drain['deadline'], 30)
+        self.assertEqual(config.Config().drain['deadline'], 30)
+
+    @patch('amplium.config.yaml.safe_load')
+    def test_remote_grid_required_keys(self, mock_yaml):
+        """Tests that remote grids are refused without the settings their type needs"""
+        base = {
+            'zookeeper':
+                {'host': 'test_host',
+                 'port': 1234,
+                 'selenium_grid_zookeeper_path': 'test_path'},
+            'logging': {},
+            'dynamodb': {
+                "table_name": 'test_name'}
+        }
+        mock_yaml.return_value = dict(base, remote_grids=[
+            {'name': 'other_amplium', 'type': 'amplium', 'url': 'http://amplium:8081'},
+            {'name': 'browserstack', 'type': 'browserstack', 'username': 'user', 'accesskey': 'key'}
+        ])
+        self.assertEqual(len(config.Config().remote_grids), 2)
+
+        for remote_grid in ({'name': 'hub', 'type': 'selenium'}, {'name': 'other_amplium', 'type': 'amplium'},
+                            {'name': 'browserstack', 'type': 'browserstack', 'username': 'user'}):
+            mock_yaml.return_value = dict(base, remote_grids=[remote_grid])
+            with self.assertRaises(SchemaError):
+                config.Config()
@@ -0,0 +1,84 @@
+"""Unit testing for util/drain.py"""
+import signal
+import unittest
+
+import flask
+from mock import patch, MagicMock
+
+from amplium.api.exceptions import DrainingException
+from amplium.utils.drain import DrainController
+
+app = flask.Flask(__name__)
+
+
+class DrainControllerUnitTests(unittest.TestCase):
+    """Unit tests for taking Amplium out of service"""
+
+    def setUp(self):
+        self.snapshot = MagicMock()
+        self.pool = MagicMock()
+        self.drain = DrainController({'deadline': 30, 'retry_after': 5}, self.snapshot, pools=[self.pool])
+
+    def test_accepting_sessions(self):
+        """Tests that new sessions are rejected with a Retry-After once draining"""
+        self.drain.check_accepting_sessions()
+
+        self.assertTrue(self.drain.start())
+        with self.assertRaises(DrainingException) as context:
+            self.drain.check_accepting_sessions()
+        self.assertEqual(context.exception.status_code, 503)
+        self.assertEqual(context.exception.headers['Retry-After'], '5')
+
+    def test_start_hands_off_snapshot(self):
+        """Tests that the routing state is written once when draining starts"""
+        self.assertTrue(self.drain.start())
+        self.assertFalse(self.drain.start())
+        self.snapshot.save.assert_called_once_with()
+
+    def test_wait_for_in_flight(self):
+        """Tests that draining waits for the requests in flight"""
+        with app.test_request_context():
+            self.drain.request_started()
+            self.drain.start(deadline=0)
+            self.assertFalse(self.drain.wait())
+
+            self.drain.request_finished()
+        self.assertTrue(self.drain.wait())
+        self.assertEqual(self.snapshot.save.call_count, 3)
+
+    def test_request_not_counted(self):
+        """Tests that requests which failed before being counted don't lower the count"""
+        with app.app_context():
+            self.drain.request_started()
+        with app.app_context():
+            self.drain.request_finished()
+        self.assertEqual(self.drain.in_flight, 1)
+
+    def test_drain_in_background(self):
+        """Tests that the function given is called once drained"""
+        drained = MagicMock()
+        with patch('amplium.utils.drain.threading.Thread') as mock_thread:
+            self.drain.drain_in_background(deadline=0, then=drained)
+            mock_thread.call_args[1]['target']()
+
+        drained.assert_called_once_with()
+        self.pool.stop.assert_called_once_with()
+        self.pool.close.assert_called_once_with()
+        self.assertEqual(self.drain.to_dict(), {'draining': True, 'in_flight': 0, 'remaining': 0.0})
+
+    @patch('amplium.utils.drain.os.getpid', MagicMock(return_value=123))
+    @patch('amplium.utils.drain.os.kill')
+    @patch('amplium.utils.drain.signal.signal')
+    @patch('amplium.utils.drain.signal.getsignal', MagicMock(return_value=signal.SIG_DFL))
+    def test_signal_handler(self, mock_signal, mock_kill):
+        """Tests that the signal drains, then stops the process the way it would have been stopped"""
+        self.drain.install_signal_handler()
+        handle = mock_signal.call_args[0][1]
+
+        with patch('amplium.utils.drain.threading.Thread') as mock_thread:
+            handle(signal.SIGTERM, None)
+            mock_thread.call_args[1]['target']()
+
+        mock_signal.assert_called_with(signal.SIGTERM, signal.SIG_DFL)
+        mock_kill.assert_called_once_with(123, signal.SIGTERM)
+        self.assertTrue(self.drain.draining)
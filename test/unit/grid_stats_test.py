@@ -0,0 +1,38 @@
+"""Unit testing for util/grid_stats.py"""
+import unittest
+
+from amplium.utils.grid_stats import GridStats
+
+
+class GridStatsUnitTests(unittest.TestCase):
+    """Unit tests for the grid stats tracker"""
+
+    def setUp(self):
+        self.stats = GridStats(alpha=0.5)
+
+    def test_unknown_grid(self):
+        """Tests that a grid that has never been used has empty stats"""
+        self.assertEqual(self.stats.get_latency('http://test_host_1:1234'), 0.0)
+        self.assertEqual(
+            self.stats.get_stats('http://test_host_1:1234')['session'],
+            {'latency': 0.0, 'error_rate': 0.0, 'count': 0}
+        )
+
+    def test_first_record_seeds_average(self):
+        """Tests that the first observation is used as-is"""
+        self.stats.record('http://test_host_1:1234', 'session', 4.0)
+        self.assertEqual(self.stats.get_latency('http://test_host_1:1234', 'session'), 4.0)
+
+    def test_moving_average(self):
+        """Tests that later observations are folded into the moving average"""
+        self.stats.record('http://test_host_1:1234', 'command', 4.0)
+        self.stats.record('http://test_host_1:1234', 'command', 2.0, error=True)
+
+        self.assertEqual(self.stats.get_latency('http://test_host_1:1234', 'command'), 3.0)
+        self.assertEqual(self.stats.get_error_rate('http://test_host_1:1234', 'command'), 0.5)
+        self.assertEqual(self.stats.get_stats('http://test_host_1:1234')['command']['count'], 2)
+
+    def test_operations_are_separate(self):
+        """Tests that session and command statistics do not affect each other"""
+        self.stats.record('http://test_host_1:1234', 'command', 4.0)
+        self.assertEqual(self.stats.get_latency('http://test_host_1:1234', 'session'), 0.0)
@@ -1,9 +1,13 @@
 """Tests the interal.py"""
 import unittest
 
+import flask
 from mock import patch, MagicMock
 
 from amplium.api import internal
+from amplium.api.exceptions import AdminForbiddenException
+
+app = flask.Flask(__name__)
 
 
 class InternalUnitTests(unittest.TestCase):
@@ -22,3 +26,48 @@ class InternalUnitTests(unittest.TestCase):
         result, code = internal.get_status()
         self.assertEqual(result['status'], 'OK')
         self.assertEqual(code, 200)
+
+    @patch('amplium.GRID_HANDLER.get_grid_info', MagicMock(return_value={}))
+    @patch('amplium.DRAIN.draining', True)
+    @patch('amplium.DRAIN.deadline', 0)
+    def test_get_status_draining(self):
+        """Tests that the status fails while draining, so that load balancers stop using this Amplium"""
+        result, code = internal.get_status()
+        self.assertEqual(result['status'], 'DRAINING')
+        self.assertEqual(code, 503)
+
+    @patch('amplium.DRAIN.drain_in_background')
+    def test_drain(self, mock_drain):
+        """Tests that draining starts with the deadline given"""
+        with app.test_request_context(environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+            _, code = internal.drain({'deadline': 10})
+        self.assertEqual(code, 202)
+        mock_drain.assert_called_once_with(10)
+
+    @patch('amplium.RELOADER.reload', MagicMock(return_value=['tenants']))
+    def test_reload_config(self):
+        """Tests that the changed sections are returned"""
+        with app.test_request_context(environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+            result, code = internal.reload_config()
+        self.assertEqual(result['changed'], ['tenants'])
+        self.assertEqual(code, 200)
+
+    @patch('amplium.DRAIN.drain_in_background')
+    def test_admin_forbidden_address(self, mock_drain):
+        """Tests that the admin endpoints refuse clients from other addresses"""
+        with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+            self.assertRaises(AdminForbiddenException, internal.drain)
+        mock_drain.assert_not_called()
+
+    @patch('amplium.RELOADER.reload')
+    @patch.dict('amplium.CONFIG.admin', {'allowed_addresses': [], 'token': 'secret'})
+    def test_admin_token(self, mock_reload):
+        """Tests that the admin endpoints require the token when one is configured"""
+        with app.test_request_context(environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+            self.assertRaises(AdminForbiddenException, internal.reload_config)
+        mock_reload.assert_not_called()
+
+        mock_reload.return_value = []
+        with app.test_request_context(headers={'X-Amplium-Admin-Token': 'secret'}):
+            _, code = internal.reload_config()
+        self.assertEqual(code, 200)
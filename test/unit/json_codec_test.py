@@ -0,0 +1,24 @@
+"""Unit testing for util/json_codec.py"""
+import json
+import unittest
+
+from amplium.utils import json_codec
+
+
+class JsonCodecUnitTests(unittest.TestCase):
+    """Unit tests for the JSON codec"""
+
+    def test_dumps_returns_bytes(self):
+        """Tests that documents are encoded to UTF-8 bytes"""
+        encoded = json_codec.dumps({'value': 'café'})
+        self.assertIsInstance(encoded, bytes)
+        self.assertEqual(json.loads(encoded.decode('utf-8')), {'value': 'café'})
+
+    def test_round_trip(self):
+        """Tests that a WebDriver response survives being decoded and encoded again"""
+        payload = {'sessionId': 'abc', 'status': 0, 'value': [{'ELEMENT': '1'}, None, 1.5, True]}
+        self.assertEqual(json_codec.loads(json_codec.dumps(payload)), payload)
+
+    def test_loads_bytes(self):
+        """Tests that response bodies can be decoded without decoding them to text first"""
+        self.assertEqual(json_codec.loads(b'{"value": null}'), {'value': None})
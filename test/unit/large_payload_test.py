@@ -0,0 +1,71 @@
+"""Unit testing for util/large_payload.py"""
+import unittest
+
+from mock import MagicMock
+
+from amplium.utils.large_payload import LargePayloadHandler
+from test.helpers.config import mock_config  # pylint: disable=wrong-import-order
+
+
+# Settings of the large payload configuration the tests rely on
+DEFAULT_CONFIG = {
+    'commands': ['screenshot', 'se/file'],
+    'spool_threshold': 8,
+    'chunk_size': 4
+}
+
+
+def mock_response(*chunks):
+    """Mocks a streamed response from the hub"""
+    response = MagicMock()
+    response.iter_content.return_value = iter(chunks)
+    return response
+
+
+class LargePayloadUnitTests(unittest.TestCase):
+    """Unit tests for the large payload handler"""
+
+    def setUp(self):
+        self.handler = LargePayloadHandler(config=mock_config(DEFAULT_CONFIG))
+
+    def test_is_large(self):
+        """Tests that only the configured commands are treated as large"""
+        self.assertTrue(self.handler.is_large('screenshot'))
+        self.assertTrue(self.handler.is_large('element/1/screenshot'))
+        self.assertTrue(self.handler.is_large('se/file'))
+        self.assertFalse(self.handler.is_large('url'))
+        self.assertFalse(self.handler.is_large(None))
+
+    def test_iter_chunks(self):
+        """Tests that request bodies are split into views over the original buffer"""
+        chunks = list(self.handler.iter_chunks(b'0123456789'))
+        self.assertEqual([bytes(chunk) for chunk in chunks], [b'0123', b'4567', b'89'])
+        self.assertTrue(all(isinstance(chunk, memoryview) for chunk in chunks))
+
+    def test_spool_small(self):
+        """Tests that bodies under the threshold stay in memory"""
+        response = mock_response(b'0123', b'45')
+        spool, size = self.handler.spool(response)
+
+        self.assertEqual(size, 6)
+        self.assertFalse(spool._rolled)  # pylint: disable=protected-access
+        self.assertEqual(b''.join(self.handler.stream(spool)), b'012345')
+        response.close.assert_called_once_with()
+
+    def test_spool_large(self):
+        """Tests that bodies over the threshold are spooled to disk"""
+        response = mock_response(b'0123', b'4567', b'89')
+        spool, size = self.handler.spool(response)
+
+        self.assertEqual(size, 10)
+        self.assertTrue(spool._rolled)  # pylint: disable=protected-access
+        self.assertEqual(list(self.handler.stream(spool)), [b'0123', b'4567', b'89'])
+        self.assertTrue(spool.closed)
+
+    def test_spool_error(self):
+        """Tests that the hub response is released if reading it fails"""
+        response = MagicMock()
+        response.iter_content.side_effect = IOError
+        with self.assertRaises(IOError):
+            self.handler.spool(response)
+        response.close.assert_called_once_with()
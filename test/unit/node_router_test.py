@@ -0,0 +1,115 @@
+"""Unit testing for util/node_router.py"""
+import unittest
+
+from mock import patch, MagicMock
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from amplium.models.node_route import NodeRoute
+from amplium.utils.node_router import NodeRouter
+from test.helpers.config import mock_config  # pylint: disable=wrong-import-order
+
+HUB_URL = 'http://test_host_1:1234'
+NODE_URL = 'http://10.101.9.142:5555'
+
+
+# Settings of the node routing configuration the tests rely on
+DEFAULT_CONFIG = {'enabled': True, 'hub_touch_interval': 60, 'max_routes': 10000}
+
+
+@patch('amplium.utils.node_router.time.monotonic', MagicMock(return_value=0))
+class NodeRouterUnitTests(unittest.TestCase):
+    """Unit tests for routing commands to the nodes"""
+
+    def setUp(self):
+        self.grid_handler = MagicMock()
+        self.grid_handler.unroll_session_id.side_effect = lambda session_id: (session_id[:-5], HUB_URL)
+        self.grid_handler.remote_grids.get_urls.return_value = []
+        self.session_info = MagicMock()
+        self.session_info.get.return_value = {'success': True, 'proxyId': NODE_URL}
+        self.executor = MagicMock()
+        self.executor.submit.side_effect = lambda function, *args: function(*args)
+        self.router = NodeRouter(
+            config=mock_config(DEFAULT_CONFIG),
+            grid_handler=self.grid_handler,
+            session_info=self.session_info,
+            executor=self.executor
+        )
+
+    def test_resolve(self):
+        """Tests that commands are routed to the node the hub reports for the session"""
+        self.router.resolve('abc-hash')
+
+        self.session_info.get.assert_called_once_with('abc-hash')
+        self.assertEqual(
+            self.router.get_command_url('abc-hash', 'url'),
+            NODE_URL + '/wd/hub/session/abc/url'
+        )
+
+    def test_resolve_disabled(self):
+        """Tests that nothing is routed when node routing is disabled"""
+        self.router.config = mock_config(DEFAULT_CONFIG, enabled=False)
+        self.router.resolve('abc-hash')
+
+        self.executor.submit.assert_not_called()
+        self.assertIsNone(self.router.get_command_url('abc-hash', 'url'))
+
+    def test_resolve_once(self):
+        """Tests that a known session isn't looked up again"""
+        self.router.resolve('abc-hash')
+        self.router.resolve('abc-hash')
+        self.assertEqual(self.session_info.get.call_count, 1)
+
+    def test_resolve_remote_grid(self):
+        """Tests that sessions on remote grids aren't looked up"""
+        self.grid_handler.remote_grids.get_urls.return_value = [HUB_URL]
+        self.router.resolve('abc-hash')
+
+        self.session_info.get.assert_not_called()
+        self.assertIsNone(self.router.get_command_url('abc-hash', 'url'))
+
+    def test_resolve_unknown_session(self):
+        """Tests that commands keep going through the hub if it doesn't know the session's node"""
+        self.session_info.get.return_value = {'success': False, 'msg': 'Cannot find test slot'}
+        self.router.resolve('abc-hash')
+        self.assertIsNone(self.router.get_command_url('abc-hash', 'url'))
+
+    def test_resolve_error(self):
+        """Tests that commands keep going through the hub if it can't be reached"""
+        self.session_info.get.side_effect = RequestsConnectionError
+        self.router.resolve('abc-hash')
+        self.assertIsNone(self.router.get_command_url('abc-hash', 'url'))
+
+    def test_hub_touch_interval(self):
+        """Tests that a command goes through the hub once the hub hasn't seen the session for a while"""
+        self.router.resolve('abc-hash')
+
+        with patch('amplium.utils.node_router.time.monotonic', MagicMock(return_value=61)):
+            self.assertIsNone(self.router.get_command_url('abc-hash', 'url'))
+            self.assertIsNotNone(self.router.get_command_url('abc-hash', 'url'))
+
+    def test_forget(self):
+        """Tests that forgotten sessions go through the hub"""
+        self.router.resolve('abc-hash')
+        self.router.forget('abc-hash')
+        self.assertIsNone(self.router.get_command_url('abc-hash', 'url'))
+
+    def test_max_routes(self):
+        """Tests that the oldest routes are forgotten first"""
+        self.router.config = mock_config(DEFAULT_CONFIG, max_routes=1)
+        self.router.resolve('abc-hash')
+        self.router.resolve('def-hash')
+
+        self.assertIsNone(self.router.get_command_url('abc-hash', 'url'))
+        self.assertIsNotNone(self.router.get_command_url('def-hash', 'url'))
+
+    def test_restore(self):
+        """Tests that restored routes are used without replacing known ones"""
+        self.router.resolve('session-abcd')
+        route = NodeRoute(session_id='other', node_url='http://other:5555', hub_contact=float('-inf'))
+        self.router.restore({'session-abcd': route, 'other-abcd': route})
+
+        routes = self.router.get_routes()
+        self.assertEqual(routes['session-abcd'].node_url, NODE_URL)
+        self.assertEqual(routes['other-abcd'], route)
+        # Restored routes go through the hub first
+        self.assertIsNone(self.router.get_command_url('other-abcd', 'url'))
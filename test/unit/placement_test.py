@@ -0,0 +1,190 @@
+"""Unit testing for the placement strategies"""
+import unittest
+
+from mock import patch, MagicMock
+
+from amplium import PLACEMENT_STRATEGIES
+from amplium.placement.abstract_placement import AbstractPlacementStrategy
+from amplium.placement.affinity import AffinityStrategy
+from amplium.placement.bin_packing import BinPackingStrategy
+from amplium.placement.forecast import ForecastStrategy
+from amplium.placement.latency_aware import LatencyAwareStrategy
+from amplium.placement.least_queue import LeastQueueStrategy
+from amplium.placement.power_of_two import PowerOfTwoStrategy
+from amplium.placement.weighted_round_robin import WeightedRoundRobinStrategy
+from amplium.placement.zone_aware import ZoneAwareStrategy
+from amplium.utils.grid_stats import GridStats
+
+
+def mock_grids():
+    """Mocks a capacity snapshot of grids with available capacity"""
+    return [
+        {"host": "test_host_1", "port": 1234, 'available_capacity': 1, 'total_capacity': 3, 'queue': 0},
+        {"host": "test_host_2", "port": 1234, 'available_capacity': 3, 'total_capacity': 3, 'queue': 0},
+        {"host": "test_host_3", "port": 1234, 'available_capacity': 1, 'total_capacity': 1, 'queue': 1},
+    ]
+
+
+class PlacementUnitTests(unittest.TestCase):
+    """Unit testing for the placement strategies"""
+
+    def setUp(self):
+        self.config = MagicMock(
+            placement={'strategy': 'least_queue', 'error_penalty': 10.0},
+            affinity={'enabled': True, 'use_tracekey': True, 'load_factor': 1.25, 'virtual_nodes': 100},
+            zones={'enabled': True, 'metadata_key': 'zone', 'local_zone': 'zone-b', 'min_local_capacity': 2}
+        )
+        self.stats = GridStats()
+
+    def test_create_every_strategy(self):
+        """Tests that every configurable strategy can be created the way Amplium creates it"""
+        for name, strategy_type in PLACEMENT_STRATEGIES.items():
+            strategy = strategy_type(config=self.config, stats=self.stats, forecaster=MagicMock())
+            self.assertIsInstance(strategy, AbstractPlacementStrategy, name)
+
+    def test_least_queue(self):
+        """Tests that least queue prefers the lowest queue, then highest total, then lowest available"""
+        strategy = LeastQueueStrategy(config=self.config, stats=self.stats)
+        self.assertEqual(strategy.select(mock_grids())['host'], 'test_host_1')
+
+    @patch('amplium.placement.power_of_two.random.sample')
+    def test_power_of_two(self, mock_sample):
+        """Tests that power of two picks the better of two sampled grids"""
+        grids = mock_grids()
+        mock_sample.return_value = [grids[2], grids[1]]
+        strategy = PowerOfTwoStrategy(config=self.config, stats=self.stats)
+
+        self.assertEqual(strategy.select(grids)['host'], 'test_host_2')
+        mock_sample.assert_called_once_with(grids, 2)
+
+    def test_weighted_round_robin(self):
+        """Tests that weighted round robin spreads sessions proportionally to total capacity"""
+        strategy = WeightedRoundRobinStrategy(config=self.config, stats=self.stats)
+        grids = mock_grids()
+
+        selected = [strategy.select(grids)['host'] for _ in range(7)]
+
+        self.assertEqual(selected.count('test_host_1'), 3)
+        self.assertEqual(selected.count('test_host_2'), 3)
+        self.assertEqual(selected.count('test_host_3'), 1)
+
+    def test_bin_packing(self):
+        """Tests that bin packing fills the fullest grid first"""
+        strategy = BinPackingStrategy(config=self.config, stats=self.stats)
+        self.assertEqual(strategy.select(mock_grids())['host'], 'test_host_1')
+
+    def test_latency_aware(self):
+        """Tests that latency aware placement prefers the faster grid when queues match"""
+        self.stats.record('http://test_host_1:1234', 'session', 5.0)
+        self.stats.record('http://test_host_2:1234', 'session', 1.0)
+        strategy = LatencyAwareStrategy(config=self.config, stats=self.stats)
+
+        self.assertEqual(strategy.select(mock_grids())['host'], 'test_host_2')
+
+    def test_latency_aware_errors(self):
+        """Tests that latency aware placement penalizes grids that fail to create sessions"""
+        self.stats.record('http://test_host_1:1234', 'session', 1.0, error=True)
+        self.stats.record('http://test_host_2:1234', 'session', 5.0)
+        strategy = LatencyAwareStrategy(config=self.config, stats=self.stats)
+
+        self.assertEqual(strategy.select(mock_grids())['host'], 'test_host_2')
+
+    def test_forecast_when_full(self):
+        """Tests that forecast queues on the grid expected to free a slot soonest, within the queue time"""
+        self.config.session_queue_time = 60
+        forecaster = MagicMock()
+        forecaster.predict_wait.side_effect = lambda grid, browser, grids: {
+            'test_host_1': None, 'test_host_2': 45.0, 'test_host_3': 30.0
+        }[grid['host']]
+        strategy = ForecastStrategy(config=self.config, stats=self.stats, forecaster=forecaster)
+
+        self.assertEqual(strategy.select_when_full(mock_grids())['host'], 'test_host_3')
+
+        self.config.session_queue_time = 10
+        self.assertIsNone(strategy.select_when_full(mock_grids()))
+
+    def test_zone_aware(self):
+        """Tests that zone aware placement prefers the requested zone, then the local zone"""
+        grids = mock_grids()
+        for grid, zone in zip(grids, ['zone-a', 'zone-b', 'zone-a']):
+            grid['metadata'] = {'zone': zone}
+        inner = LeastQueueStrategy(config=self.config, stats=self.stats)
+        strategy = ZoneAwareStrategy(config=self.config, stats=self.stats, strategy=inner)
+
+        self.assertEqual(strategy.select(grids)['host'], 'test_host_2')
+        requested = {'desiredCapabilities': {'amplium:zone': 'zone-a'}}
+        self.assertEqual(strategy.select(grids, requested)['host'], 'test_host_1')
+
+    def test_zone_aware_spillover(self):
+        """Tests that zone aware placement uses every zone once the preferred zone is short of capacity"""
+        grids = mock_grids()
+        for grid, zone in zip(grids, ['zone-a', 'zone-b', 'zone-a']):
+            grid['metadata'] = {'zone': zone}
+        grids[1]['available_capacity'] = 1
+        inner = BinPackingStrategy(config=self.config, stats=self.stats)
+        strategy = ZoneAwareStrategy(config=self.config, stats=self.stats, strategy=inner)
+
+        self.assertEqual(strategy.select(grids)['host'], 'test_host_1')
+        self.config.zones['local_zone'] = ''
+        self.assertEqual(strategy.select(grids)['host'], 'test_host_1')
+
+    def test_zone_aware_when_full(self):
+        """Tests that zone aware placement queues in the preferred zone before the others"""
+        grids = mock_grids()
+        for grid, zone in zip(grids, ['zone-a', 'zone-b', 'zone-a']):
+            grid['metadata'] = {'zone': zone}
+        inner = MagicMock()
+        inner.select_when_full.side_effect = lambda candidates, request: (
+            candidates[0] if candidates[0]['metadata']['zone'] == 'zone-a' else None
+        )
+        strategy = ZoneAwareStrategy(config=self.config, stats=self.stats, strategy=inner)
+
+        self.assertEqual(strategy.select_when_full(grids)['host'], 'test_host_1')
+        inner.select_when_full.assert_called_with(grids, None)
+
+    def test_select_when_full_default(self):
+        """Tests that strategies wait for capacity in Amplium by default"""
+        strategy = LeastQueueStrategy(config=self.config, stats=self.stats)
+        self.assertIsNone(strategy.select_when_full(mock_grids()))
+
+    def test_affinity(self):
+        """Tests that the sessions of a build stick to one grid, and other sessions use the inner strategy"""
+        inner = LeastQueueStrategy(config=self.config, stats=self.stats)
+        strategy = AffinityStrategy(config=self.config, stats=self.stats, strategy=inner)
+        grids = [
+            {"host": "test_host_{0}".format(index), "port": 1234, 'available_capacity': 10,
+             'total_capacity': 10, 'queue': 0}
+            for index in range(5)
+        ]
+        request = {'desiredCapabilities': {'amplium:buildId': 'build-1'}}
+
+        selected = {strategy.select(grids, request)['host'] for _ in range(3)}
+        self.assertEqual(len(selected), 1)
+        self.assertEqual(strategy.select(grids)['host'], inner.select(grids)['host'])
+
+    def test_affinity_bounded_load(self):
+        """Tests that a build moves on to the next grid once its grid is much busier than average"""
+        strategy = AffinityStrategy(config=self.config, stats=self.stats, strategy=MagicMock())
+        grids = [
+            {"host": "test_host_{0}".format(index), "port": 1234, 'available_capacity': 10,
+             'total_capacity': 10, 'queue': 0}
+            for index in range(5)
+        ]
+        request = {'desiredCapabilities': {'amplium:buildId': 'build-1'}}
+
+        selected = []
+        for _ in range(20):
+            grid = strategy.select(grids, request)
+            grid['available_capacity'] -= 1
+            selected.append(grid['host'])
+        # A bound of 1.25 times the fair share spreads 20 sessions over at least 4 grids
+        self.assertGreaterEqual(len(set(selected)), 4)
+        self.assertLessEqual(max(selected.count(host) for host in selected), 5)
+
+    @patch('amplium.placement.affinity.client_tracekey', MagicMock(return_value='build-2/shard-1'))
+    def test_affinity_tracekey(self):
+        """Tests that the build is named by the client's tracekey when the capability is missing"""
+        strategy = AffinityStrategy(config=self.config, stats=self.stats, strategy=MagicMock())
+        self.assertEqual(strategy.get_build_id({'desiredCapabilities': {}}), 'build-2')
+        self.config.affinity['use_tracekey'] = False
+        self.assertIsNone(strategy.get_build_id({'desiredCapabilities': {}}))
@@ -0,0 +1,167 @@
+"""Unit testing for remote_grids/remote_grid_registry.py"""
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import requests_mock
+from mock import MagicMock, patch
+
+from amplium.api.exceptions import IntegrationNotConfigured, NoAvailableCapacityException
+from amplium.remote_grids.amplium_grid import AmpliumGrid
+from amplium.remote_grids.remote_grid_registry import RemoteGridRegistry
+from amplium.remote_grids.selenium_grid import SeleniumGrid
+
+
+def mock_remote_grid(name, cost_weight=1.0, available=True):
+    """Mocks a remote grid"""
+    remote_grid = MagicMock(cost_weight=cost_weight, webdriver_path='/wd/hub')
+    remote_grid.name = name
+    remote_grid.get_url.return_value = 'https://{0}:443'.format(name)
+    if available:
+        remote_grid.acquire_url.return_value = remote_grid.get_url.return_value
+    else:
+        remote_grid.acquire_url.side_effect = NoAvailableCapacityException
+    return remote_grid
+
+
+class RemoteGridRegistryUnitTests(unittest.TestCase):
+    """Unit tests for the remote grid registry"""
+
+    def setUp(self):
+        self.saucelabs = mock_remote_grid('saucelabs', cost_weight=2.0)
+        self.other_region = mock_remote_grid('other_region', cost_weight=1.0, available=False)
+        self.registry = RemoteGridRegistry([self.saucelabs, self.other_region])
+
+    def test_is_saucelabs_requested(self):
+        """Tests that the legacy SauceLabs capability requests the SauceLabs remote grid"""
+        self.assertEqual(self.registry.get_requested({'amplium:useSauceLabs': 'true'}), self.saucelabs)
+
+    def test_is_remote_grid_requested(self):
+        """Tests that a remote grid can be requested by name"""
+        response = self.registry.get_requested({'amplium:remoteGrid': 'other_region'})
+        self.assertEqual(response, self.other_region)
+
+    def test_is_not_requested(self):
+        """Tests that no remote grid is returned if none is requested"""
+        self.assertIsNone(self.registry.get_requested({'amplium:useSauceLabs': False}))
+
+    def test_requested_not_configured(self):
+        """Tests that requesting a remote grid that isn't configured raises an exception"""
+        registry = RemoteGridRegistry([])
+        self.assertRaises(IntegrationNotConfigured, registry.get_requested, {'amplium:useSauceLabs': True})
+
+    def test_overflow_prefers_cheapest_available(self):
+        """Tests that overflow uses the cheapest remote grid that has capacity"""
+        self.assertEqual(self.registry.acquire_overflow_url(), 'https://saucelabs:443')
+        self.other_region.acquire_url.assert_called_once_with()
+
+    def test_overflow_no_capacity(self):
+        """Tests that overflow fails if no remote grid has capacity"""
+        registry = RemoteGridRegistry([self.other_region])
+        self.assertRaises(NoAvailableCapacityException, registry.acquire_overflow_url)
+
+    def test_webdriver_path(self):
+        """Tests that remote grids can override the WebDriver path"""
+        amplium_grid = AmpliumGrid(
+            config={'name': 'amplium', 'url': 'http://amplium:8081'},
+            session=MagicMock()
+        )
+        registry = RemoteGridRegistry([amplium_grid])
+
+        self.assertEqual(registry.get_webdriver_path('http://amplium:8081'), '/proxy')
+        self.assertEqual(registry.get_webdriver_path('http://test_host_1:1234'), '/wd/hub')
+
+    def test_replace(self):
+        """Tests that replacing the remote grids stops the old ones"""
+        new_region = mock_remote_grid('new_region')
+        self.registry.replace([new_region])
+
+        self.assertEqual(self.registry.get_urls(), ['https://new_region:443'])
+        self.saucelabs.stop.assert_called_once_with()
+        self.other_region.stop.assert_called_once_with()
+
+
+class RemoteGridUnitTests(unittest.TestCase):
+    """Unit tests for the remote grid providers"""
+
+    @requests_mock.Mocker()
+    def test_selenium_grid_capacity(self, mock_requests):
+        """Tests that a remote Selenium Grid's capacity is its free slots minus its queue"""
+        mock_requests.get(
+            'http://remote_hub:4444/grid/api/hub',
+            json={'slotCounts': {'free': 5, 'total': 10}, 'newSessionRequestCount': 2}
+        )
+        remote_grid = SeleniumGrid(
+            config={'name': 'remote_hub', 'url': 'http://remote_hub:4444', 'cache_ttl': 5.0},
+            session=requests.Session()
+        )
+
+        self.assertEqual(remote_grid.get_available_capacity(), 3)
+
+    @requests_mock.Mocker()
+    def test_amplium_grid_capacity(self, mock_requests):
+        """Tests that another Amplium's capacity is the sum of its grids' available capacity"""
+        mock_requests.get(
+            'http://amplium:8081/status',
+            json={'status': 'OK', 'nodes': [{'available_capacity': 2}, {'available_capacity': 3}]}
+        )
+        remote_grid = AmpliumGrid(
+            config={'name': 'amplium', 'url': 'http://amplium:8081', 'cache_ttl': 5.0},
+            session=requests.Session()
+        )
+
+        self.assertEqual(remote_grid.acquire_url(), 'http://amplium:8081')
+        self.assertEqual(remote_grid.get_available_capacity(), 4)
+
+    @requests_mock.Mocker()
+    def test_acquire_url_concurrently(self, mock_requests):
+        """Tests that concurrent session requests don't reserve more sessions than the provider has"""
+        mock_requests.get(
+            'http://amplium:8081/status',
+            json={'status': 'OK', 'nodes': [{'available_capacity': 3}]}
+        )
+        remote_grid = AmpliumGrid(
+            config={'name': 'amplium', 'url': 'http://amplium:8081', 'cache_ttl': 60.0},
+            session=requests.Session()
+        )
+        remote_grid.refresh()
+        start = threading.Barrier(8)
+
+        def acquire_url(_):
+            start.wait()
+            try:
+                return remote_grid.acquire_url()
+            except NoAvailableCapacityException:
+                return None
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            urls = list(executor.map(acquire_url, range(8)))
+        self.assertEqual(urls.count('http://amplium:8081'), 3)
+        self.assertEqual(remote_grid.get_available_capacity(), 0)
+
+    @requests_mock.Mocker()
+    def test_refresh_while_in_use(self, mock_requests):
+        """Tests that the capacity is only refreshed in the background while it is in use"""
+        mock_requests.get(
+            'http://amplium:8081/status',
+            json={'status': 'OK', 'nodes': [{'available_capacity': 3}]}
+        )
+        remote_grid = AmpliumGrid(
+            config={'name': 'amplium', 'url': 'http://amplium:8081', 'idle_timeout': 60.0},
+            session=requests.Session()
+        )
+        remote_grid._stopped = MagicMock(is_set=MagicMock(side_effect=[False, True] * 3))
+
+        monotonic = MagicMock(return_value=100.0)
+        with patch('amplium.remote_grids.abstract_remote_grid.time.monotonic', monotonic):
+            remote_grid._refresh_forever()
+            self.assertEqual(mock_requests.call_count, 0)
+
+            remote_grid.get_available_capacity()
+            remote_grid._refresh_forever()
+            self.assertEqual(mock_requests.call_count, 2)
+
+            monotonic.return_value = 160.0
+            remote_grid._refresh_forever()
+            self.assertEqual(mock_requests.call_count, 2)
@@ -0,0 +1,102 @@
+"""Unit testing for util/request_logger.py"""
+import logging
+import unittest
+
+from mock import patch, MagicMock
+
+from amplium.utils.request_logger import LazyPayload, RequestLogger
+from test.helpers.config import mock_config  # pylint: disable=wrong-import-order
+
+
+# Settings of the request logging configuration the tests rely on
+DEFAULT_CONFIG = {
+    'max_body_length': 10,
+    'sample_rate': 1.0,
+    'suppressed_commands': ['screenshot'],
+    'structured': False
+}
+
+
+class LazyPayloadUnitTests(unittest.TestCase):
+    """Unit tests for the lazy payload"""
+
+    def test_short_payload(self):
+        """Tests that payloads under the limit are logged as-is"""
+        self.assertEqual(str(LazyPayload({'a': 1}, 100)), "{'a': 1}")
+
+    def test_long_payload_truncated(self):
+        """Tests that payloads over the limit are truncated"""
+        self.assertEqual(str(LazyPayload('x' * 15, 10)), 'xxxxxxxxxx... (5 characters truncated)')
+
+    def test_response_truncated(self):
+        """Tests that only the logged part of a response body is decoded"""
+        response = MagicMock(content=b'y' * 1000)
+        self.assertEqual(str(LazyPayload(response, 3)), 'yyy... (997 characters truncated)')
+
+
+@patch('amplium.utils.request_logger.logger')
+class RequestLoggerUnitTests(unittest.TestCase):
+    """Unit tests for the request logger"""
+
+    def test_log_request(self, mock_logger):
+        """Tests that requests are logged with a lazy body"""
+        mock_logger.isEnabledFor.return_value = True
+        request_logger = RequestLogger(config=mock_config(DEFAULT_CONFIG))
+
+        self.assertTrue(request_logger.log_request('id', 'POST', 'http://test_host_1', 'url', {'url': 'x'}))
+
+        args = mock_logger.info.call_args[0]
+        self.assertIsInstance(args[4], LazyPayload)
+
+    def test_log_request_disabled(self, mock_logger):
+        """Tests that nothing is done when INFO logging is disabled"""
+        mock_logger.isEnabledFor.return_value = False
+        request_logger = RequestLogger(config=mock_config(DEFAULT_CONFIG))
+
+        self.assertFalse(request_logger.log_request('id', 'POST', 'http://test_host_1', 'url', {'url': 'x'}))
+        mock_logger.info.assert_not_called()
+
+    @patch('amplium.utils.request_logger.random.random', MagicMock(return_value=0.5))
+    def test_log_request_sampled_out(self, mock_logger):
+        """Tests that requests outside the sample are not logged"""
+        mock_logger.isEnabledFor.return_value = True
+        request_logger = RequestLogger(config=mock_config(DEFAULT_CONFIG, sample_rate=0.1))
+
+        self.assertFalse(request_logger.log_request('id', 'POST', 'http://test_host_1', 'url', {'url': 'x'}))
+        mock_logger.info.assert_not_called()
+
+    def test_log_response_suppressed(self, mock_logger):
+        """Tests that bodies of suppressed commands are never logged"""
+        request_logger = RequestLogger(config=mock_config(DEFAULT_CONFIG))
+        response = MagicMock(status_code=200)
+
+        request_logger.log_response('id', 'http://test_host_1', 'element/1/screenshot', response)
+
+        args = mock_logger.info.call_args[0]
+        self.assertEqual(args[3], '<suppressed>')
+
+    def test_log_response_structured(self, mock_logger):
+        """Tests that structured logging puts the request fields on the record"""
+        request_logger = RequestLogger(config=mock_config(DEFAULT_CONFIG, structured=True))
+        response = MagicMock(status_code=200, content=b'{}')
+
+        request_logger.log_response('id', 'http://test_host_1', 'url', response)
+
+        extra = mock_logger.info.call_args[1]['extra']
+        self.assertEqual(extra['session_id'], 'id')
+        self.assertEqual(extra['status_code'], 200)
+        self.assertEqual(str(extra['body']), '{}')
+
+
+class RequestLoggerFormattingUnitTests(unittest.TestCase):
+    """Unit tests for formatting of the request log"""
+
+    def test_body_not_formatted_when_not_emitted(self):
+        """Tests that a body is never converted to a string if the log record is discarded"""
+        payload = MagicMock()
+        with patch('amplium.utils.request_logger.logger', logging.getLogger('amplium.test.discarded')):
+            logging.getLogger('amplium.test.discarded').setLevel(logging.WARNING)
+            request_logger = RequestLogger(config=mock_config(DEFAULT_CONFIG))
+            request_logger.log_request('id', 'POST', 'http://test_host_1', 'url', payload)
+
+        payload.__str__.assert_not_called()
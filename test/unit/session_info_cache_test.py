@@ -0,0 +1,80 @@
+"""Unit testing for util/session_info_cache.py"""
+import json
+import unittest
+
+from mock import MagicMock
+
+from amplium.utils.session_info_cache import SessionInfoCache
+
+HUB_URL = 'http://test_host_1:1234'
+
+
+def mock_response(**fields):
+    """Mocks a response of the hub's testsession API"""
+    session_info = {
+        'inactivityTime': 100,
+        'internalKey': '86723674-e6c4-4c0b-84e1-9d9b59250134',
+        'msg': 'slot found !',
+        'proxyId': 'http://10.101.9.142:5555',
+        'session': 'abc',
+        'success': True
+    }
+    session_info.update(fields)
+    return MagicMock(content=json.dumps(session_info).encode())
+
+
+class SessionInfoCacheUnitTests(unittest.TestCase):
+    """Unit tests for the session info cache"""
+
+    def setUp(self):
+        self.grid_handler = MagicMock()
+        self.grid_handler.unroll_session_id.side_effect = lambda session_id: (session_id[:-5], HUB_URL)
+        self.session = MagicMock()
+        self.session.get.return_value = mock_response()
+        self.cache = SessionInfoCache(config={'max_sessions': 10000}, grid_handler=self.grid_handler,
+                                      session=self.session)
+
+    def test_get(self):
+        """Tests that a session is looked up on its hub once"""
+        self.assertEqual(self.cache.get('abc-hash')['proxyId'], 'http://10.101.9.142:5555')
+        self.assertEqual(self.cache.get('abc-hash')['proxyId'], 'http://10.101.9.142:5555')
+
+        self.session.get.assert_called_once_with(
+            HUB_URL + '/grid/api/testsession',
+            params={'session': 'abc'},
+            headers={'Accept': 'application/json'}
+        )
+
+    def test_get_unknown_session(self):
+        """Tests that sessions the hub doesn't know aren't cached"""
+        self.session.get.return_value = mock_response(success=False, msg='Cannot find test slot')
+        self.assertFalse(self.cache.get('abc-hash')['success'])
+        self.cache.get('abc-hash')
+        self.assertEqual(self.session.get.call_count, 2)
+
+    def test_refresh(self):
+        """Tests that refreshing only updates the fields that change during a session"""
+        self.cache.get('abc-hash')
+        self.session.get.return_value = mock_response(inactivityTime=5, proxyId='http://10.101.9.143:5555')
+
+        session_info = self.cache.get('abc-hash', refresh=True)
+
+        self.assertEqual(session_info['inactivityTime'], 5)
+        self.assertEqual(session_info['proxyId'], 'http://10.101.9.142:5555')
+        self.assertEqual(self.cache.get('abc-hash')['inactivityTime'], 5)
+
+    def test_invalidate(self):
+        """Tests that deleted sessions are looked up again"""
+        self.cache.get('abc-hash')
+        self.cache.invalidate('abc-hash')
+        self.cache.get('abc-hash')
+        self.assertEqual(self.session.get.call_count, 2)
+
+    def test_max_sessions(self):
+        """Tests that the oldest sessions are forgotten first"""
+        self.cache.config = {'max_sessions': 1}
+        self.cache.get('abc-hash')
+        self.cache.get('def-hash')
+        self.cache.get('def-hash')
+        self.cache.get('abc-hash')
+        self.assertEqual(self.session.get.call_count, 3)
@@ -0,0 +1,255 @@
+"""Unit testing for util/session_pool.py"""
+import unittest
+
+from mock import patch, MagicMock
+
+from amplium.models.pooled_session import PooledSession
+from amplium.utils.session_pool import ReusableSessionPool, WarmSessionPool, capabilities_key
+from test.helpers.config import mock_config  # pylint: disable=wrong-import-order
+
+CHROME = {'browserName': 'chrome'}
+
+
+# Settings of the session pool configuration the tests rely on
+DEFAULT_CONFIG = {
+    'profiles': [{'name': 'chrome', 'capabilities': CHROME, 'size': 2}],
+    'idle_timeout': 240,
+    'refresh_interval': 5
+}
+
+
+def mock_grid_handler():
+    """Mocks the grid handler, with a hub that has spare capacity"""
+    grid_handler = MagicMock(grid_snapshot=[{'queue': 0}])
+    grid_handler.remote_grids.get_requested.return_value = None
+    grid_handler.get_webdriver_url.side_effect = lambda url: url + '/wd/hub'
+    grid_handler.generate_session_id.side_effect = lambda session_id, url: session_id + '-hash'
+    grid_handler.unroll_session_id.side_effect = lambda session_id: ('abc', 'http://test_host_1:1234')
+    return grid_handler
+
+
+class SessionPoolUnitTests(unittest.TestCase):
+    """Unit tests for the warm session pool"""
+
+    def setUp(self):
+        self.grid_handler = mock_grid_handler()
+        self.session = MagicMock()
+        self.session.post.return_value.content = b'{"sessionId": "abc", "status": 0}'
+        self.datadog = MagicMock()
+        self.pool = WarmSessionPool(
+            config=mock_config(DEFAULT_CONFIG),
+            grid_handler=self.grid_handler,
+            session=self.session,
+            executor=MagicMock(map=map),
+            datadog=self.datadog
+        )
+        self.key = capabilities_key(CHROME)
+
+    def pool_session(self, idle_since=0.0):
+        """Adds an idle session to the pool"""
+        self.pool._idle[self.key].append(PooledSession(  # pylint: disable=protected-access
+            session_id='abc-hash',
+            grid_url='http://test_host_1:1234',
+            response={'sessionId': 'abc-hash', 'status': 0},
+            idle_since=idle_since
+        ))
+
+    def test_capabilities_key(self):
+        """Tests that capabilities are matched regardless of order and the pooling capabilities"""
+        self.assertEqual(
+            capabilities_key({'browserName': 'chrome', 'platform': 'LINUX', 'amplium:reusable': True}),
+            capabilities_key({'platform': 'LINUX', 'browserName': 'chrome'})
+        )
+        self.assertNotEqual(capabilities_key(CHROME), capabilities_key({'browserName': 'firefox'}))
+        for name in ('amplium:remoteGrid', 'amplium:zone', 'amplium:tenant', 'amplium:buildId'):
+            self.assertNotEqual(capabilities_key(CHROME), capabilities_key(dict(CHROME, **{name: 'a'})), name)
+
+    def test_acquire(self):
+        """Tests that a matching request claims a pooled session"""
+        self.pool_session()
+
+        response = self.pool.acquire({'desiredCapabilities': {'browserName': 'chrome'}})
+
+        self.assertEqual(response, {'sessionId': 'abc-hash', 'status': 0})
+        self.assertEqual(self.pool.get_size(self.key), 0)
+
+    def test_acquire_w3c(self):
+        """Tests that W3C session requests claim pooled sessions too"""
+        self.pool_session()
+
+        response = self.pool.acquire({'capabilities': {'alwaysMatch': {'browserName': 'chrome'}}})
+        self.assertEqual(response, {'sessionId': 'abc-hash', 'status': 0})
+
+    def test_acquire_empty(self):
+        """Tests that nothing is claimed when the matching profile has no idle sessions"""
+        self.assertIsNone(self.pool.acquire({'desiredCapabilities': {'browserName': 'chrome'}}))
+
+    def test_acquire_no_match(self):
+        """Tests that requests not matching a profile, or asking for a remote grid, never claim sessions"""
+        self.pool_session()
+        self.assertIsNone(self.pool.acquire({'desiredCapabilities': {'browserName': 'firefox'}}))
+
+        self.grid_handler.remote_grids.get_requested.return_value = MagicMock()
+        self.assertIsNone(self.pool.acquire({'desiredCapabilities': {'browserName': 'chrome'}}))
+        self.assertEqual(self.pool.get_size(self.key), 1)
+
+    def test_maintain(self):
+        """Tests that profiles are filled up to their size on the planned grids"""
+        self.pool_session(idle_since=float('inf'))
+        self.grid_handler.plan_base_urls.return_value = ['http://test_host_2:1234']
+
+        self.pool.maintain()
+
+        self.grid_handler.plan_base_urls.assert_called_once_with(
+            {'desiredCapabilities': CHROME, 'capabilities': {'alwaysMatch': CHROME}}, 1
+        )
+        self.assertEqual(self.session.post.call_args[0][0], 'http://test_host_2:1234/wd/hub/session')
+        self.assertEqual(self.pool.get_size(self.key), 2)
+
+    def test_maintain_queued(self):
+        """Tests that the pool is not filled while session requests are waiting on the grids"""
+        self.grid_handler.plan_base_urls.return_value = ['http://test_host_2:1234']
+        self.grid_handler.grid_snapshot = [{'queue': 1}]
+
+        self.pool.maintain()
+
+        self.session.post.assert_not_called()
+        self.assertEqual(self.pool.get_size(self.key), 0)
+
+    @patch('amplium.utils.session_pool.time.monotonic', MagicMock(return_value=1000))
+    def test_reap(self):
+        """Tests that sessions idle longer than the timeout are deleted"""
+        self.pool_session(idle_since=0)
+        self.pool_session(idle_since=900)
+
+        self.pool.reap()
+
+        self.session.delete.assert_called_once_with('http://test_host_1:1234/wd/hub/session/abc')
+        self.assertEqual(self.pool.get_size(self.key), 1)
+
+    def test_stop_and_close(self):
+        """Tests that a stopped pool starts no sessions, and closing it deletes the idle ones"""
+        self.pool_session(idle_since=900)
+        self.pool.stop()
+        self.pool._maintain_forever()  # pylint: disable=protected-access
+        self.session.post.assert_not_called()
+
+        self.pool.close()
+        self.session.delete.assert_called_once_with('http://test_host_1:1234/wd/hub/session/abc')
+        self.assertEqual(self.pool.get_size(self.key), 0)
+
+
+def mock_hub_session():
+    """Mocks a requests session to a hub that accepts every command"""
+    session = MagicMock()
+    session.request.return_value = MagicMock(status_code=200, content=b'{"status": 0, "value": null}')
+    return session
+
+
+class ReusableSessionPoolUnitTests(unittest.TestCase):
+    """Unit tests for the reusable session pool"""
+
+    def setUp(self):
+        self.grid_handler = mock_grid_handler()
+        self.session = mock_hub_session()
+        self.executor = MagicMock()
+        self.executor.submit.side_effect = lambda func, *args: func(*args)
+        self.pool = ReusableSessionPool(
+            config={'max_uses': 2, 'max_idle': 1, 'idle_timeout': 240, 'refresh_interval': 10},
+            grid_handler=self.grid_handler,
+            session=self.session,
+            executor=self.executor,
+            datadog=MagicMock()
+        )
+        self.request = {'desiredCapabilities': {'browserName': 'chrome', 'amplium:reusable': True}}
+        self.response = {'sessionId': 'abc-hash', 'status': 0}
+
+    def test_reuse(self):
+        """Tests that a released session is reset and reclaimed by the next matching request"""
+        self.pool.track(self.request, self.response)
+
+        self.assertTrue(self.pool.release('abc-hash'))
+        self.assertEqual(
+            [call[1]['url'] for call in self.session.request.call_args_list],
+            [
+                'http://test_host_1:1234/wd/hub/session/abc/execute/sync',
+                'http://test_host_1:1234/wd/hub/session/abc/cookie',
+                'http://test_host_1:1234/wd/hub/session/abc/url'
+            ]
+        )
+        self.assertEqual(self.pool.acquire(self.request), self.response)
+        self.assertIsNone(self.pool.acquire(self.request))
+
+    def test_release_twice(self):
+        """Tests that a session deleted twice is only recycled once"""
+        self.pool.track(self.request, self.response)
+
+        self.assertTrue(self.pool.release('abc-hash'))
+        self.assertTrue(self.pool.release('abc-hash'))
+        self.assertEqual(self.session.request.call_count, 3)
+        self.assertEqual(self.pool.acquire(self.request), self.response)
+        self.assertIsNone(self.pool.acquire(self.request))
+
+    def test_not_reusable(self):
+        """Tests that sessions which didn't opt in are never pooled"""
+        request = {'desiredCapabilities': {'browserName': 'chrome'}}
+        self.pool.track(request, self.response)
+
+        self.assertFalse(self.pool.release('abc-hash'))
+        self.assertIsNone(self.pool.acquire(request))
+
+    def test_max_uses(self):
+        """Tests that sessions are quit once they have been used enough times"""
+        self.pool.track(self.request, self.response)
+        self.assertTrue(self.pool.release('abc-hash'))
+        self.pool.acquire(self.request)
+
+        self.assertFalse(self.pool.release('abc-hash'))
+        self.assertFalse(self.pool.release('abc-hash'))
+
+    def test_reset_failed(self):
+        """Tests that sessions which couldn't be reset are deleted instead of pooled"""
+        self.session.request.return_value = MagicMock(status_code=500, content=b'{"status": 13}')
+        self.pool.track(self.request, self.response)
+
+        self.assertTrue(self.pool.release('abc-hash'))
+
+        self.session.delete.assert_called_once_with('http://test_host_1:1234/wd/hub/session/abc')
+        self.assertIsNone(self.pool.acquire(self.request))
+        self.assertFalse(self.pool.release('abc-hash'))
+
+    def test_legacy_execute(self):
+        """Tests that storage is cleared with the legacy execute command if the browser lacks execute/sync"""
+        self.session.request.side_effect = [
+            MagicMock(status_code=404, content=b'{"status": 9}'),
+            MagicMock(status_code=200, content=b'{"status": 0}'),
+            MagicMock(status_code=200, content=b'{"status": 0}'),
+            MagicMock(status_code=200, content=b''),
+        ]
+        self.pool.track(self.request, self.response)
+
+        self.assertTrue(self.pool.release('abc-hash'))
+
+        self.assertEqual(
+            self.session.request.call_args_list[1][1]['url'],
+            'http://test_host_1:1234/wd/hub/session/abc/execute'
+        )
+        self.assertEqual(self.pool.get_size(capabilities_key(self.request['desiredCapabilities'])), 1)
+
+    def test_release_stopped(self):
+        """Tests that sessions released by a stopped pool are deleted instead of recycled"""
+        self.pool.track(self.request, self.response)
+        self.pool.stop()
+
+        self.assertFalse(self.pool.release('abc-hash'))
+        self.session.request.assert_not_called()
+
+    def test_close(self):
+        """Tests that closing the pool deletes and forgets its idle sessions"""
+        self.pool.track(self.request, self.response)
+        self.assertTrue(self.pool.release('abc-hash'))
+
+        self.pool.close()
+        self.session.delete.assert_called_once_with('http://test_host_1:1234/wd/hub/session/abc')
+        self.assertIsNone(self.pool.acquire(self.request))
+        self.assertFalse(self.pool.release('abc-hash'))
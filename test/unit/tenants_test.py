@@ -0,0 +1,109 @@
+"""Unit testing for util/tenants.py"""
+import unittest
+from unittest.mock import patch
+
+from amplium.api.exceptions import TenantQuotaExceededException
+from amplium.utils.tenants import TenantManager
+from test.helpers.config import mock_config  # pylint: disable=wrong-import-order
+
+
+# Settings of the tenants configuration the tests rely on
+DEFAULT_CONFIG = {
+    'default_quota': 0,
+    'quotas': {'nightly': 2},
+    'priorities': ['interactive', 'ci', 'nightly'],
+    'default_priority': 'ci',
+    'tenant_priorities': {'nightly': 'nightly'},
+    'session_timeout': 1800
+}
+
+
+class TenantManagerUnitTests(unittest.TestCase):
+    """Unit tests for tenant quotas and priority classes"""
+
+    def setUp(self):
+        self.tenants = TenantManager(mock_config(DEFAULT_CONFIG))
+
+    def test_get_tenant(self):
+        """Tests that the header names the tenant, then the capability"""
+        self.assertEqual(self.tenants.get_tenant({'amplium:tenant': 'team-a'}, 'team-b'), 'team-b')
+        self.assertEqual(self.tenants.get_tenant({'amplium:tenant': 'team-a'}), 'team-a')
+        self.assertEqual(self.tenants.get_tenant({}), 'default')
+
+    def test_get_priority(self):
+        """Tests that the capability sets the priority, then the tenant's and the default priority"""
+        self.assertEqual(self.tenants.get_priority({'amplium:priority': 'interactive'}, 'nightly'), 0)
+        self.assertEqual(self.tenants.get_priority({}, 'nightly'), 2)
+        self.assertEqual(self.tenants.get_priority({'amplium:priority': 'unknown'}, 'team-a'), 1)
+
+    def test_get_priority_reloaded(self):
+        """Tests that priorities are read from the configuration as it is reloaded"""
+        self.tenants.config['priorities'] = ['ci']
+        self.assertEqual(self.tenants.get_priority({'amplium:priority': 'interactive'}, 'nightly'), 0)
+        self.assertEqual(self.tenants.to_dict()['waiting'], {'ci': 0})
+
+    def test_quota(self):
+        """Tests that a tenant can't have more sessions than its quota"""
+        self.tenants.reserve('nightly')
+        self.tenants.session_started('session_1', 'nightly')
+        self.tenants.reserve('nightly')
+
+        with self.assertRaises(TenantQuotaExceededException):
+            self.tenants.reserve('nightly')
+
+        self.tenants.session_ended('session_1')
+        self.tenants.reserve('nightly')
+
+    def test_quota_batch(self):
+        """Tests that a batch only fits if all of its sessions do"""
+        with self.assertRaises(TenantQuotaExceededException):
+            self.tenants.reserve('nightly', 3)
+        self.tenants.reserve('nightly', 2)
+
+    def test_no_quota(self):
+        """Tests that tenants without a quota aren't limited"""
+        self.tenants.reserve('team-a', 1000)
+        self.assertEqual(self.tenants.to_dict()['sessions'], {'team-a': 1000})
+
+    def test_session_not_started(self):
+        """Tests that reservations for sessions that couldn't be created are released"""
+        self.tenants.reserve('nightly', 2)
+        self.tenants.session_started(None, 'nightly')
+        self.tenants.release('nightly')
+        self.assertEqual(self.tenants.to_dict()['sessions'], {})
+
+    def test_session_ended_unknown(self):
+        """Tests that sessions created before a restart are ignored"""
+        self.tenants.session_ended('unknown')
+        self.assertEqual(self.tenants.to_dict()['sessions'], {})
+
+    @patch('amplium.utils.tenants.time.monotonic')
+    def test_session_timeout(self, monotonic):
+        """Tests that sessions which are never deleted stop counting once they time out"""
+        monotonic.return_value = 0
+        self.tenants.reserve('nightly', 2)
+        self.tenants.session_started('session_1', 'nightly')
+        self.tenants.session_started('session_2', 'nightly')
+
+        monotonic.return_value = 1000
+        self.tenants.session_used('session_2')
+        self.tenants.session_used('unknown')
+        monotonic.return_value = 2000
+        self.tenants.reserve('nightly')
+        self.assertEqual(self.tenants.to_dict()['sessions'], {'nightly': 2})
+
+        with self.assertRaises(TenantQuotaExceededException):
+            self.tenants.reserve('nightly')
+
+        monotonic.return_value = 3000
+        self.tenants.session_ended('session_2')
+        self.assertEqual(self.tenants.to_dict()['sessions'], {'nightly': 1})
+
+    def test_waiting_ahead(self):
+        """Tests that only more urgent waiting requests are counted ahead"""
+        with self.tenants.waiting(0), self.tenants.waiting(1), self.tenants.waiting(1):
+            self.assertEqual(self.tenants.get_waiting_ahead(0), 0)
+            self.assertEqual(self.tenants.get_waiting_ahead(1), 1)
+            self.assertEqual(self.tenants.get_waiting_ahead(2), 3)
+            self.assertEqual(self.tenants.to_dict()['waiting'], {'interactive': 1, 'ci': 2, 'nightly': 0})
+        self.assertEqual(self.tenants.get_waiting_ahead(2), 0)
@@ -41,6 +41,12 @@ class TraceKeyUnitTests(unittest.TestCase):
             response = tracekey.tracekey()
             self.assertEqual(response, 'test_uuid')
 
+    def test_client_tracekey(self):
+        """Tests that the client's tracekey is read from the request, and None outside of requests"""
+        self.assertIsNone(tracekey.client_tracekey())
+        with app.test_request_context(headers={'X_WGEN_TRACEKEY': 'build-1/shard-2'}):
+            self.assertEqual(tracekey.client_tracekey(), 'build-1/shard-2')
+
     def test_filter(self):
         """Tests the TracekeyFilter filter method. Should return true."""
         tracekey_class = tracekey.TracekeyFilter()
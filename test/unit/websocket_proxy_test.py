@@ -0,0 +1,156 @@
+"""Unit testing for util/websocket_proxy.py"""
+import unittest
+
+from aiohttp import web, WSMsgType
+from aiohttp.test_utils import AioHTTPTestCase, TestServer
+from mock import MagicMock
+
+from amplium.utils.websocket_proxy import WebSocketProxy
+from test.helpers.config import mock_config  # pylint: disable=wrong-import-order
+
+PUBLIC_URL = 'ws://amplium.example.com:8082'
+
+
+# Settings of the WebSocket forwarding configuration the tests rely on
+DEFAULT_CONFIG = {
+    'public_url': PUBLIC_URL,
+    'port': 8082,
+    'heartbeat': 30,
+    'max_message_size': 16 * 1024 * 1024,
+    'max_connections': 100
+}
+
+
+def mock_grid_handler(grid_url='http://test_host_1:1234', webdriver_path='/wd/hub'):
+    """Mocks the grid handler, knowing only sessions that end in '-hash'"""
+    def unroll_session_id(session_id):
+        if not session_id.endswith('-hash'):
+            raise KeyError(session_id)
+        return session_id[:-5], grid_url
+    grid_handler = MagicMock()
+    grid_handler.unroll_session_id.side_effect = unroll_session_id
+    grid_handler.get_webdriver_url.side_effect = lambda url: url + webdriver_path
+    return grid_handler
+
+
+class WebSocketUrlUnitTests(unittest.TestCase):
+    """Unit tests for rewriting the WebSocket URLs of new sessions"""
+
+    def setUp(self):
+        self.proxy = WebSocketProxy(config=mock_config(DEFAULT_CONFIG), grid_handler=mock_grid_handler())
+
+    def test_rewrite_urls(self):
+        """Tests that the WebSocket URLs of W3C capabilities point at the forwarder"""
+        # Selenium Grid 4's response, with the session id replaced by Amplium's
+        response = {'value': {'sessionId': 'abc-hash', 'capabilities': {
+            'acceptInsecureCerts': False,
+            'browserName': 'chrome',
+            'browserVersion': '120.0.6099.109',
+            'goog:chromeOptions': {'debuggerAddress': 'localhost:41017'},
+            'platformName': 'linux',
+            'se:cdp': 'ws://10.0.0.5:4444/session/abc/se/cdp',
+            'se:cdpVersion': '120.0.6099.109',
+            'webSocketUrl': 'ws://10.0.0.5:4444/session/abc/se/bidi'
+        }}}
+
+        self.proxy.rewrite_urls(response)
+
+        capabilities = response['value']['capabilities']
+        self.assertEqual(capabilities['se:cdp'], PUBLIC_URL + '/session/abc-hash/se/cdp')
+        self.assertEqual(capabilities['webSocketUrl'], PUBLIC_URL + '/session/abc-hash/se/bidi')
+        self.assertEqual(capabilities['goog:chromeOptions'], {'debuggerAddress': 'localhost:41017'})
+
+    def test_rewrite_urls_legacy(self):
+        """Tests that the WebSocket URLs of legacy capabilities point at the forwarder, once"""
+        response = {'sessionId': 'abc-hash', 'value': {'se:cdp': 'ws://10.0.0.5:4444/session/abc/se/cdp'}}
+
+        self.proxy.rewrite_urls(response)
+        self.proxy.rewrite_urls(response)
+
+        self.assertEqual(response['value']['se:cdp'], PUBLIC_URL + '/session/abc-hash/se/cdp')
+
+    def test_rewrite_urls_other_session(self):
+        """Tests that WebSocket URLs that aren't the session's channels are left alone"""
+        response = {'sessionId': 'abc-hash', 'value': {'se:cdp': 'ws://10.0.0.5:9222/devtools/browser/1'}}
+        self.proxy.rewrite_urls(response)
+        self.assertEqual(response['value']['se:cdp'], 'ws://10.0.0.5:9222/devtools/browser/1')
+
+    def test_rewrite_urls_disabled(self):
+        """Tests that nothing is rewritten without a public URL"""
+        self.proxy.config = mock_config(DEFAULT_CONFIG, public_url='')
+        response = {'sessionId': 'abc-hash', 'value': {'se:cdp': 'ws://10.0.0.5:4444/session/abc/se/cdp'}}
+        self.proxy.rewrite_urls(response)
+        self.assertEqual(response['value']['se:cdp'], 'ws://10.0.0.5:4444/session/abc/se/cdp')
+
+    def test_get_upstream_url(self):
+        """Tests that channels are forwarded to the WebDriver URL of the session's hub"""
+        self.assertEqual(
+            self.proxy.get_upstream_url('abc-hash', 'se/cdp'),
+            'ws://test_host_1:1234/wd/hub/session/abc/se/cdp'
+        )
+
+    def test_get_upstream_url_remote_grid(self):
+        """Tests that channels of sessions on remote grids use the remote grid's WebDriver path"""
+        self.proxy.grid_handler = mock_grid_handler('https://amplium.us-east.example.com', '/proxy')
+        self.assertEqual(
+            self.proxy.get_upstream_url('abc-hash', 'se/cdp'),
+            'wss://amplium.us-east.example.com/proxy/session/abc/se/cdp'
+        )
+
+
+class WebSocketProxyUnitTests(AioHTTPTestCase):
+    """Unit tests for forwarding WebSocket channels"""
+
+    async def get_application(self):
+        # pylint: disable=attribute-defined-outside-init
+        self.upstream_paths = []
+        self.upstream = TestServer(self.get_upstream_app())
+        await self.upstream.start_server()
+        grid_url = 'http://{0}:{1}'.format(self.upstream.host, self.upstream.port)
+        self.proxy = WebSocketProxy(
+            config=mock_config(DEFAULT_CONFIG),
+            grid_handler=mock_grid_handler(grid_url)
+        )
+        return self.proxy.create_app()
+
+    async def asyncTearDown(self):
+        await super().asyncTearDown()
+        await self.upstream.close()
+
+    def get_upstream_app(self):
+        """Hub that echoes every message sent on a session's channel"""
+        async def echo(request):
+            self.upstream_paths.append(request.path)
+            websocket = web.WebSocketResponse()
+            await websocket.prepare(request)
+            async for message in websocket:
+                if message.type == WSMsgType.TEXT:
+                    await websocket.send_str('echo ' + message.data)
+                elif message.type == WSMsgType.BINARY:
+                    await websocket.send_bytes(message.data)
+            return websocket
+
+        app = web.Application()
+        app.router.add_get('/wd/hub/session/{session_id}/{channel:.+}', echo)
+        return app
+
+    async def test_forward(self):
+        """Tests that messages are forwarded both ways"""
+        async with self.client.ws_connect('/session/abc-hash/se/cdp') as websocket:
+            await websocket.send_str('{"id": 1, "method": "Browser.getVersion"}')
+            self.assertEqual(await websocket.receive_str(), 'echo {"id": 1, "method": "Browser.getVersion"}')
+            await websocket.send_bytes(b'\x00\x01')
+            self.assertEqual(await websocket.receive_bytes(), b'\x00\x01')
+
+        self.assertEqual(self.upstream_paths, ['/wd/hub/session/abc/se/cdp'])
+
+    async def test_unknown_session(self):
+        """Tests that channels of unknown sessions are refused"""
+        response = await self.client.get('/session/unknown/se/cdp')
+        self.assertEqual(response.status, 404)
+
+    async def test_unreachable_hub(self):
+        """Tests that channels the hub refuses are reported as a bad gateway"""
+        await self.upstream.close()
+        response = await self.client.get('/session/abc-hash/se/cdp')
+        self.assertEqual(response.status, 502)
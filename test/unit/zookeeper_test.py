@@ -35,6 +35,16 @@ class ZooKeeperUnitTests(unittest.TestCase):
         self.assertEqual(host_data.host, "test_host")
         self.assertEqual(host_data.port, 1234)
         self.assertEqual(host_data.name, 'test_node')
+        self.assertEqual(host_data.metadata, {})
+
+    @patch('kazoo.client.KazooClient.get', MagicMock(return_value=(
+        '{"host":"test_host","port":1234,"name":"test_node","zone":"us-east-1a","labels":{"rack":"r12"}}',
+    )))
+    def test_get_node_data_metadata(self):
+        """Tests that the rest of the node's registration and its labels are kept as metadata"""
+        mock_zk = ZookeeperGridNodeStatus('test_path', 0, 1234)
+        host_data = mock_zk._get_grid_node_data('test_path')
+        self.assertEqual(host_data.metadata, {'zone': 'us-east-1a', 'rack': 'r12'})
 
     @patch('kazoo.client.KazooClient.start', MagicMock())
     @patch('kazoo.client.KazooClient.get_children', MagicMock(return_value=["node1"]))